@@ -1,6 +1,10 @@
+import json
+import time
 import uuid
+from typing import Optional
 
 from flask import (
+    Response,
     render_template,
     flash,
     Blueprint,
@@ -8,14 +12,21 @@ from flask import (
     redirect,
     url_for,
     request,
+    jsonify,
+    abort,
+    stream_with_context,
 )
 from app.main.forms import UploadForm, MappingForm
+from app.models.error_store import ErrorStore
 from app.models.inspection import InspectionResult
+from app.models.job import JobStatus
 from app.models.process import CSVValidationRequest
 from app.models.schema import Schema
 
 main = Blueprint("main", __name__, template_folder="templates")
 
+ERRORS_PER_PAGE = 50
+
 
 @main.route("/", methods=["GET", "POST"])
 def index():
@@ -36,10 +47,17 @@ def map_columns(filename):
     try:
         available_schemas = current_app.csv_service.available_schemas()
         selected_schema = request.args.get("schema")
-        if not selected_schema:
-            recommended = current_app.csv_service.recommend_schema(filename)
-            selected_schema = recommended.name if recommended else "default"
-        results = current_app.csv_service.inspect(filename, selected_schema)
+        # Files laid out like one whose mappings were saved skip recommendation and
+        # content guessing
+        results = current_app.csv_service.inspect_template(filename, selected_schema)
+        if results is not None:
+            selected_schema = results.schema.name
+            flash("Mappings loaded from a saved template", "info")
+        else:
+            if not selected_schema:
+                recommended = current_app.csv_service.recommend_schema(filename)
+                selected_schema = recommended.name if recommended else "default"
+            results = current_app.csv_service.inspect(filename, selected_schema)
         form = building_mapping_form(results)
         return render_template(
             "mapping.html",
@@ -90,15 +108,145 @@ def process_file(filename):
     schema = current_app.schema_registry.get_schema(form.schema_name.data)
     form = build_schema_fields_choices(form, schema)
     if form.validate_on_submit():
+        # Ignored columns stay in as None, so they aren't validated by name
         mappings = {
-            entry.csv_column.data: entry.schema_field.data
+            entry.csv_column.data: entry.schema_field.data or None
             for entry in form.mappings
-            if entry.schema_field.data
         }
+        if form.save_template.data:
+            current_app.csv_service.save_template(filename, schema.name, mappings)
         validation_request = CSVValidationRequest(
             id=uuid.uuid4(), file=filename, schema=schema.name, mappings=mappings
         )
-        result = current_app.csv_service.validate(validation_request)
-        return render_template("result.html", result=result)
+        job = current_app.validation_queue.submit(validation_request)
+        return redirect(url_for("main.job_result", job_id=job.id))
     print(request.form)
     return redirect(url_for("main.index"))
+
+
+@main.route("/jobs/<uuid:job_id>")
+def job_result(job_id):
+    job = current_app.validation_queue.get(job_id)
+    if job is None:
+        flash(f"Validation job {job_id} not found", "error")
+        return redirect(url_for("main.index"))
+    if job.status == JobStatus.DONE:
+        # Errors are fetched a page at a time from job_errors
+        return render_template("result.html", result=job.result)
+    return render_template("job.html", job=job)
+
+
+@main.post("/jobs/<uuid:job_id>/retry")
+def retry_job(job_id):
+    job = current_app.validation_queue.retry(job_id)
+    if job is None:
+        flash(f"Validation job {job_id} not found", "error")
+        return redirect(url_for("main.index"))
+    return redirect(url_for("main.job_result", job_id=job.id))
+
+
+@main.route("/jobs/<uuid:job_id>/status")
+def job_status(job_id):
+    job = current_app.validation_queue.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job.status_dict())
+
+
+def server_event(event: str, data: dict, event_id: Optional[str] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def event_position(event_id: Optional[str]) -> tuple[int, int]:
+    """
+    Byte offset in the job's error log and errors already sent from there, as encoded
+    in the id of the last event a reconnecting client received.
+    """
+    try:
+        offset, sent = (int(part) for part in (event_id or "").split("-"))
+    except ValueError:
+        return 0, 0
+    return max(offset, 0), max(sent, 0)
+
+
+@main.route("/jobs/<uuid:job_id>/events")
+def job_events(job_id):
+    """
+    Server-sent events with the job's progress and each error as it is found. The
+    stream ends after JOB_EVENT_STREAM_SECONDS so no worker is held for the whole
+    job, the browser reconnects and resumes after the last event it received.
+    """
+    queue = current_app.validation_queue
+    if queue.get(job_id) is None:
+        abort(404)
+    interval = current_app.config["JOB_EVENT_INTERVAL"]
+    deadline = time.monotonic() + current_app.config["JOB_EVENT_STREAM_SECONDS"]
+    offset, skip = event_position(request.headers.get("Last-Event-ID"))
+
+    def events():
+        nonlocal offset, skip
+        while True:
+            # Read the job first, any error it counts is already in the error log
+            job = queue.get(job_id)
+            errors, next_offset = queue.read_errors(job_id, offset)
+            # Reading again from the same offset returns the same errors first
+            for sent, error in enumerate(errors[skip:], start=skip + 1):
+                yield server_event(
+                    "validation-error", error.to_dict(), f"{offset}-{sent}"
+                )
+            offset, skip = next_offset, 0
+            yield server_event("progress", job.status_dict(), f"{offset}-0")
+            if job.is_finished():
+                yield server_event("done", job.status_dict())
+                return
+            if time.monotonic() >= deadline:
+                return
+            time.sleep(interval)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@main.route("/jobs/<uuid:job_id>/errors")
+def job_errors(job_id):
+    """
+    One page of a finished job's errors, optionally only those failing ``field``
+    (and ``rule``), with the job's error summary.
+    """
+    job = current_app.validation_queue.get(job_id)
+    if job is None or job.result is None:
+        abort(404)
+    per_page = request.args.get("per_page", ERRORS_PER_PAGE, type=int)
+    per_page = min(max(per_page, 1), 500)
+    page = max(request.args.get("page", 1, type=int), 1)
+    field = request.args.get("field")
+    rule = request.args.get("rule") or None
+    errors = job.result.errors
+    if not isinstance(errors, ErrorStore):
+        errors = ErrorStore(errors)
+    start = (page - 1) * per_page
+
+    if field is None:
+        total = len(errors)
+        selected = errors[start : start + per_page]
+    else:
+        matching = errors.matching(field, rule)
+        total = len(matching)
+        selected = [errors[i] for i in matching[start : start + per_page].tolist()]
+
+    return jsonify(
+        {
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "errors": [e.to_dict() for e in selected],
+            "summary": errors.summary.to_dict(),
+        }
+    )
@@ -0,0 +1,52 @@
+from dataclasses import dataclass, field
+from typing import Optional, Self
+from uuid import UUID
+
+from app.models.error_store import ErrorStore
+
+
+@dataclass
+class ValidationCheckpoint:
+    """How far validation of a request got, and the errors it had found by then."""
+
+    request_id: UUID
+    # Size and modification time of the file, a changed file starts over
+    source: list[int]
+    schema_hash: str
+    mappings: dict[str, str] = field(default_factory=dict)
+    # Where reading resumes, None for the first data row
+    byte_offset: Optional[int] = field(default=None)
+    row_offset: int = field(default=0)
+    errors: ErrorStore = field(default_factory=ErrorStore)
+
+    def same_run(self, other: "ValidationCheckpoint") -> bool:
+        """Whether both are for the same file contents, schema and mappings."""
+        return (
+            self.request_id == other.request_id
+            and self.source == other.source
+            and self.schema_hash == other.schema_hash
+            and self.mappings == other.mappings
+        )
+
+    def to_dict(self) -> dict:
+        """The errors are left for the caller to store."""
+        return {
+            "request_id": str(self.request_id),
+            "source": self.source,
+            "schema_hash": self.schema_hash,
+            "mappings": self.mappings,
+            "byte_offset": self.byte_offset,
+            "row_offset": self.row_offset,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, errors: Optional[ErrorStore] = None) -> Self:
+        return cls(
+            request_id=UUID(data["request_id"]),
+            source=data["source"],
+            schema_hash=data["schema_hash"],
+            mappings=data["mappings"],
+            byte_offset=data["byte_offset"],
+            row_offset=data["row_offset"],
+            errors=errors if errors is not None else ErrorStore(),
+        )
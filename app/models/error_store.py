@@ -0,0 +1,249 @@
+import json
+import tempfile
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional, Self
+
+import numpy as np
+
+from app.models.error_summary import ErrorSummary, rule_for
+from app.models.process import CSVValidationError
+
+# One entry per (row, field, message), a Cerberus error with several failed rules
+# on several fields becomes several entries
+ENTRY = np.dtype([("row", "<i8"), ("field", "<i4"), ("message", "<i4")])
+SPILL_ENTRIES = 1_000_000
+READ_ENTRIES = 65536
+# Field id of errors that are a plain message instead of a per-field dict
+NO_FIELD = -1
+
+
+class ErrorStore:
+    """
+    Validation errors kept as integer arrays of rows, field ids and message ids plus
+    deduplicated field and message tables. Entries beyond ``spill_entries`` are
+    written to a temporary file. Iterates and indexes as CSVValidationError, and keeps
+    an ErrorSummary of the errors as they are added.
+    """
+
+    def __init__(
+        self,
+        errors: Iterable[CSVValidationError] = (),
+        spill_entries: int = SPILL_ENTRIES,
+        folder: Optional[str] = None,
+    ) -> None:
+        self.spill_entries = spill_entries
+        self.folder = folder
+        self.fields: list[str] = []
+        self.messages: list = []
+        self.field_ids: dict[str, int] = {}
+        self.message_ids: dict[tuple[bool, str], int] = {}
+        # Index of the first entry of each error
+        self.starts = array("q")
+        self.rows = array("q")
+        self.field_column = array("i")
+        self.message_column = array("i")
+        self.spilled = 0
+        self.spill_file = None
+        self.summary = ErrorSummary()
+        self.extend(errors)
+
+    @property
+    def entries(self) -> int:
+        return self.spilled + len(self.rows)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the arrays, the tables are not counted."""
+        return sum(
+            a.itemsize * len(a)
+            for a in (self.starts, self.rows, self.field_column, self.message_column)
+        )
+
+    def append(self, error: CSVValidationError) -> None:
+        self.summary.add(error)
+        self.starts.append(self.entries)
+        if isinstance(error.error, dict) and error.error:
+            for field, messages in error.error.items():
+                if not isinstance(messages, list):
+                    messages = [messages]
+                for message in messages:
+                    self._add(error.row_numer, self._field_id(field), message)
+        else:
+            self._add(error.row_numer, NO_FIELD, error.error)
+
+    def extend(self, errors: Iterable[CSVValidationError]) -> None:
+        for error in errors:
+            self.append(error)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[CSVValidationError]:
+        return self._errors(0, len(self))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return list(self)[index]
+            return list(self._errors(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("error index out of range")
+        return next(self._errors(index, index + 1))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (ErrorStore, list, tuple)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def matching(self, field_name: str, rule: Optional[str] = None) -> np.ndarray:
+        """
+        Indexes of the errors with a failure on ``field_name``, of ``rule`` if given,
+        the same errors error_summary.fails_rule accepts. Found from the entry arrays
+        without building the errors, plain messages are on field "".
+        """
+        entries = self._entries(0, self.entries)
+        mask = np.zeros(len(entries), dtype=bool)
+        kinds = []
+        if field_name in self.field_ids:
+            kinds.append((self.field_ids[field_name], _field_rule))
+        if field_name == "":
+            kinds.append((NO_FIELD, lambda message: rule_for(str(message))))
+        for field_id, rule_of in kinds:
+            found = entries["field"] == field_id
+            if rule is not None:
+                ids = [i for i, m in enumerate(self.messages) if rule_of(m) == rule]
+                found &= np.isin(entries["message"], ids)
+            mask |= found
+        starts = np.frombuffer(self.starts, dtype="<i8")
+        return np.unique(np.searchsorted(starts, np.flatnonzero(mask), side="right") - 1)
+
+    def save(self, file: BinaryIO) -> None:
+        tables = json.dumps(
+            {
+                "fields": self.fields,
+                "messages": self.messages,
+                "summary": self.summary.to_dict(),
+            },
+            default=str,
+        )
+        np.savez(
+            file,
+            starts=np.frombuffer(self.starts, dtype="<i8"),
+            entries=self._entries(0, self.entries),
+            tables=np.frombuffer(tables.encode(), dtype=np.uint8),
+        )
+
+    @classmethod
+    def load(
+        cls, file: Path | BinaryIO, spill_entries: int = SPILL_ENTRIES, folder: Optional[str] = None
+    ) -> Self:
+        store = cls(spill_entries=spill_entries, folder=folder)
+        with np.load(file) as data:
+            tables = json.loads(data["tables"].tobytes())
+            store.starts.frombytes(data["starts"].astype("<i8").tobytes())
+            entries = data["entries"]
+        store.fields = tables["fields"]
+        store.messages = tables["messages"]
+        store.field_ids = {field: i for i, field in enumerate(store.fields)}
+        store.message_ids = {_message_key(m): i for i, m in enumerate(store.messages)}
+        store.summary = ErrorSummary.from_dict(tables["summary"])
+        for start in range(0, len(entries), spill_entries):
+            block = entries[start : start + spill_entries]
+            store.rows.frombytes(block["row"].astype("<i8").tobytes())
+            store.field_column.frombytes(block["field"].astype("<i4").tobytes())
+            store.message_column.frombytes(block["message"].astype("<i4").tobytes())
+            if len(store.rows) >= spill_entries:
+                store._spill()
+        return store
+
+    def _field_id(self, field) -> int:
+        field = str(field)
+        if field not in self.field_ids:
+            self.field_ids[field] = len(self.fields)
+            self.fields.append(field)
+        return self.field_ids[field]
+
+    def _add(self, row: int, field_id: int, message) -> None:
+        key = _message_key(message)
+        if key not in self.message_ids:
+            self.message_ids[key] = len(self.messages)
+            self.messages.append(message)
+        self.rows.append(int(row))
+        self.field_column.append(field_id)
+        self.message_column.append(self.message_ids[key])
+        if len(self.rows) >= self.spill_entries:
+            self._spill()
+
+    def _spill(self) -> None:
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(
+                dir=self.folder, prefix="errors-", suffix=".bin"
+            )
+        self.spill_file.seek(0, 2)
+        self._buffered(0, len(self.rows)).tofile(self.spill_file)
+        self.spilled += len(self.rows)
+        del self.rows[:], self.field_column[:], self.message_column[:]
+
+    def _buffered(self, start: int, stop: int) -> np.ndarray:
+        block = np.empty(stop - start, dtype=ENTRY)
+        block["row"] = np.frombuffer(self.rows, dtype="<i8")[start:stop]
+        block["field"] = np.frombuffer(self.field_column, dtype="<i4")[start:stop]
+        block["message"] = np.frombuffer(self.message_column, dtype="<i4")[start:stop]
+        return block
+
+    def _entries(self, start: int, stop: int) -> np.ndarray:
+        """Entries ``start`` to ``stop``, read from the spill file where needed."""
+        parts = []
+        if start < self.spilled:
+            self.spill_file.seek(start * ENTRY.itemsize)
+            count = min(stop, self.spilled) - start
+            parts.append(np.fromfile(self.spill_file, dtype=ENTRY, count=count))
+        if stop > self.spilled:
+            parts.append(
+                self._buffered(max(start, self.spilled) - self.spilled, stop - self.spilled)
+            )
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=ENTRY)
+
+    def _errors(self, first: int, last: int) -> Iterator[CSVValidationError]:
+        # Read entries in blocks so iterating a spilled store stays in constant memory
+        for block_start in range(first, last, READ_ENTRIES):
+            block_end = min(block_start + READ_ENTRIES, last)
+            start = self.starts[block_start]
+            entries = self._entries(start, self._end(block_end - 1))
+            rows = entries["row"].tolist()
+            fields = entries["field"].tolist()
+            messages = entries["message"].tolist()
+            for index in range(block_start, block_end):
+                begin = self.starts[index] - start
+                end = self._end(index) - start
+                if end - begin == 1 and fields[begin] == NO_FIELD:
+                    error = self.messages[messages[begin]]
+                else:
+                    error = {}
+                    for field, message in zip(fields[begin:end], messages[begin:end]):
+                        error.setdefault(self.fields[field], []).append(
+                            self.messages[message]
+                        )
+                yield CSVValidationError(row_numer=rows[begin], error=error)
+
+    def _end(self, index: int) -> int:
+        """Index one past the last entry of error ``index``."""
+        return self.starts[index + 1] if index + 1 < len(self) else self.entries
+
+
+def _field_rule(message) -> str:
+    return rule_for(message) if isinstance(message, str) else "schema"
+
+
+def _message_key(message) -> tuple[bool, str]:
+    if isinstance(message, str):
+        return True, message
+    return False, json.dumps(message, sort_keys=True, default=str)
@@ -0,0 +1,150 @@
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Self
+
+from cerberus import errors as cerberus_errors
+
+from app.models.process import CSVValidationError
+from app.models.schema import REFERENCE_MESSAGE, UNIQUE_MESSAGE
+
+SAMPLE_ROWS = 5
+
+
+def _message_patterns() -> list[tuple[re.Pattern, str]]:
+    """Regexes matching Cerberus' default messages, with the rule each comes from."""
+    messages = cerberus_errors.BasicErrorHandler.messages
+    patterns = []
+    for definition in vars(cerberus_errors).values():
+        if not isinstance(definition, cerberus_errors.ErrorDefinition):
+            continue
+        template = messages.get(definition.code)
+        if not definition.rule or not template or template == "{0}":
+            continue
+        pattern = re.escape(template)
+        pattern = pattern.replace(re.escape("{constraint}"), "(?P<constraint>.*)", 1)
+        pattern = re.sub(r"\\\{\w+\\\}", ".*", pattern)
+        patterns.append((re.compile(pattern + "$"), definition.rule))
+    # Cross row rules are checked outside Cerberus
+    patterns.append((re.compile(re.escape(UNIQUE_MESSAGE) + "$"), "unique"))
+    pattern = re.escape(REFERENCE_MESSAGE).replace(
+        re.escape("{constraint}"), "(?P<constraint>.*)"
+    )
+    patterns.append((re.compile(pattern + "$"), "references"))
+    return patterns
+
+
+_PATTERNS = _message_patterns()
+
+
+@lru_cache(maxsize=1024)
+def rule_for(message: str) -> str:
+    """
+    The rule behind a Cerberus message, with its constraint where the message has one,
+    e.g. "must be of float type" is "type=float". Unknown messages are their own rule.
+    """
+    for pattern, rule in _PATTERNS:
+        match = pattern.match(message)
+        if match:
+            constraint = match.groupdict().get("constraint")
+            return f"{rule}={constraint}" if constraint else rule
+    return message
+
+
+@dataclass
+class RuleSummary:
+    field: str
+    rule: str
+    message: str
+    count: int = field(default=0)
+    first_row: Optional[int] = field(default=None)
+    sample_rows: list[int] = field(default_factory=list)
+
+    def add(self, row: int) -> None:
+        self.count += 1
+        if self.first_row is None:
+            self.first_row = row
+        if len(self.sample_rows) < SAMPLE_ROWS:
+            self.sample_rows.append(row)
+
+    def describe(self) -> str:
+        return f"{self.count:,} rows fail {self.rule}, first at row {self.first_row}"
+
+    def to_dict(self) -> dict:
+        return {
+            "field": self.field,
+            "rule": self.rule,
+            "message": self.message,
+            "count": self.count,
+            "first_row": self.first_row,
+            "sample_rows": self.sample_rows,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        return cls(**data)
+
+
+class ErrorSummary:
+    """
+    Row counts, first row and a few sample rows per field and rule. Memory only grows
+    with the number of distinct field and rule pairs, not with the number of errors.
+    """
+
+    def __init__(self, errors: Iterable[CSVValidationError] = ()) -> None:
+        self.rules: dict[tuple[str, str], RuleSummary] = {}
+        for error in errors:
+            self.add(error)
+
+    def add(self, error: CSVValidationError) -> None:
+        row = int(error.row_numer)
+        seen = set()
+        for field_name, rule, message in _failures(error):
+            key = (field_name, rule)
+            if key in seen:
+                continue
+            seen.add(key)
+            if key not in self.rules:
+                self.rules[key] = RuleSummary(field_name, rule, str(message))
+            self.rules[key].add(row)
+
+    def __iter__(self) -> Iterator[RuleSummary]:
+        """Most frequent failures first."""
+        return iter(sorted(self.rules.values(), key=lambda r: r.count, reverse=True))
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def to_dict(self) -> list[dict]:
+        return [rule.to_dict() for rule in self]
+
+    @classmethod
+    def from_dict(cls, data: list[dict]) -> Self:
+        summary = cls()
+        for rule in data:
+            rule = RuleSummary.from_dict(rule)
+            summary.rules[(rule.field, rule.rule)] = rule
+        return summary
+
+
+def fails_rule(
+    error: CSVValidationError, field_name: str, rule: Optional[str] = None
+) -> bool:
+    """Whether ``error`` has a failure on ``field_name``, of ``rule`` if given."""
+    return any(
+        name == field_name and rule in (None, failed)
+        for name, failed, _ in _failures(error)
+    )
+
+
+def _failures(error: CSVValidationError) -> Iterator[tuple[str, str, object]]:
+    """Field, rule and message of each failure, nested messages count as "schema"."""
+    if not isinstance(error.error, dict):
+        yield "", rule_for(str(error.error)), error.error
+        return
+    for field_name, messages in error.error.items():
+        if not isinstance(messages, list):
+            messages = [messages]
+        for message in messages:
+            rule = rule_for(message) if isinstance(message, str) else "schema"
+            yield str(field_name), rule, message
@@ -3,12 +3,20 @@ from dataclasses import dataclass, field
 from app.models.schema import Schema
 
 
+@dataclass(frozen=True)
+class FieldMatch:
+    field: str
+    score: float
+
+
 @dataclass
 class InspectionResult:
     schema: Schema
     columns: list[str] = field(default_factory=set)
     sample: list[dict] = field(default_factory=list)
     suggestions: dict[str, str] = field(default_factory=list)
+    # Candidate fields per column, best first
+    alternatives: dict[str, list[FieldMatch]] = field(default_factory=dict)
 
     @property
     def score(self) -> float:
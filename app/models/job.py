@@ -0,0 +1,89 @@
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Optional, Self
+from uuid import UUID
+
+from app.models.process import (
+    CSVValidationRequest,
+    CSVValidationResponse,
+    CSVValidationError,
+)
+
+
+class JobStatus(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass
+class ValidationJob:
+    request: CSVValidationRequest
+    status: JobStatus = field(default=JobStatus.PENDING)
+    processed_rows: int = field(default=0)
+    total_rows: Optional[int] = field(default=None)
+    error_count: int = field(default=0)
+    result: Optional[CSVValidationResponse] = field(default=None)
+    message: Optional[str] = field(default=None)
+
+    @property
+    def id(self) -> UUID:
+        return self.request.id
+
+    @property
+    def progress(self) -> Optional[float]:
+        if self.status == JobStatus.DONE:
+            return 1.0
+        if not self.total_rows:
+            return None
+        return min(self.processed_rows / self.total_rows, 1.0)
+
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.FAILED)
+
+    def status_dict(self) -> dict:
+        return {
+            "id": str(self.id),
+            "status": str(self.status),
+            "processed_rows": self.processed_rows,
+            "total_rows": self.total_rows,
+            "error_count": self.error_count,
+            "progress": self.progress,
+            "message": self.message,
+        }
+
+    def to_dict(self, include_errors: bool = True) -> dict:
+        """Without ``include_errors`` the errors are left for the caller to store."""
+        request = self.request
+        result = self.result
+        errors = None
+        if result is not None and include_errors:
+            errors = [e.to_dict() for e in result.errors]
+        return {
+            **self.status_dict(),
+            "request": {
+                "file": request.file,
+                "schema": request.schema,
+                "mappings": request.mappings,
+                "error_threshold": request.error_threshold,
+            },
+            "errors": errors,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        request = CSVValidationRequest(id=UUID(data["id"]), **data["request"])
+        result = None
+        if data["errors"] is not None:
+            result = CSVValidationResponse.from_request(request)
+            result.errors = [CSVValidationError.from_dict(e) for e in data["errors"]]
+        return cls(
+            request=request,
+            status=JobStatus(data["status"]),
+            processed_rows=data["processed_rows"],
+            total_rows=data["total_rows"],
+            error_count=data["error_count"],
+            result=result,
+            message=data["message"],
+        )
@@ -0,0 +1,33 @@
+from dataclasses import dataclass, field
+from typing import Optional, Self
+
+
+@dataclass
+class MappingTemplate:
+    """Schema and column mappings saved for files with the same header layout."""
+
+    fingerprint: str
+    schema: str
+    columns: list[str] = field(default_factory=list)
+    # Schema field per column position, None for ignored columns
+    fields: list[Optional[str]] = field(default_factory=list)
+
+    def mappings(self, columns: list[str]) -> dict[str, str]:
+        """Mappings for a file's own column names, which may be written differently."""
+        return {
+            column: field_name
+            for column, field_name in zip(columns, self.fields)
+            if field_name
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "schema": self.schema,
+            "columns": self.columns,
+            "fields": self.fields,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        return cls(**data)
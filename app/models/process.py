@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import Self
+from typing import Optional, Self, Sequence
 
 from app.models.schema import Schema
 from uuid import UUID
@@ -15,7 +15,8 @@ class CSVValidationRequest:
     id: UUID
     file: str
     schema: str
-    mappings: dict[str, str] = field(default_factory=dict)
+    # Field per column, None for ignored columns. Columns left out keep their names
+    mappings: dict[str, Optional[str]] = field(default_factory=dict)
     error_threshold: int = field(default=100)
 
 
@@ -24,13 +25,21 @@ class CSVValidationError:
     row_numer: int
     error: str
 
+    def to_dict(self) -> dict:
+        return {"row": int(self.row_numer), "error": self.error}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        return cls(row_numer=data["row"], error=data["error"])
+
 
 @dataclass
 class CSVValidationResponse:
     request_id: UUID
     file: str
     schema: str
-    errors: list[CSVValidationError] = field(default_factory=list)
+    # A list or, for results of a validation run, an ErrorStore
+    errors: Sequence[CSVValidationError] = field(default_factory=list)
 
     def is_valid(self) -> bool:
         return len(self.errors) == 0
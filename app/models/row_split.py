@@ -0,0 +1,14 @@
+from dataclasses import asdict, dataclass, field
+
+
+@dataclass
+class RowSplit:
+    """Where the clean and rejected rows of a file were written, and how many."""
+
+    clean: str
+    rejects: str
+    clean_rows: int = field(default=0)
+    rejected_rows: int = field(default=0)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
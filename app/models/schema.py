@@ -1,7 +1,32 @@
 from dataclasses import dataclass, field
 from pathlib import Path
+import hashlib
 import json
 
+# Rules that compare a value with other rows or files, checked while streaming
+# chunks instead of by Cerberus
+CROSS_ROW_RULES = ("unique", "primary_key", "references")
+UNIQUE_MESSAGE = "value is not unique"
+REFERENCE_MESSAGE = "value not found in {constraint}"
+
+
+def normalize_column_name(col) -> str:
+    return str(col).lower().replace(" ", "_")
+
+
+def row_rules(rules: dict) -> dict:
+    """The rules of a field that apply to each row on its own."""
+    rules = rules or {}
+    row = {rule: value for rule, value in rules.items() if rule not in CROSS_ROW_RULES}
+    if rules.get("primary_key"):
+        # Primary keys must be present as well as unique, nullable defaults to False
+        row.setdefault("required", True)
+    return row
+
+
+def definition_hash(definition: dict) -> str:
+    return hashlib.sha256(json.dumps(definition, sort_keys=True).encode()).hexdigest()
+
 
 @dataclass
 class Schema:
@@ -10,3 +35,16 @@ class Schema:
 
     def fields(self) -> set[str]:
         return set(self.definition.keys())
+
+    def row_definition(self) -> dict:
+        """The definition without cross row rules, as Cerberus understands it."""
+        return {name: row_rules(rules) for name, rules in self.definition.items()}
+
+    def cross_row_fields(self) -> dict[str, dict]:
+        """Cross row rules by field, for the fields that have any."""
+        cross = {
+            name: {rule: rules[rule] for rule in CROSS_ROW_RULES if rules.get(rule)}
+            for name, rules in self.definition.items()
+            if rules
+        }
+        return {name: rules for name, rules in cross.items() if rules}
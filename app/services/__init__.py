@@ -1,13 +1,63 @@
+from functools import partial
+from typing import Optional
+
+from .checkpoints import CheckpointStore, LocalCheckpointStore
 from .csv_service import CSVServiceImpl
 from .csv_storage import LocalFileStorage, AppendDateToFileName
+from .mapped_storage import MappedFileStorage
+from .mapping_templates import TemplateStore, LocalTemplateStore
+from .result_cache import ResultCache, LocalResultCache
 from .schema_registry import SchemaRegistry, SchemaRepository, LocalSchemaRepository
+from .validation_queue import ValidationQueue, JobStore, LocalJobStore
+
+
+STORAGE_BACKENDS = {"local": LocalFileStorage, "mapped": MappedFileStorage}
+
+
+def build_csv_service(
+    upload_folder: str,
+    schema_folder: str,
+    result_folder: str,
+    storage: str = "local",
+    checkpoint_folder: Optional[str] = None,
+) -> CSVServiceImpl:
+    return CSVServiceImpl(
+        STORAGE_BACKENDS[storage](upload_folder),
+        SchemaRegistry(LocalSchemaRepository(schema_folder)),
+        LocalResultCache(result_folder),
+        checkpoint_store=LocalCheckpointStore(checkpoint_folder)
+        if checkpoint_folder
+        else None,
+    )
 
 
 def init_services(app):
-    app.file_storage = LocalFileStorage(
+    app.file_storage = STORAGE_BACKENDS[app.config["CSV_STORAGE"]](
         app.config["UPLOAD_FOLDER"], AppendDateToFileName()
     )
     app.schema_registry = SchemaRegistry(
-        LocalSchemaRepository(app.config["SCHEMA_FOLDER"])
+        LocalSchemaRepository(app.config["SCHEMA_FOLDER"]),
+        reload_interval=app.config["SCHEMA_RELOAD_INTERVAL"],
+    )
+    app.result_cache = LocalResultCache(app.config["RESULT_FOLDER"])
+    app.csv_service = CSVServiceImpl(
+        app.file_storage,
+        app.schema_registry,
+        app.result_cache,
+        sample_rows=app.config["INSPECT_SAMPLE_ROWS"],
+        template_store=LocalTemplateStore(app.config["TEMPLATE_FOLDER"]),
+    )
+    app.validation_queue = ValidationQueue(
+        LocalJobStore(app.config["JOB_FOLDER"]),
+        app.file_storage,
+        partial(
+            build_csv_service,
+            app.config["UPLOAD_FOLDER"],
+            app.config["SCHEMA_FOLDER"],
+            app.config["RESULT_FOLDER"],
+            app.config["CSV_STORAGE"],
+            app.config["CHECKPOINT_FOLDER"],
+        ),
+        app.config["JOB_FOLDER"],
+        max_workers=app.config["VALIDATION_WORKERS"],
     )
-    app.csv_service = CSVServiceImpl(app.file_storage, app.schema_registry)
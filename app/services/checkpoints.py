@@ -0,0 +1,77 @@
+import json
+import logging
+import os
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Optional, Protocol
+from uuid import UUID
+
+from app.models.checkpoint import ValidationCheckpoint
+from app.models.error_store import ErrorStore
+
+logger = logging.getLogger(__name__)
+
+# Files smaller than this are validated without checkpoints
+CHECKPOINT_MIN_BYTES = 64 * 1024 * 1024
+# Seconds of validation between checkpoints
+CHECKPOINT_INTERVAL = 10.0
+
+
+class CheckpointStore(Protocol):
+    def get(self, request_id: UUID) -> Optional[ValidationCheckpoint]: ...
+    def save(self, checkpoint: ValidationCheckpoint) -> None: ...
+    def delete(self, request_id: UUID) -> None: ...
+
+
+class LocalCheckpointStore(CheckpointStore):
+    """
+    A JSON file per request naming the ErrorStore file saved with it. Errors go to a
+    new file each time and the JSON is replaced after, so a crash while saving
+    leaves the previous checkpoint whole.
+    """
+
+    def __init__(self, checkpoint_folder: str) -> None:
+        self.path = Path(checkpoint_folder)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def get(self, request_id: UUID) -> Optional[ValidationCheckpoint]:
+        try:
+            with open(self.path / f"{request_id}.json") as f:
+                data = json.load(f)
+            errors = ErrorStore.load(self.path / data["errors"], folder=str(self.path))
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring broken checkpoint of {request_id}: {e}")
+            return None
+        return ValidationCheckpoint.from_dict(data, errors)
+
+    def save(self, checkpoint: ValidationCheckpoint) -> None:
+        previous = self._errors_file(checkpoint.request_id)
+        errors_file = f"{checkpoint.request_id}.{uuid.uuid4().hex}.npz"
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=self.path, suffix=".part", delete=False
+        ) as f:
+            checkpoint.errors.save(f)
+        os.replace(f.name, self.path / errors_file)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.path, suffix=".part", delete=False
+        ) as f:
+            json.dump({**checkpoint.to_dict(), "errors": errors_file}, f)
+        os.replace(f.name, self.path / f"{checkpoint.request_id}.json")
+        if previous is not None:
+            (self.path / previous).unlink(missing_ok=True)
+
+    def delete(self, request_id: UUID) -> None:
+        errors_file = self._errors_file(request_id)
+        (self.path / f"{request_id}.json").unlink(missing_ok=True)
+        if errors_file is not None:
+            (self.path / errors_file).unlink(missing_ok=True)
+
+    def _errors_file(self, request_id: UUID) -> Optional[str]:
+        try:
+            with open(self.path / f"{request_id}.json") as f:
+                return json.load(f).get("errors")
+        except (FileNotFoundError, ValueError):
+            return None
@@ -0,0 +1,136 @@
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.schema_compiler import KIND_TYPES, TYPES, matches_type
+
+# Rules a profile can decide, anything else falls back to Cerberus
+PROFILE_RULES = {"type", "required", "nullable", "regex", "min", "max", "allowed", "meta"}
+
+
+@dataclass
+class ColumnProfile:
+    """
+    What a column's values look like, computed once with vectorized operations so that
+    every schema field can be matched against it without running Cerberus per value.
+    ``kind`` is "integer", "float", "boolean", "string", "empty" or "mixed".
+    """
+
+    name: str
+    size: int
+    kind: str
+    null_ratio: float
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    # The column as read and its non-null values
+    column: pd.Series = field(default=None, repr=False)
+    values: pd.Series = field(default=None, repr=False)
+    masks: dict = field(default_factory=dict, repr=False)
+
+    def regex_hit_rate(self, pattern: str) -> float:
+        if not len(self.values):
+            return 0.0
+        return float(self._regex_mask(pattern).mean())
+
+    def match_rate(self, rules: dict) -> Optional[float]:
+        """
+        Share of values Cerberus would accept for ``rules``, or None when the rules or
+        the column's values can't be decided from the profile. Missing values match
+        only nullable fields. That differs from Cerberus for blanks read as float NaN,
+        which it accepts as floats, but a blank says nothing about which field a
+        column holds.
+        """
+        rules = rules or {}
+        if self.kind == "mixed" or not set(rules) <= PROFILE_RULES:
+            return None
+        nulls = self.null_ratio if rules.get("nullable") else 0.0
+        if self.kind == "empty":
+            return nulls
+
+        mask = np.ones(len(self.values), dtype=bool)
+        if "type" in rules:
+            types = rules["type"]
+            types = [types] if isinstance(types, str) else list(types)
+            if any(t not in TYPES for t in types):
+                return None
+            if not any(self._matches_type(t) for t in types):
+                return nulls
+        for bound in ("min", "max"):
+            if bound not in rules:
+                continue
+            if self.kind == "string":
+                return None
+            values = self.values.to_numpy()
+            try:
+                inside = values >= rules[bound] if bound == "min" else values <= rules[bound]
+            except TypeError:
+                return None
+            mask &= inside
+        if "regex" in rules and self.kind == "string":
+            mask &= self._regex_mask(rules["regex"])
+        if "allowed" in rules:
+            mask &= self._allowed_mask(rules["allowed"])
+        return float(mask.sum()) / self.size + nulls
+
+    def _matches_type(self, type_name: str) -> bool:
+        if self.kind == "string":
+            return matches_type("", type_name)
+        return matches_type(KIND_TYPES[self.values.dtype.kind](), type_name)
+
+    def _regex_mask(self, pattern: str) -> np.ndarray:
+        key = ("regex", pattern)
+        if key not in self.masks:
+            # Cerberus matches from the start and requires the whole value to match
+            regex = re.compile(pattern if pattern.endswith("$") else pattern + "$")
+            self.masks[key] = self.values.map(
+                lambda v: regex.match(v) is not None
+            ).to_numpy(dtype=bool)
+        return self.masks[key]
+
+    def _allowed_mask(self, allowed: Iterable) -> np.ndarray:
+        key = ("allowed", tuple(allowed))
+        if key not in self.masks:
+            self.masks[key] = self.values.isin(list(allowed)).to_numpy(dtype=bool)
+        return self.masks[key]
+
+
+def _kind(series: pd.Series) -> str:
+    if not len(series):
+        return "empty"
+    kind = series.dtype.kind
+    if kind in ("i", "u"):
+        return "integer"
+    if kind == "f":
+        return "float"
+    if kind == "b":
+        return "boolean"
+    if isinstance(series.dtype, pd.StringDtype):
+        return "string"
+    if kind == "O" and series.map(type).eq(str).all():
+        return "string"
+    return "mixed"
+
+
+def profile_column(series: pd.Series, name: Optional[str] = None) -> ColumnProfile:
+    values = series.dropna()
+    kind = _kind(values)
+    if kind == "string" and values.dtype.kind == "O":
+        values = values.astype(str)
+    numeric = kind in ("integer", "float")
+    return ColumnProfile(
+        name=str(series.name if name is None else name),
+        size=len(series),
+        kind=kind,
+        null_ratio=(len(series) - len(values)) / len(series) if len(series) else 0.0,
+        minimum=values.min() if numeric else None,
+        maximum=values.max() if numeric else None,
+        column=series,
+        values=values,
+    )
+
+
+def profile_frame(df: pd.DataFrame) -> list[ColumnProfile]:
+    return [profile_column(df.iloc[:, i], str(col)) for i, col in enumerate(df.columns)]
@@ -0,0 +1,252 @@
+import tempfile
+from dataclasses import dataclass
+from typing import Optional, Self
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from app.models.schema import REFERENCE_MESSAGE, UNIQUE_MESSAGE, Schema
+
+# Key hashes held in memory before they are spilled to a sorted run on disk
+MEMORY_KEYS = 1_000_000
+# Size of the Bloom filter in front of the spilled runs, 16 MiB
+BLOOM_BITS = 1 << 27
+BLOOM_HASHES = 3
+
+
+def key_hashes(series: pd.Series) -> np.ndarray:
+    """
+    64 bit hashes of the values as text, so that 1 in one file and 1.0 in a float
+    column of another are the same key. Text is hashed as written, "001" isn't "1".
+    """
+    if series.dtype.kind == "f":
+        values = series.to_numpy()
+        if (np.abs(values) < 2**53).all() and (values == np.round(values)).all():
+            series = series.astype("Int64")
+    return pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy()
+
+
+class SeenKeys:
+    """
+    Set of 64 bit key hashes with bounded memory. The newest ``memory_keys`` hashes are
+    kept in a sorted array, older ones in sorted runs in temporary files. A Bloom
+    filter over the runs means only keys that were probably seen before are looked up
+    on disk.
+    """
+
+    def __init__(
+        self, memory_keys: int = MEMORY_KEYS, bloom_bits: int = BLOOM_BITS
+    ) -> None:
+        if bloom_bits & (bloom_bits - 1):
+            raise ValueError(f"bloom_bits must be a power of two, got {bloom_bits}")
+        self.memory_keys = memory_keys
+        self.bloom_bits = bloom_bits
+        self.memory = np.empty(0, dtype=np.uint64)
+        self.bloom: Optional[np.ndarray] = None
+        self.runs: list[np.memmap] = []
+        self.files: list = []
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, hashes: np.ndarray) -> np.ndarray:
+        """Add ``hashes``, True where a hash was seen before, earlier ones included."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        order = np.argsort(hashes, kind="stable")
+        ordered = hashes[order]
+        found = self._contains_sorted(ordered)
+        # Later occurrences of a hash repeated within the batch
+        found[1:] |= ordered[1:] == ordered[:-1]
+
+        new = ordered[~found]
+        if len(new):
+            # Inserting keeps memory sorted without sorting it again
+            self.memory = np.insert(self.memory, np.searchsorted(self.memory, new), new)
+            self.size += len(new)
+            if len(self.memory) >= self.memory_keys:
+                self._spill()
+        seen = np.empty(len(hashes), dtype=bool)
+        seen[order] = found
+        return seen
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        order = np.argsort(hashes)
+        found = np.empty(len(hashes), dtype=bool)
+        found[order] = self._contains_sorted(hashes[order])
+        return found
+
+    def _contains_sorted(self, hashes: np.ndarray) -> np.ndarray:
+        # Sorted lookups walk memory and runs in order, which keeps them cache friendly
+        found = _sorted_contains(self.memory, hashes)
+        if not self.runs:
+            return found
+        candidates = np.flatnonzero(~found & self._bloom_contains(hashes))
+        for run in self.runs:
+            if not len(candidates):
+                break
+            hit = _sorted_contains(run, hashes[candidates])
+            found[candidates[hit]] = True
+            candidates = candidates[~hit]
+        return found
+
+    def close(self) -> None:
+        self.runs.clear()
+        for f in self.files:
+            f.close()
+        self.files.clear()
+
+    def _spill(self) -> None:
+        f = tempfile.TemporaryFile()
+        self.memory.tofile(f)
+        f.flush()
+        self.files.append(f)
+        self.runs.append(np.memmap(f, dtype=np.uint64, mode="r"))
+        if self.bloom is None:
+            self.bloom = np.zeros(self.bloom_bits // 8, dtype=np.uint8)
+        for position in self._bloom_positions(self.memory):
+            # One pass per bit, repeated bytes within a pass all get the same value
+            bits = position & np.uint64(7)
+            for bit in range(8):
+                index = position[bits == bit] >> np.uint64(3)
+                self.bloom[index] |= np.uint8(1 << bit)
+        self.memory = np.empty(0, dtype=np.uint64)
+
+    def _bloom_contains(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.ones(len(hashes), dtype=bool)
+        for position in self._bloom_positions(hashes):
+            found &= (self.bloom[position >> 3] >> (position & 7)) & 1 == 1
+        return found
+
+    def _bloom_positions(self, hashes: np.ndarray) -> list[np.ndarray]:
+        # Double hashing, both halves of the 64 bit hash give the probe sequence
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = (hashes >> np.uint64(32)) | np.uint64(1)
+        mask = np.uint64(self.bloom_bits - 1)
+        return [(low + np.uint64(i) * high) & mask for i in range(BLOOM_HASHES)]
+
+
+def _sorted_contains(values: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    if not len(values):
+        return np.zeros(len(hashes), dtype=bool)
+    index = np.minimum(np.searchsorted(values, hashes), len(values) - 1)
+    return values[index] == hashes
+
+
+@dataclass(frozen=True)
+class Reference:
+    file: str
+    column: str
+
+    @classmethod
+    def parse(cls, target: str) -> Self:
+        """``<file>.<column>``, split at the last dot so file names keep theirs."""
+        file, _, column = str(target).rpartition(".")
+        if not file or not column:
+            raise ValueError(f"references must look like <file>.<column>, got {target}")
+        return cls(file, column)
+
+    def __str__(self) -> str:
+        return f"{self.file}.{self.column}"
+
+
+def references(schema: Schema) -> dict[str, Reference]:
+    """Referenced file and column by field."""
+    return {
+        name: Reference.parse(rules["references"])
+        for name, rules in schema.cross_row_fields().items()
+        if "references" in rules
+    }
+
+
+class RowConstraints:
+    """
+    Checks the cross row rules of a schema on chunks in file order. Values of
+    ``unique`` and ``primary_key`` fields may appear once per file, later repeats are
+    errors. Values of ``references`` fields must appear in the column of the other
+    file. Missing values pass both, ``primary_key`` fields are required by the row
+    rules instead.
+    """
+
+    def __init__(
+        self,
+        unique: dict[str, SeenKeys],
+        referenced: dict[str, tuple[Reference, SeenKeys]],
+    ) -> None:
+        self.unique = unique
+        self.referenced = referenced
+
+    @classmethod
+    def build(
+        cls, schema: Schema, csv_store, memory_keys: int = MEMORY_KEYS
+    ) -> Optional[Self]:
+        """Constraints of ``schema``, None when it has no cross row rules."""
+        cross = schema.cross_row_fields()
+        if not cross:
+            return None
+        unique = {
+            name: SeenKeys(memory_keys)
+            for name, rules in cross.items()
+            if rules.get("unique") or rules.get("primary_key")
+        }
+        referenced = {
+            name: (reference, _load_keys(csv_store, reference, memory_keys))
+            for name, reference in references(schema).items()
+        }
+        return cls(unique, referenced)
+
+    def observe(self, chunk: DataFrame) -> None:
+        """Remember the unique values of an already validated chunk."""
+        for name, seen in self.unique.items():
+            if name in chunk.columns:
+                seen.add(key_hashes(chunk[name].dropna()))
+
+    def check(self, chunk: DataFrame) -> dict[int, dict[str, list[str]]]:
+        """Errors by position in the chunk, of the rows breaking a constraint."""
+        errors: dict[int, dict[str, list[str]]] = {}
+
+        def report(name: str, positions: np.ndarray, message: str) -> None:
+            for position in positions.tolist():
+                errors.setdefault(position, {}).setdefault(name, []).append(message)
+
+        for name, seen in self.unique.items():
+            if name not in chunk.columns:
+                continue
+            present = chunk[name].notna().to_numpy()
+            hashes = key_hashes(chunk[name][present])
+            report(name, np.flatnonzero(present)[seen.add(hashes)], UNIQUE_MESSAGE)
+
+        for name, (reference, keys) in self.referenced.items():
+            if name not in chunk.columns:
+                continue
+            present = chunk[name].notna().to_numpy()
+            missing = ~keys.contains(key_hashes(chunk[name][present]))
+            message = REFERENCE_MESSAGE.format(constraint=reference)
+            report(name, np.flatnonzero(present)[missing], message)
+        return errors
+
+    def close(self) -> None:
+        for seen in self.unique.values():
+            seen.close()
+        for _, keys in self.referenced.values():
+            keys.close()
+
+
+def _load_keys(csv_store, reference: Reference, memory_keys: int) -> SeenKeys:
+    keys = SeenKeys(memory_keys)
+    # Read as text, the way string fields of the validated file are read
+    text = Schema(name=str(reference), definition={reference.column: {"type": "string"}})
+    try:
+        chunks = csv_store.read_chunk(reference.file, schema=text)
+    except FileNotFoundError:
+        chunks = None
+    if chunks is None:
+        raise ValueError(f"Referenced file {reference.file} not found")
+    for chunk in chunks:
+        chunk.columns = chunk.columns.astype(str)
+        if reference.column not in chunk.columns:
+            raise ValueError(f"Column {reference.column} not found in {reference.file}")
+        keys.add(key_hashes(chunk[reference.column].dropna()))
+    return keys
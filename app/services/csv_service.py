@@ -1,83 +1,263 @@
 import logging
-from typing import Protocol
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.synchronize import Event
+from pathlib import Path
+from typing import Callable, Generator, Iterator, Optional, Protocol
+import numpy as np
+import pandas as pd
+from cerberus import Validator
 from pandas import DataFrame
 from werkzeug.datastructures import FileStorage
 
-from app.models.schema import Schema
+from app.models.checkpoint import ValidationCheckpoint
+from app.models.error_store import ErrorStore
+from app.models.schema import Schema, normalize_column_name
 from app.models.inspection import InspectionResult
+from app.models.mapping_template import MappingTemplate
+from app.models.row_split import RowSplit
 from app.models.process import (
     CSVValidationRequest,
     CSVValidationResponse,
     CSVValidationError,
 )
-from app.services.csv_storage import CSVStorage
-from app.services.schema_registry import SchemaRegistry
-from cerberus import Validator
+from app.services.column_profile import ColumnProfile, profile_frame
+from app.services.constraints import RowConstraints, references
+from app.services.checkpoints import (
+    CHECKPOINT_INTERVAL,
+    CHECKPOINT_MIN_BYTES,
+    CheckpointStore,
+)
+from app.services.csv_storage import SAMPLE_ROWS, CSVStorage, single_byte_newlines
+from app.services.field_matching import could_match, score_fields
+from app.services.mapping_templates import TemplateStore
+from app.services.read_hints import read_hints
+from app.services.result_cache import ResultCache, result_key
+from app.services.row_writers import CSVRowWriter, coerce, open_writer, rejected_rows
+from app.services.schema_compiler import CompiledSchema, compile_schema
+from app.services.schema_registry import SchemaEntry, SchemaRegistry
+from app.services.validator_cache import validator_cache
 
 logger = logging.getLogger(__name__)
 
+PREVIEW_ROWS = 5
+
 
 class CsvService(Protocol):
     def available_schemas(self) -> list[str]: ...
     def upload_file(self, file: FileStorage) -> str: ...
-    def validate(self, request: CSVValidationRequest) -> CSVValidationResponse: ...
+    def validate(
+        self,
+        request: CSVValidationRequest,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> CSVValidationResponse: ...
+    def stream_errors(
+        self,
+        request: CSVValidationRequest,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> Iterator[CSVValidationError]: ...
+    def validate_parallel(
+        self, request: CSVValidationRequest, workers: Optional[int] = None
+    ) -> CSVValidationResponse: ...
     def inspect(
-        self, file_path: str, schema: str = "default", sample_size=5
+        self, file_path: str, schema: str = "default", sample_size: Optional[int] = None
     ) -> InspectionResult: ...
-    def recommend_schema(self, file_path: str, threshold: float = 0.8) -> Schema: ...
+    def recommend_schema(
+        self, file_path: str, threshold: float = 0.8, sample_size: Optional[int] = None
+    ) -> Schema: ...
+    def inspect_template(
+        self, file_path: str, schema: Optional[str] = None
+    ) -> Optional[InspectionResult]: ...
+    def save_template(
+        self, file_path: str, schema: str, mappings: dict[str, str]
+    ) -> None: ...
+    def split_rows(
+        self,
+        request: CSVValidationRequest,
+        folder: str,
+        output_format: str = "csv",
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> RowSplit: ...
 
 
-def guess_by_content(
-    sample: list, schema: Schema, suggestions: dict[str, str], threshold: float = 0.8
-) -> str | None:
-    validator = Validator(schema.definition, allow_unknown=True)
-    if sample is None:
-        return None
+def get_suggested_columns_mappings(
+    df: DataFrame, schema: Schema, threshold: float = 0.8
+) -> dict[str, str | None]:
+    return score_fields(df, schema, threshold).assignment()
 
-    for field_name, rules in schema.definition.items():
-        if field_name in suggestions.values():
-            continue
-        match_count = 0
-        for value in sample:
-            if validator.validate({field_name: value}, {field_name: rules}):
-                match_count += 1
 
-        if match_count / len(sample) > threshold:
-            return field_name
+def inspect(df: DataFrame, schema: Schema) -> InspectionResult:
+    df.columns = df.columns.astype(str)
+    columns = [str(col) for col in df.columns]
+    # Every sampled row is scored, only the first ones are shown
+    sample = df.head(PREVIEW_ROWS).to_dict(orient="records")
+    scores = score_fields(df, schema)
+    return InspectionResult(
+        schema, columns, sample, scores.assignment(), scores.alternatives()
+    )
 
-    return None
 
+def iter_errors(
+    chunks: Iterable[DataFrame],
+    schema: Schema,
+    mappings: dict[str, str],
+    error_threshold: int,
+    on_progress: Optional[Callable[[int], None]] = None,
+    cancelled: Optional[Event] = None,
+    compiled: Optional[CompiledSchema] = None,
+    constraints: Optional[RowConstraints] = None,
+    schema_hash: Optional[str] = None,
+) -> Iterator[CSVValidationError]:
+    """
+    Yield validation errors as each chunk is checked. ``on_progress`` is called once a
+    chunk's errors have been yielded. Cross row rules are only checked when
+    ``constraints`` are given, which expects the chunks in file order. ``schema_hash``
+    saves hashing the definition to look up the validator.
+    """
+    validator = validator_cache.validator(schema, schema_hash)
+    compiled = compiled or compile_schema(schema)
+    found = 0
+    processed = 0
+    for chunk in chunks:
+        chunk.columns = chunk.columns.astype(str)
+        chunk = chunk.rename(columns=mappings)
+        offset = chunk.index[0]
+        for index, errors in chunk_errors(chunk, validator, compiled, constraints):
+            # Calculate global row index based on chunk offset
+            found += 1
+            yield CSVValidationError(row_numer=offset + index, error=errors)
 
-def get_suggested_columns_mappings(
-    df: DataFrame, schema: Schema, threshold: float = 0.8
-) -> dict[str, str | None]:
-    sample = df.to_dict(orient="list")
-    schema_fields = schema.definition.keys()
-    suggestions = {}
-    for col in df.columns:
-        key = str(col)
-        normalized = str(col).lower().replace(" ", "_")
-        if normalized in schema_fields:
-            suggestions[key] = normalized
-            continue
+        processed += len(chunk)
+        if on_progress is not None:
+            on_progress(processed)
+        if found > error_threshold:
+            break
+        if cancelled is not None and cancelled.is_set():
+            break
 
-        suggestions[key] = guess_by_content(sample[col], schema, suggestions, threshold)
 
-    return suggestions
+def chunk_errors(
+    chunk: DataFrame,
+    validator: Validator,
+    compiled: CompiledSchema,
+    constraints: Optional[RowConstraints] = None,
+) -> list[tuple[int, dict]]:
+    """Position in the chunk and errors of each invalid row of a renamed chunk."""
+    # Only rows the compiled schema can't vouch for go through Cerberus
+    positions = np.flatnonzero(~compiled.valid_rows(chunk).to_numpy())
+    cross = constraints.check(chunk) if constraints is not None else {}
+    if cross:
+        positions = np.union1d(positions, list(cross))
+    records = chunk.iloc[positions].to_dict("records")
+    invalid = []
+    for index, record in zip(positions.tolist(), records):
+        errors = {} if validator.validate(record) else validator.errors
+        for field_name, messages in cross.get(index, {}).items():
+            errors.setdefault(field_name, []).extend(messages)
+        if errors:
+            invalid.append((index, errors))
+    return invalid
 
 
-def inspect(df: DataFrame, schema: Schema) -> InspectionResult:
-    df.columns = df.columns.astype(str)
-    columns = [str(col) for col in df.columns]
-    sample = df.to_dict(orient="records")
-    suggestions = get_suggested_columns_mappings(df, schema)
-    return InspectionResult(schema, columns, sample, suggestions)
+def validate_chunks(
+    chunks: Iterable[DataFrame],
+    schema: Schema,
+    mappings: dict[str, str],
+    error_threshold: int,
+    on_progress: Optional[Callable[[int], None]] = None,
+    cancelled: Optional[Event] = None,
+) -> tuple[int, list[CSVValidationError]]:
+    processed = 0
+
+    def progress(rows: int) -> None:
+        nonlocal processed
+        processed = rows
+        if on_progress is not None:
+            on_progress(rows)
+
+    errors = list(
+        iter_errors(chunks, schema, mappings, error_threshold, progress, cancelled)
+    )
+    return processed, errors
+
+
+_cancelled: Optional[Event] = None
+
+
+def _init_partition_worker(cancelled: Event) -> None:
+    global _cancelled
+    _cancelled = cancelled
+
+
+def _validate_partition(
+    csv_store: CSVStorage,
+    schema: Schema,
+    request: CSVValidationRequest,
+    start: int,
+    end: int,
+) -> tuple[int, list[CSVValidationError]]:
+    return validate_chunks(
+        csv_store.read_range(
+            request.file, start, end, schema=schema, mappings=request.mappings
+        ),
+        schema,
+        request.mappings,
+        request.error_threshold,
+        cancelled=_cancelled,
+    )
+
+
+def _content_bound(
+    df: DataFrame,
+    profiles: list[ColumnProfile],
+    entry: SchemaEntry,
+    matched: set[str],
+) -> int:
+    """
+    Most fields that columns without a name match could still get from their
+    content: no more than the columns whose type fits an open field, nor the open
+    fields whose type some such column fits.
+    """
+    open_fields = [f for n, f in entry.normalized_fields.items() if n not in matched]
+    pinned = set()
+    columns, fields = 0, set()
+    for col, profile in zip(df.columns, profiles):
+        normalized = normalize_column_name(col)
+        if normalized in matched and normalized not in pinned:
+            # The first column with a field's name keeps that field
+            pinned.add(normalized)
+            continue
+        fits = {f for f in open_fields if could_match(profile, entry.schema, f)}
+        columns += bool(fits)
+        fields |= fits
+    return min(columns, len(fields))
 
 
 class CSVServiceImpl(CsvService):
-    def __init__(self, csv_store: CSVStorage, schema_registry: SchemaRegistry) -> None:
+    def __init__(
+        self,
+        csv_store: CSVStorage,
+        schema_registry: SchemaRegistry,
+        result_cache: Optional[ResultCache] = None,
+        sample_rows: int = SAMPLE_ROWS,
+        template_store: Optional[TemplateStore] = None,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        checkpoint_bytes: int = CHECKPOINT_MIN_BYTES,
+        checkpoint_interval: float = CHECKPOINT_INTERVAL,
+    ) -> None:
         self.csv_store = csv_store
         self.schema_registry = schema_registry
+        self.result_cache = result_cache
+        self.sample_rows = sample_rows
+        self.template_store = template_store
+        # Files of at least checkpoint_bytes can resume where validation stopped
+        self.checkpoint_store = checkpoint_store
+        self.checkpoint_bytes = checkpoint_bytes
+        self.checkpoint_interval = checkpoint_interval
         self.default_schema = self.schema_registry.get_schema("default")
 
     def available_schemas(self) -> list[str]:
@@ -87,39 +267,361 @@ class CSVServiceImpl(CsvService):
         uploaded_file = self.csv_store.save_uploaded_file(file)
         return uploaded_file.name
 
-    def validate(self, request: CSVValidationRequest) -> CSVValidationResponse:
-        schema = self.schema_registry.get_schema(request.schema)
-        validator = Validator(schema.definition)
+    def validate(
+        self,
+        request: CSVValidationRequest,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> CSVValidationResponse:
+        response = CSVValidationResponse.from_request(request)
+        response.errors = ErrorStore(self.stream_errors(request, on_progress=on_progress))
+        return response
+
+    def stream_errors(
+        self,
+        request: CSVValidationRequest,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> Iterator[CSVValidationError]:
+        """
+        Yield errors as validation finds them. The result is only cached once the
+        whole file has been validated.
+        """
+        entry = self.schema_registry.entry(request.schema)
+        if entry is None:
+            raise ValueError(f"Schema {request.schema} not found")
+        key = self._result_key(request, entry)
+        cached = self.result_cache.get(key) if key else None
+        if cached is not None:
+            yield from cached
+            return
 
-        chunks = self.csv_store.read_chunk(request.file)
+        constraints = RowConstraints.build(entry.schema, self.csv_store)
+        try:
+            if self._checkpointed(request):
+                errors = yield from self._resumable_errors(
+                    request, entry, on_progress, constraints
+                )
+            else:
+                chunks = self.csv_store.read_chunk(
+                    request.file, schema=entry.schema, mappings=request.mappings
+                )
+                if chunks is None:
+                    yield from CSVValidationResponse.invalid_file(request).errors
+                    return
+
+                errors = ErrorStore()
+                for error in iter_errors(
+                    chunks,
+                    entry.schema,
+                    request.mappings,
+                    request.error_threshold,
+                    on_progress=on_progress,
+                    compiled=entry.compiled,
+                    constraints=constraints,
+                    schema_hash=entry.definition_hash,
+                ):
+                    errors.append(error)
+                    yield error
+        finally:
+            if constraints is not None:
+                constraints.close()
+        if key:
+            self.result_cache.put(key, errors)
+
+    def _checkpointed(self, request: CSVValidationRequest) -> bool:
+        if self.checkpoint_store is None:
+            return False
+        try:
+            size = self.csv_store.resolve_path(request.file).stat().st_size
+            encoding = self.csv_store.probe(request.file).encoding
+        except FileNotFoundError:
+            return False
+        return size >= self.checkpoint_bytes and single_byte_newlines(encoding)
+
+    def _resumable_errors(
+        self,
+        request: CSVValidationRequest,
+        entry: SchemaEntry,
+        on_progress: Optional[Callable[[int], None]] = None,
+        constraints: Optional[RowConstraints] = None,
+    ) -> Generator[CSVValidationError, None, ErrorStore]:
+        """
+        Validate from the request's last checkpoint on, yielding the errors found
+        before it first. A checkpoint is saved every ``checkpoint_interval`` seconds
+        and when validation is interrupted, and deleted once the file is done.
+        """
+        stat = self.csv_store.resolve_path(request.file).stat()
+        fresh = ValidationCheckpoint(
+            request_id=request.id,
+            source=[stat.st_size, stat.st_mtime_ns],
+            schema_hash=entry.definition_hash,
+            mappings=request.mappings,
+        )
+        checkpoint = self.checkpoint_store.get(request.id)
+        if checkpoint is None or not checkpoint.same_run(fresh):
+            checkpoint = fresh
+        else:
+            logger.info(f"Resuming validation {request.id} at row {checkpoint.row_offset}")
+            if constraints is not None:
+                self._observe_until(request, checkpoint.byte_offset, constraints)
+        yield from checkpoint.errors
+
+        # Errors of the chunk being validated, a checkpoint only gets whole chunks
+        pending: list[CSVValidationError] = []
+        end = checkpoint.byte_offset
+        saved = time.monotonic()
+
+        def chunks() -> Iterator[DataFrame]:
+            nonlocal end
+            for chunk, chunk_end in self.csv_store.read_blocks(
+                request.file,
+                checkpoint.byte_offset,
+                schema=entry.schema,
+                mappings=request.mappings,
+            ):
+                chunk.index = pd.RangeIndex(
+                    checkpoint.row_offset, checkpoint.row_offset + len(chunk)
+                )
+                end = chunk_end
+                yield chunk
+
+        def progress(processed: int) -> None:
+            nonlocal saved
+            checkpoint.errors.extend(pending)
+            pending.clear()
+            checkpoint.byte_offset = end
+            checkpoint.row_offset = start + processed
+            if time.monotonic() - saved >= self.checkpoint_interval:
+                self.checkpoint_store.save(checkpoint)
+                saved = time.monotonic()
+            if on_progress is not None:
+                on_progress(checkpoint.row_offset)
+
+        start = checkpoint.row_offset
+        remaining = request.error_threshold - len(checkpoint.errors)
+        try:
+            if remaining >= 0:
+                for error in iter_errors(
+                    chunks(),
+                    entry.schema,
+                    request.mappings,
+                    remaining,
+                    on_progress=progress,
+                    compiled=entry.compiled,
+                    constraints=constraints,
+                    schema_hash=entry.definition_hash,
+                ):
+                    pending.append(error)
+                    yield error
+        except BaseException:
+            self.checkpoint_store.save(checkpoint)
+            raise
+        checkpoint.errors.extend(pending)
+        self.checkpoint_store.delete(request.id)
+        return checkpoint.errors
+
+    def split_rows(
+        self,
+        request: CSVValidationRequest,
+        folder: str,
+        output_format: str = "csv",
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> RowSplit:
+        """
+        Validate the file in one pass, appending each chunk's valid rows to a clean
+        file in ``output_format`` and its invalid rows, with their row number and
+        errors, to a rejects CSV. Valid rows get the dtypes of their fields' types.
+        Columns that aren't mapped to a field aren't validated, they are passed
+        through as text. Every row is written, the request's error threshold doesn't
+        apply. Raises ValueError when no column is mapped to a field.
+        """
+        entry = self.schema_registry.entry(request.schema)
+        if entry is None:
+            raise ValueError(f"Schema {request.schema} not found")
+        columns = list(self.csv_store.probe(request.file).columns)
+        mapped = read_hints(entry.schema, request.mappings, columns).columns
+        if mapped is None:
+            mapped = columns
+        elif not mapped:
+            raise ValueError(f"No column of {request.file} is mapped to a field")
+        unmapped = [col for col in columns if col not in mapped]
+        # Unmapped columns are read as string fields of their own, so they keep
+        # their values as written, unless another column is mapped to that field
+        taken = {request.mappings.get(col, col) for col in mapped}
+        passthrough = Schema(
+            name=entry.schema.name,
+            definition={
+                **entry.schema.definition,
+                **{col: {"type": "string"} for col in unmapped if col not in taken},
+            },
+        )
+        chunks = self.csv_store.read_chunk(
+            request.file,
+            schema=passthrough,
+            mappings={**request.mappings, **{col: col for col in unmapped}},
+        )
         if chunks is None:
-            return CSVValidationResponse.invalid_file(request)
+            raise ValueError(f"Could not read {request.file}")
 
-        response = CSVValidationResponse.from_request(request)
+        stem = Path(request.file).stem
+        split = RowSplit(
+            clean=str(Path(folder) / f"{stem}.clean.{output_format}"),
+            rejects=str(Path(folder) / f"{stem}.rejects.csv"),
+        )
+        validator = validator_cache.validator(entry.schema, entry.definition_hash)
+        constraints = RowConstraints.build(entry.schema, self.csv_store)
+        try:
+            with open_writer(split.clean, output_format) as clean, CSVRowWriter(
+                split.rejects
+            ) as rejects:
+                for chunk in chunks:
+                    chunk.columns = chunk.columns.astype(str)
+                    ignored = chunk.drop(columns=mapped)
+                    chunk = chunk[mapped].rename(columns=request.mappings)
+                    invalid = chunk_errors(
+                        chunk, validator, entry.compiled, constraints
+                    )
+                    valid = np.ones(len(chunk), dtype=bool)
+                    valid[[index for index, _ in invalid]] = False
+                    typed = coerce(chunk[valid], entry.schema)
+                    clean.write(pd.concat([typed, ignored[valid]], axis=1))
+                    rejects.write(
+                        rejected_rows(
+                            pd.concat([chunk[~valid], ignored[~valid]], axis=1),
+                            [errors for _, errors in invalid],
+                        )
+                    )
+                    split.clean_rows += int(valid.sum())
+                    split.rejected_rows += len(invalid)
+                    if on_progress is not None:
+                        on_progress(split.clean_rows + split.rejected_rows)
+        finally:
+            if constraints is not None:
+                constraints.close()
+        return split
+
+    def _observe_until(
+        self,
+        request: CSVValidationRequest,
+        end: Optional[int],
+        constraints: RowConstraints,
+    ) -> None:
+        """Remember the unique values of the rows validated before a checkpoint."""
+        ranges = self.csv_store.byte_ranges(request.file, 1)
+        if end is None or not ranges:
+            return
+        chunks = self.csv_store.read_range(
+            request.file,
+            ranges[0][0],
+            end,
+            schema=self.schema_registry.get_schema(request.schema),
+            mappings=request.mappings,
+        )
         for chunk in chunks:
             chunk.columns = chunk.columns.astype(str)
-            chunk = chunk.rename(columns=request.mappings)
-            records = chunk.to_dict("records")
-            offset = chunk.index[0]
-            for index, record in enumerate(records):
-                if not validator.validate(record):
-                    # Calculate global row index based on chunk offset
-                    row = offset + index
-                    response.errors.append(
-                        CSVValidationError(row_numer=row, error=validator.errors)
-                    )
+            constraints.observe(chunk.rename(columns=request.mappings))
+
+    def validate_parallel(
+        self, request: CSVValidationRequest, workers: Optional[int] = None
+    ) -> CSVValidationResponse:
+        """
+        Validate the file in line-aligned byte ranges across a pool of processes.
+        Fields containing quoted line breaks are not supported in this mode, and
+        neither are cross row rules such as ``unique``, schemas with them raise a
+        ValueError. Files whose line breaks aren't single bytes can't be split and are
+        validated by ``validate``. Like there, errors stop at the first one past
+        ``error_threshold``.
+        """
+        schema = self.schema_registry.get_schema(request.schema)
+        if schema.cross_row_fields():
+            raise ValueError(
+                f"Schema {schema.name} has cross row rules, which need the rows in "
+                "file order, validate it with validate instead"
+            )
+        workers = workers or os.cpu_count() or 1
+        try:
+            if not single_byte_newlines(self.csv_store.probe(request.file).encoding):
+                return self.validate(request)
+            ranges = self.csv_store.byte_ranges(request.file, workers)
+        except FileNotFoundError:
+            return CSVValidationResponse.invalid_file(request)
 
-            if len(response.errors) > request.error_threshold:
-                break
+        response = CSVValidationResponse.from_request(request)
+        response.errors = ErrorStore()
+        context = multiprocessing.get_context()
+        cancelled = context.Event()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_partition_worker,
+            initargs=(cancelled,),
+        ) as pool:
+            futures = [
+                pool.submit(
+                    _validate_partition, self.csv_store, schema, request, start, end
+                )
+                for start, end in ranges
+            ]
+            # Partitions report rows relative to their own start, so merge in order
+            offset = 0
+            limit = request.error_threshold + 1
+            for future in futures:
+                rows, errors = future.result()
+                response.errors.extend(
+                    CSVValidationError(row_numer=offset + e.row_numer, error=e.error)
+                    for e in errors[: limit - len(response.errors)]
+                )
+                offset += rows
+                if len(response.errors) > request.error_threshold:
+                    cancelled.set()
+                    for pending in futures:
+                        pending.cancel()
+                    break
 
         return response
 
-    def recommend_schema(self, file_path: str, threshold: float = 0.8) -> Schema:
+    def _result_key(
+        self, request: CSVValidationRequest, entry: SchemaEntry
+    ) -> Optional[str]:
+        if self.result_cache is None:
+            return None
+        try:
+            content_hash = self.csv_store.content_hash(request.file)
+            # Results depend on the contents of referenced files too
+            files = {r.file for r in references(entry.schema).values()}
+            for reference in sorted(files):
+                content_hash += f"+{self.csv_store.content_hash(reference)}"
+        except FileNotFoundError:
+            return None
+        return result_key(content_hash, entry.schema, request, entry.definition_hash)
+
+    def recommend_schema(
+        self, file_path: str, threshold: float = 0.8, sample_size: Optional[int] = None
+    ) -> Schema:
         try:
+            df = self.csv_store.sample(file_path, rows=sample_size or self.sample_rows)
+            df.columns = df.columns.astype(str)
+            profiles = profile_frame(df)
+            name_matches = defaultdict(set)
+            for col in df.columns:
+                normalized = normalize_column_name(col)
+                for name in self.schema_registry.schemas_with_field(normalized):
+                    name_matches[name].add(normalized)
+
             best_match = None
             highest_score = 0.0
-            for schema in self.available_schemas():
-                inspection = self.inspect(file_path, schema)
+            for name in self.available_schemas():
+                entry = self.schema_registry.entry(name)
+                fields = len(entry.fields)
+                if not fields:
+                    continue
+                matched = name_matches[name]
+                upper_bound = (
+                    len(matched) + _content_bound(df, profiles, entry, matched)
+                ) / fields
+                if upper_bound <= max(threshold, highest_score):
+                    continue
+
+                inspection = inspect(df, entry.schema)
                 if inspection.score > highest_score:
                     best_match = inspection.schema
                     highest_score = inspection.score
@@ -131,11 +633,60 @@ class CSVServiceImpl(CsvService):
             raise ValueError(f"Error reading file {file_path}: {e}")
 
     def inspect(
-        self, file_path: str, schema: str = "default", sample_size: int = 5
+        self, file_path: str, schema: str = "default", sample_size: Optional[int] = None
     ) -> InspectionResult:
         try:
             schema = self.schema_registry.get_schema(schema)
-            df = self.csv_store.peek(file_path, rows=sample_size)
+            df = self.csv_store.sample(file_path, rows=sample_size or self.sample_rows)
             return inspect(df, schema)
         except Exception as e:
             raise ValueError(f"Error reading file {file_path}: {e}")
+
+    def inspect_template(
+        self, file_path: str, schema: Optional[str] = None
+    ) -> Optional[InspectionResult]:
+        """
+        The mappings saved for files with the same header layout, without sampling
+        or guessing. None without a template, or when it is for a schema other than
+        ``schema`` or one that no longer exists.
+        """
+        if self.template_store is None:
+            return None
+        try:
+            probe = self.csv_store.probe(file_path)
+        except FileNotFoundError:
+            return None
+        fingerprint = probe.fingerprint()
+        template = self.template_store.get(fingerprint) if fingerprint else None
+        if template is None or schema not in (None, template.schema):
+            return None
+        entry = self.schema_registry.entry(template.schema)
+        if entry is None:
+            return None
+
+        columns = list(probe.columns)
+        suggestions = {col: None for col in columns}
+        for col, field_name in template.mappings(columns).items():
+            # Fields removed from the schema since the template was saved are dropped
+            if field_name in entry.schema.definition:
+                suggestions[col] = field_name
+        df = self.csv_store.peek(file_path, rows=PREVIEW_ROWS)
+        df.columns = df.columns.astype(str)
+        return InspectionResult(
+            entry.schema, columns, df.to_dict(orient="records"), suggestions
+        )
+
+    def save_template(self, file_path: str, schema: str, mappings: dict[str, str]) -> None:
+        if self.template_store is None:
+            return
+        probe = self.csv_store.probe(file_path)
+        fingerprint = probe.fingerprint()
+        if fingerprint is None:
+            logger.info(f"Not saving mappings of {file_path}, it has no header row")
+            return
+        columns = list(probe.columns)
+        self.template_store.save(
+            MappingTemplate(
+                fingerprint, schema, columns, [mappings.get(col) for col in columns]
+            )
+        )
@@ -1,20 +1,100 @@
+import codecs
 import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 import charset_normalizer
-from typing import Protocol, Optional, Callable
+from typing import BinaryIO, Iterator, Protocol, Optional, Callable
 from pathlib import Path
 import pandas as pd
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 from mimetypes import guess_type
 
+from app.models.schema import Schema, normalize_column_name
+from app.services.read_hints import ReadHints, read_hints
+from app.services.sidecar import (
+    PYARROW_AVAILABLE,
+    SIDECAR_ROWS,
+    find_sidecar,
+    forced_text,
+    read_sidecar,
+    text_columns,
+    write_sidecar,
+)
+
+logger = logging.getLogger(__name__)
+
+PROBE_CACHE_SIZE = 256
+ENCODING_SAMPLE_SIZE = 50000
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+BLOB_FOLDER = "blobs"
+# Upload statistics by blob, for processes other than the one that saved the upload
+STATS_FOLDER = "upload_stats"
+# Permissions of saved uploads, temporary files are created readable by the owner only
+UPLOAD_MODE = 0o644
+SAMPLE_ROWS = 100
+# Leading rows a sample always starts with, so previews still show the top of the file
+SAMPLE_HEAD_ROWS = 5
+# Files up to this size are read whole and sampled in memory
+SAMPLE_SCAN_BYTES = 256 * 1024
+BLOCK_BYTES = 8 * 1024 * 1024
+
 
 class CSVStorage(Protocol):
     def save_uploaded_file(self, file: FileStorage) -> Path: ...
     def resolve_path(self, file_name: str) -> Path: ...
-    def peek(self, file_name: str, rows: int = 5) -> pd.DataFrame: ...
-    def read_chunk(self, file_name: str, size=10000) -> pd.DataFrame: ...
-    def read_all(self, file_name: str) -> pd.DataFrame: ...
+    def upload_stats(self, file_name: str) -> Optional["UploadStats"]: ...
+    def probe(self, file_name: str) -> "FileProbe": ...
+    def content_hash(self, file_name: str) -> str: ...
+    def peek(
+        self, file_name: str, rows: int = 5, columns: Optional[list[str]] = None
+    ) -> pd.DataFrame: ...
+    def sample(
+        self,
+        file_name: str,
+        rows: int = SAMPLE_ROWS,
+        columns: Optional[list[str]] = None,
+        seed: int = 0,
+    ) -> pd.DataFrame: ...
+    def read_chunk(
+        self,
+        file_name: str,
+        size=10000,
+        columns: Optional[list[str]] = None,
+        schema: Optional[Schema] = None,
+        mappings: Optional[dict[str, str]] = None,
+    ) -> pd.DataFrame: ...
+    def read_all(
+        self, file_name: str, columns: Optional[list[str]] = None
+    ) -> pd.DataFrame: ...
+    def read_blocks(
+        self,
+        file_name: str,
+        start: Optional[int] = None,
+        block_bytes: int = BLOCK_BYTES,
+        schema: Optional[Schema] = None,
+        mappings: Optional[dict[str, str]] = None,
+    ) -> Iterator[tuple[pd.DataFrame, int]]: ...
+    def byte_ranges(self, file_name: str, partitions: int) -> list[tuple[int, int]]: ...
+    def read_range(
+        self,
+        file_name: str,
+        start: int,
+        end: int,
+        size=10000,
+        schema: Optional[Schema] = None,
+        mappings: Optional[dict[str, str]] = None,
+    ) -> Iterator[pd.DataFrame]: ...
 
 
 class FileRename(Protocol):
@@ -45,11 +125,14 @@ def is_valid_csv(file: CSVStorage) -> bool:
     return True
 
 
+def detect_encoding(sample: bytes) -> str:
+    results = charset_normalizer.from_bytes(sample)
+    return str(results.best().encoding) if results.best() else "utf-8"
+
+
 def get_encoding(file) -> str:
     with open(file, "rb") as f:
-        sample = f.read(50000)
-        results = charset_normalizer.from_bytes(sample)
-        return str(results.best().encoding) if results.best() else "utf-8"
+        return detect_encoding(f.read(ENCODING_SAMPLE_SIZE))
 
 def has_header(file, encoding='utf-8', sample_size=1024) -> bool:
         """Detect if CSV has a header row using csv.Sniffer"""
@@ -59,31 +142,598 @@ def has_header(file, encoding='utf-8', sample_size=1024) -> bool:
             return sniffer.has_header(sample)
 
 
+def sniff_dialect(sample: str) -> Optional[type[csv.Dialect]]:
+    try:
+        return csv.Sniffer().sniff(sample)
+    except csv.Error:
+        return None
+
+
+@dataclass(frozen=True)
+class UploadStats:
+    sha256: str
+    size: int
+    lines: int
+    line_endings: dict[str, int]
+    sample: bytes = field(repr=False)
+
+    def to_json(self) -> str:
+        """Everything but the sample, which is the start of the file itself."""
+        return json.dumps(
+            {
+                "sha256": self.sha256,
+                "size": self.size,
+                "lines": self.lines,
+                "line_endings": self.line_endings,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: str, sample: bytes) -> "UploadStats":
+        return cls(**json.loads(data), sample=sample)
+
+
+@dataclass(frozen=True)
+class FileProbe:
+    encoding: str
+    dialect: Optional[type[csv.Dialect]]
+    has_header: bool
+    columns: tuple[str, ...]
+    upload: Optional[UploadStats] = None
+    # Content hash of files that weren't uploaded, filled in once computed
+    sha256: Optional[str] = None
+
+    def fingerprint(self) -> Optional[str]:
+        """
+        Identifies the header layout by normalized column names in order, delimiter
+        and quote character. Files without a header row have none.
+        """
+        if not self.has_header:
+            return None
+        layout = {
+            "columns": [normalize_column_name(col) for col in self.columns],
+            "dialect": [self.dialect.delimiter, self.dialect.quotechar]
+            if self.dialect
+            else None,
+        }
+        return hashlib.sha256(json.dumps(layout).encode()).hexdigest()
+
+
+def read_sample(file) -> bytes:
+    with open(file, "rb") as f:
+        return f.read(ENCODING_SAMPLE_SIZE)
+
+
+def _probe_from_sample(sample: bytes, sample_size=1024) -> FileProbe:
+    encoding = detect_encoding(sample)
+    # Decode the same way has_header reads the file, universal newlines included
+    text = io.TextIOWrapper(io.BytesIO(sample), encoding=encoding).read(sample_size)
+    header = csv.Sniffer().has_header(text)
+    # Only parse complete lines so a character cut off by the sample boundary can't
+    # break decoding, the incremental decoder holds back a partial last character
+    decoded = codecs.getincrementaldecoder(encoding)().decode(sample)
+    complete = decoded[: decoded.rfind("\n") + 1] or decoded
+    columns = pd.read_csv(
+        io.StringIO(complete),
+        header="infer" if header else None,
+        nrows=0,
+    ).columns
+    return FileProbe(
+        encoding=encoding,
+        dialect=sniff_dialect(text),
+        has_header=header,
+        columns=tuple(str(col) for col in columns),
+    )
+
+
+class ProbeCache:
+    """
+    LRU cache of file probes keyed by path, modification time and size so that a file
+    is only probed again once its contents change. Shared by the threads of a worker,
+    files are probed outside the lock.
+    """
+
+    def __init__(self, maxsize: int = PROBE_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.entries: OrderedDict[tuple[str, int, int], FileProbe] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(
+        self, file, sample_reader: Callable[[Path], bytes] = read_sample
+    ) -> FileProbe:
+        key = self._key(file)
+        with self.lock:
+            probe = self.entries.get(key)
+            if probe is not None:
+                self.entries.move_to_end(key)
+                return probe
+        probe = _probe_from_sample(sample_reader(Path(file)))
+        self._store(key, probe)
+        return probe
+
+    def put(self, file, probe: FileProbe) -> None:
+        self._store(self._key(file), probe)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _key(self, file) -> tuple[str, int, int]:
+        stat = Path(file).stat()
+        return str(file), stat.st_mtime_ns, stat.st_size
+
+    def _store(self, key: tuple[str, int, int], probe: FileProbe) -> None:
+        with self.lock:
+            self.entries[key] = probe
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+probe_cache = ProbeCache()
+
+
+def probe_file(file, sample_reader: Callable[[Path], bytes] = read_sample) -> FileProbe:
+    return probe_cache.get(file, sample_reader)
+
+
+def copy_upload(source: FileStorage, target, chunk_size: int = UPLOAD_CHUNK_SIZE) -> UploadStats:
+    """
+    Stream an upload into ``target`` chunk by chunk, collecting the statistics later
+    stages would otherwise have to re-read the file for.
+    """
+    digest = hashlib.sha256()
+    sample = bytearray()
+    size = 0
+    lf = cr = crlf = 0
+    last = b""
+    while chunk := source.read(chunk_size):
+        target.write(chunk)
+        digest.update(chunk)
+        size += len(chunk)
+        if len(sample) < ENCODING_SAMPLE_SIZE:
+            sample += chunk[: ENCODING_SAMPLE_SIZE - len(sample)]
+        pairs = chunk.count(b"\r\n") + (last == b"\r" and chunk[:1] == b"\n")
+        crlf += pairs
+        lf += chunk.count(b"\n")
+        cr += chunk.count(b"\r")
+        last = chunk[-1:]
+
+    lf -= crlf
+    cr -= crlf
+    lines = lf + cr + crlf + (size > 0 and last not in (b"\n", b"\r"))
+    return UploadStats(
+        sha256=digest.hexdigest(),
+        size=size,
+        lines=lines,
+        line_endings={"lf": lf, "crlf": crlf, "cr": cr},
+        sample=bytes(sample),
+    )
+
+
+def usecols(probe: FileProbe, columns: Optional[list[str]]) -> Optional[list[int]]:
+    """Positions of the requested columns, which works with or without a header row."""
+    if columns is None:
+        return None
+    return [i for i, col in enumerate(probe.columns) if col in columns]
+
+
+def read_range_chunks(
+    f,
+    probe: FileProbe,
+    size: int,
+    schema: Optional[Schema] = None,
+    mappings: Optional[dict[str, str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Chunks of the header-less rows in ``f``, projected and typed for ``schema``."""
+    names = list(probe.columns)
+    hints = read_hints(schema, mappings or {}, names) if schema else ReadHints()
+    chunks = pd.read_csv(
+        f,
+        encoding=probe.encoding,
+        header=None,
+        names=names,
+        usecols=usecols(probe, hints.columns),
+        dtype=hints.dtype or None,
+        chunksize=size,
+    )
+    return hints.apply_all(chunks)
+
+
+def sample_lines(
+    f: BinaryIO,
+    size: int,
+    rows: int,
+    skip_header: bool,
+    rng: random.Random,
+    head: int = SAMPLE_HEAD_ROWS,
+) -> list[bytes]:
+    """
+    The first ``head`` lines after the header, then one line from each of the equal
+    byte ranges the rest of the file is split into. Each range is entered at a random
+    offset and read from the next line start, so about one line per row is read.
+    """
+    if skip_header:
+        f.readline()
+    lines = []
+    for _ in range(min(head, rows)):
+        line = f.readline()
+        if not line:
+            return lines
+        lines.append(line)
+
+    start = position = f.tell()
+    strata = rows - len(lines)
+    if strata <= 0 or start >= size:
+        return lines
+    step = (size - start) / strata
+    for i in range(strata):
+        low = start + int(i * step)
+        high = start + int((i + 1) * step)
+        target = max(rng.randrange(low, max(high, low + 1)), position)
+        if target >= size:
+            break
+        # Reading on from the byte before lands on the next line start, or on target
+        # itself when it already is one
+        f.seek(target - 1 if target else 0)
+        if target:
+            f.readline()
+        line = f.readline()
+        if not line:
+            break
+        lines.append(line)
+        position = f.tell()
+    return lines
+
+
+def sample_frame(
+    df: pd.DataFrame, rows: int, seed: int = 0, head: int = SAMPLE_HEAD_ROWS
+) -> pd.DataFrame:
+    """The same kind of sample as sample_lines, taken from rows already in memory."""
+    if len(df) <= rows:
+        return df
+    head = min(head, rows)
+    rest = df.iloc[head:].sample(rows - head, random_state=seed).sort_index()
+    return pd.concat([df.iloc[:head], rest])
+
+
+def is_complete_row(line: str, width: int) -> bool:
+    """Whether ``line`` is a whole record of ``width`` fields."""
+    try:
+        return len(next(csv.reader([line], strict=True), [])) == width
+    except csv.Error:
+        return False
+
+
+def single_byte_newlines(encoding: str) -> bool:
+    """Whether a line break is the byte ``\\n``, so lines can be found by seeking."""
+    return len("a\n".encode(encoding)) - len("a".encode(encoding)) == 1
+
+
+def file_sha256(file, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    with open(file, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileRange(io.RawIOBase):
+    """Read-only view of the bytes between ``start`` and ``end`` of a file."""
+
+    def __init__(self, file, start: int, end: int) -> None:
+        self.file = open(file, "rb")
+        self.file.seek(start)
+        self.remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer)[: max(self.remaining, 0)]
+        read = self.file.readinto(view)
+        self.remaining -= read
+        return read
+
+    def close(self) -> None:
+        self.file.close()
+        super().close()
+
+
 class LocalFileStorage(CSVStorage):
     def __init__(
-        self, upload_folder: str, rename_strategy: Optional[FileRename] = None
+        self,
+        upload_folder: str,
+        rename_strategy: Optional[FileRename] = None,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
     ) -> None:
         self.upload_folder = upload_folder
         self.path = Path(upload_folder)
         self.rename_strategy = rename_strategy or PreserveFileName()
+        self.chunk_size = chunk_size
         if self.path.exists():
             self.path.mkdir(parents=True, exist_ok=True)
 
     def save_uploaded_file(self, file: FileStorage) -> Path:
         file_name = self.rename_strategy.rename(secure_filename(file.filename))
-        with open(self.path / file_name, "wb") as f:
-            data = file.read()
-            f.write(data)
-            return Path(f.name)
+        saved = self.path / file_name
+        blobs = self.path / BLOB_FOLDER
+        blobs.mkdir(parents=True, exist_ok=True)
+        # Write next to the blobs so the final rename is atomic
+        with tempfile.NamedTemporaryFile(
+            dir=blobs, prefix=".upload-", suffix=".part", delete=False
+        ) as f:
+            temp_path = Path(f.name)
+            try:
+                stats = copy_upload(file, f, self.chunk_size)
+            except BaseException:
+                f.close()
+                temp_path.unlink(missing_ok=True)
+                raise
+
+        # Identical uploads share one blob, the file name is a link to it
+        blob = blobs / f"{stats.sha256}.csv"
+        if blob.exists():
+            temp_path.unlink()
+        else:
+            os.chmod(temp_path, UPLOAD_MODE)
+            os.replace(temp_path, blob)
+        self._save_stats(blob, stats)
+        self._link(saved, blob)
+
+        try:
+            probe = _probe_from_sample(stats.sample)
+            probe_cache.put(saved, replace(probe, upload=stats))
+        except (OSError, ValueError, csv.Error) as e:
+            logger.warning(f"Could not probe uploaded file {saved}: {e}")
+        return saved
 
-    def peek(self, file_name: str, rows: int = 5) -> pd.DataFrame:
-        return self._read_csv(file_name, nrows=rows)
+    def content_hash(self, file_name: str) -> str:
+        resolved_path = self.resolve_path(file_name)
+        if resolved_path.is_symlink():
+            target = Path(os.readlink(resolved_path))
+            if target.parent.name == BLOB_FOLDER:
+                return target.stem
+        probe = probe_file(resolved_path)
+        if probe.upload is not None:
+            return probe.upload.sha256
+        if probe.sha256 is None:
+            # Cached with the probe, so it is only computed again once the file changes
+            probe = replace(probe, sha256=file_sha256(resolved_path, self.chunk_size))
+            probe_cache.put(resolved_path, probe)
+        return probe.sha256
+
+    def upload_stats(self, file_name: str) -> Optional[UploadStats]:
+        """
+        Statistics collected while the file was uploaded, None for files that weren't.
+        Read from next to the blob when the upload was handled by another process.
+        """
+        resolved_path = self.resolve_path(file_name)
+        probe = probe_file(resolved_path)
+        if probe.upload is not None or not resolved_path.is_symlink():
+            return probe.upload
+        blob = resolved_path.resolve()
+        try:
+            data = (self.path / STATS_FOLDER / f"{blob.stem}.json").read_text()
+        except FileNotFoundError:
+            return None
+        stats = UploadStats.from_json(data, read_sample(blob))
+        probe_cache.put(resolved_path, replace(probe, upload=stats))
+        return stats
+
+    def probe(self, file_name: str) -> FileProbe:
+        return probe_file(self.resolve_path(file_name))
+
+    def peek(
+        self, file_name: str, rows: int = 5, columns: Optional[list[str]] = None
+    ) -> pd.DataFrame:
+        sidecar = find_sidecar(self.resolve_path(file_name))
+        if sidecar is not None:
+            first = next(read_sidecar(sidecar, self._known(file_name, columns)), None)
+            if first is not None:
+                return first.head(rows)
+        return self._read_csv(file_name, columns, nrows=rows)
+
+    def sample(
+        self,
+        file_name: str,
+        rows: int = SAMPLE_ROWS,
+        columns: Optional[list[str]] = None,
+        seed: int = 0,
+    ) -> pd.DataFrame:
+        """
+        About ``rows`` rows spread over the whole file, see sample_lines. The cost
+        depends on ``rows``, not on the size of the file. Files whose first rows have
+        quoted line breaks get their first ``rows`` rows instead.
+        """
+        resolved_path = self.resolve_path(file_name)
+        probe = probe_file(resolved_path)
+        size = resolved_path.stat().st_size
+        if size <= SAMPLE_SCAN_BYTES:
+            return sample_frame(self._read_csv(file_name, columns), rows, seed)
+        if not single_byte_newlines(probe.encoding):
+            return self.peek(file_name, rows, columns)
+
+        with open(resolved_path, "rb") as f:
+            lines = sample_lines(f, size, rows, probe.has_header, random.Random(seed))
+        lines = [line.decode(probe.encoding, errors="replace") for line in lines]
+        complete = [is_complete_row(line, len(probe.columns)) for line in lines]
+        if not all(complete[:SAMPLE_HEAD_ROWS]):
+            # Quoted line breaks can't be skipped by seeking, use the first rows instead
+            return self.peek(file_name, rows, columns)
+        kept = [line for line, whole in zip(lines, complete) if whole]
+        return pd.read_csv(
+            io.StringIO("".join(kept)),
+            header=None,
+            names=list(probe.columns) if probe.has_header else None,
+            usecols=usecols(probe, columns),
+        )
+
+    def read_chunk(
+        self,
+        file_name: str,
+        size=10000,
+        columns: Optional[list[str]] = None,
+        schema: Optional[Schema] = None,
+        mappings: Optional[dict[str, str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Chunks of ``size`` rows. With a ``schema``, only the columns that ``mappings``
+        turn into its fields are read, in the types read_hints picks for them.
+        Columns read as text get their values as written, so the sidecar is only read
+        when it has them as text, and is built with them as text.
+        """
+        if schema is None:
+            return self._read_chunks(file_name, size, columns)
+        probe = self.probe(file_name)
+        hints = read_hints(schema, mappings or {}, list(probe.columns))
+        dtype = {
+            name if probe.has_header else probe.columns.index(name): dtype
+            for name, dtype in hints.dtype.items()
+        }
+        if size == SIDECAR_ROWS and PYARROW_AVAILABLE:
+            resolved_path = self.resolve_path(file_name)
+            sidecar = find_sidecar(resolved_path)
+            if sidecar is not None and set(hints.dtype) <= text_columns(sidecar):
+                known = self._known(file_name, hints.columns)
+                return hints.apply_all(read_sidecar(sidecar, known))
+            if sidecar is None:
+                # Built from every column, the mapped ones are picked out afterwards
+                text = {key: "str" for key in dtype}
+                chunks = self._read_csv(file_name, chunksize=size, dtype=text)
+                chunks = write_sidecar(resolved_path, chunks, hints.dtype)
+                return hints.apply_all(chunks)
+        chunks = self._read_csv(file_name, hints.columns, chunksize=size, dtype=dtype)
+        return hints.apply_all(chunks)
+
+    def _read_chunks(
+        self, file_name: str, size: int, columns: Optional[list[str]]
+    ) -> Iterator[pd.DataFrame]:
+        resolved_path = self.resolve_path(file_name)
+        sidecar = find_sidecar(resolved_path)
+        if size != SIDECAR_ROWS:
+            return self._read_csv(file_name, columns, chunksize=size)
+        if sidecar is not None and not forced_text(sidecar):
+            return read_sidecar(sidecar, self._known(file_name, columns))
+
+        chunks = self._read_csv(file_name, columns, chunksize=size)
+        if PYARROW_AVAILABLE and columns is None and sidecar is None:
+            # The first full pass over a file also builds its sidecar
+            return write_sidecar(resolved_path, chunks)
+        return chunks
+
+    def read_all(
+        self, file_name: str, columns: Optional[list[str]] = None
+    ) -> pd.DataFrame:
+        sidecar = find_sidecar(self.resolve_path(file_name))
+        if sidecar is not None and not forced_text(sidecar):
+            parts = list(read_sidecar(sidecar, self._known(file_name, columns)))
+            if parts:
+                return pd.concat(parts)
+        return self._read_csv(file_name, columns)
+
+    def read_blocks(
+        self,
+        file_name: str,
+        start: Optional[int] = None,
+        block_bytes: int = BLOCK_BYTES,
+        schema: Optional[Schema] = None,
+        mappings: Optional[dict[str, str]] = None,
+    ) -> Iterator[tuple[pd.DataFrame, int]]:
+        """
+        Chunks of about ``block_bytes`` of whole records from byte ``start`` on, the
+        first data row by default, each with the byte offset reading can resume from.
+        Only for encodings with single byte line breaks, see single_byte_newlines.
+        A ``schema`` projects and types the columns as in read_chunk.
+        """
+        resolved_path = self.resolve_path(file_name)
+        probe = probe_file(resolved_path)
+        names = list(probe.columns)
+        hints = read_hints(schema, mappings or {}, names) if schema else ReadHints()
+        columns = usecols(probe, hints.columns)
+        quote = (probe.dialect.quotechar if probe.dialect else '"').encode(probe.encoding)
+        with open(resolved_path, "rb") as f:
+            if start is None:
+                start = len(f.readline()) if probe.has_header else 0
+            f.seek(start)
+            while block := f.read(block_bytes) + f.readline():
+                # An odd number of quotes means the block ends inside a quoted field,
+                # escaped quotes come in pairs and don't change that
+                quotes = block.count(quote)
+                while quotes % 2 and (line := f.readline()):
+                    quotes += line.count(quote)
+                    block += line
+                try:
+                    chunk = pd.read_csv(
+                        io.BytesIO(block),
+                        encoding=probe.encoding,
+                        header=None,
+                        names=names,
+                        usecols=columns,
+                        dtype=hints.dtype or None,
+                    )
+                except pd.errors.EmptyDataError:
+                    chunk = pd.DataFrame(columns=hints.columns or names)
+                if len(chunk):
+                    yield hints.apply(chunk), f.tell()
 
-    def read_chunk(self, file_name: str, size=10000) -> pd.DataFrame:
-        return self._read_csv(file_name, chunksize=size)
+    def byte_ranges(self, file_name: str, partitions: int) -> list[tuple[int, int]]:
+        """
+        Split the data rows of a file into roughly equal byte ranges, each starting at
+        the beginning of a line. Only for encodings with single byte line breaks, see
+        single_byte_newlines.
+        """
+        resolved_path = self.resolve_path(file_name)
+        probe = probe_file(resolved_path)
+        if not single_byte_newlines(probe.encoding):
+            raise ValueError(f"Can't split {file_name}, it is encoded as {probe.encoding}")
+        size = resolved_path.stat().st_size
+        with open(resolved_path, "rb") as f:
+            start = len(f.readline()) if probe.has_header else 0
+            boundaries = [start]
+            step = max((size - start) // max(partitions, 1), 1)
+            for target in range(start + step, size, step):
+                if target < boundaries[-1]:
+                    continue
+                f.seek(target)
+                f.readline()
+                if f.tell() < size:
+                    boundaries.append(f.tell())
+        boundaries.append(size)
+        return [
+            (begin, end) for begin, end in zip(boundaries, boundaries[1:]) if end > begin
+        ]
+
+    def read_range(
+        self,
+        file_name: str,
+        start: int,
+        end: int,
+        size=10000,
+        schema: Optional[Schema] = None,
+        mappings: Optional[dict[str, str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        resolved_path = self.resolve_path(file_name)
+        probe = probe_file(resolved_path)
+        with FileRange(resolved_path, start, end) as f:
+            yield from read_range_chunks(f, probe, size, schema, mappings)
 
-    def read_all(self, file_name: str) -> pd.DataFrame:
-        return self._read_csv(file_name)
+    def _save_stats(self, blob: Path, stats: UploadStats) -> None:
+        stats_path = self.path / STATS_FOLDER / f"{blob.stem}.json"
+        if stats_path.exists():
+            return
+        stats_path.parent.mkdir(exist_ok=True)
+        temp_path = stats_path.with_name(f".stats-{uuid.uuid4().hex}")
+        temp_path.write_text(stats.to_json())
+        os.replace(temp_path, stats_path)
+
+    def _link(self, link: Path, blob: Path) -> None:
+        temp_link = link.with_name(f".link-{uuid.uuid4().hex}")
+        os.symlink(blob.relative_to(link.parent), temp_link)
+        os.replace(temp_link, link)
 
     def resolve_path(self, file_name: str) -> Path:
         full_path = self.path / file_name
@@ -91,8 +741,24 @@ class LocalFileStorage(CSVStorage):
             return full_path
         raise FileNotFoundError(f"File {file_name} not found")
 
-    def _read_csv(self, file_name: str, **kwargs) -> pd.DataFrame:
+    def _known(
+        self, file_name: str, columns: Optional[list[str]]
+    ) -> Optional[list[str]]:
+        if columns is None:
+            return None
+        known = probe_file(self.resolve_path(file_name)).columns
+        return [col for col in known if col in columns]
+
+    def _read_csv(
+        self, file_name: str, columns: Optional[list[str]] = None, **kwargs
+    ) -> pd.DataFrame:
         resolved_path = self.resolve_path(file_name)
-        encoding = get_encoding(resolved_path)
-        header = 'infer' if has_header(resolved_path, encoding=encoding) else None
-        return pd.read_csv(resolved_path, encoding=encoding, header=header, **kwargs)
+        probe = probe_file(resolved_path)
+        header = 'infer' if probe.has_header else None
+        return pd.read_csv(
+            resolved_path,
+            encoding=probe.encoding,
+            header=header,
+            usecols=usecols(probe, columns),
+            **kwargs,
+        )
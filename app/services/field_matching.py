@@ -0,0 +1,176 @@
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Optional
+
+import numpy as np
+from pandas import DataFrame
+
+from app.models.inspection import FieldMatch
+from app.models.schema import Schema, normalize_column_name, row_rules
+from app.services.column_profile import ColumnProfile, profile_frame
+from app.services.validator_cache import validator_cache
+
+# Share of a content based score that comes from how alike the names are
+NAME_WEIGHT = 0.25
+ALTERNATIVES = 3
+
+
+def content_match_rate(profile: ColumnProfile, schema: Schema, field_name: str) -> float:
+    """Share of the column's values that are valid for ``field_name``."""
+    if not profile.size:
+        return 0.0
+    rate = profile.match_rate(row_rules(schema.definition[field_name]))
+    if rate is None:
+        # Rules the profile can't decide are checked value by value
+        validator = validator_cache.field_validators(schema)[field_name]
+        matches = sum(
+            validator.validate({field_name: value}) for value in profile.column.tolist()
+        )
+        rate = matches / profile.size
+    return rate
+
+
+def could_match(
+    profile: ColumnProfile, schema: Schema, field_name: str, threshold: float = 0.8
+) -> bool:
+    """
+    Whether the column's type leaves room for more than ``threshold`` of its values
+    to be valid for ``field_name``. Cheap, only the type rule is checked, so it never
+    rules out a field content_match_rate would accept.
+    """
+    if not profile.size:
+        return False
+    rules = row_rules(schema.definition[field_name])
+    if "type" not in rules:
+        return True
+    rate = profile.match_rate(
+        {"type": rules["type"], "nullable": rules.get("nullable", False)}
+    )
+    return rate is None or rate > threshold
+
+
+def name_similarity(column: str, field_name: str) -> float:
+    return SequenceMatcher(None, normalize_column_name(column), field_name).ratio()
+
+
+@dataclass
+class FieldScores:
+    """
+    How well each column fits each schema field. A column whose normalized name is a
+    field scores 1 for it and keeps it. Otherwise a field is a candidate when more
+    than ``threshold`` of the column's values are valid for it, scored by that share
+    and how alike the names are. Non-candidates score 0.
+    """
+
+    columns: list[str]
+    fields: list[str]
+    # Column by field
+    scores: np.ndarray
+    # Column index to field index of exact name matches
+    pinned: dict[int, int]
+
+    def assignment(self) -> dict[str, Optional[str]]:
+        """
+        One field per column at most, picked so that the total score is as high as
+        possible instead of giving each column the first field that fits.
+        """
+        suggestions: dict[str, Optional[str]] = {c: None for c in self.columns}
+        for column, field_index in self.pinned.items():
+            suggestions[self.columns[column]] = self.fields[field_index]
+
+        rows = [i for i in range(len(self.columns)) if i not in self.pinned]
+        cols = [j for j in range(len(self.fields)) if j not in self.pinned.values()]
+        scores = self.scores[np.ix_(rows, cols)]
+        for row, col in zip(rows, assign(scores)):
+            if col is not None and self.scores[row, cols[col]] > 0:
+                suggestions[self.columns[row]] = self.fields[cols[col]]
+        return suggestions
+
+    def alternatives(self, limit: int = ALTERNATIVES) -> dict[str, list[FieldMatch]]:
+        """The best scoring candidate fields of each column."""
+        alternatives = {}
+        for i, column in enumerate(self.columns):
+            ranked = np.argsort(-self.scores[i], kind="stable")[:limit]
+            alternatives[column] = [
+                FieldMatch(self.fields[j], round(float(self.scores[i, j]), 3))
+                for j in ranked
+                if self.scores[i, j] > 0
+            ]
+        return alternatives
+
+
+def score_fields(df: DataFrame, schema: Schema, threshold: float = 0.8) -> FieldScores:
+    columns = [str(col) for col in df.columns]
+    fields = list(schema.definition.keys())
+    field_index = {f: j for j, f in enumerate(fields)}
+    scores = np.zeros((len(columns), len(fields)))
+    pinned: dict[int, int] = {}
+    for i, (column, profile) in enumerate(zip(columns, profile_frame(df))):
+        normalized = normalize_column_name(column)
+        if normalized in field_index and field_index[normalized] not in pinned.values():
+            pinned[i] = field_index[normalized]
+            scores[i, pinned[i]] = 1.0
+            continue
+
+        for j, field_name in enumerate(fields):
+            rate = content_match_rate(profile, schema, field_name)
+            if rate > threshold:
+                similarity = name_similarity(column, field_name)
+                scores[i, j] = (1 - NAME_WEIGHT) * rate + NAME_WEIGHT * similarity
+    return FieldScores(columns, fields, scores, pinned)
+
+
+def assign(scores: np.ndarray) -> list[Optional[int]]:
+    """
+    Column index for each row so that the summed score is highest, with every column
+    used at most once (the Hungarian method). Rows left over get None.
+    """
+    rows, cols = scores.shape
+    if not rows or not cols:
+        return [None] * rows
+    if rows > cols:
+        result: list[Optional[int]] = [None] * rows
+        for col, row in enumerate(assign(scores.T)):
+            if row is not None:
+                result[row] = col
+        return result
+
+    # Minimizes cost with row and column potentials u and v, columns are 1-based and
+    # column 0 holds the row being added
+    cost = scores.max() - scores
+    u = np.zeros(rows + 1)
+    v = np.zeros(cols + 1)
+    owner = np.zeros(cols + 1, dtype=int)
+    way = np.zeros(cols + 1, dtype=int)
+    for row in range(1, rows + 1):
+        owner[0] = row
+        col = 0
+        slack = np.full(cols + 1, np.inf)
+        used = np.zeros(cols + 1, dtype=bool)
+        while True:
+            used[col] = True
+            current = owner[col]
+            free = ~used[1:]
+            reduced = cost[current - 1] - u[current] - v[1:]
+            better = free & (reduced < slack[1:])
+            slack[1:][better] = reduced[better]
+            way[1:][better] = col
+            candidates = np.where(free, slack[1:], np.inf)
+            nearest = int(np.argmin(candidates)) + 1
+            delta = candidates[nearest - 1]
+            u[owner[used]] += delta
+            v[used] -= delta
+            slack[~used] -= delta
+            col = nearest
+            if owner[col] == 0:
+                break
+        while col:
+            previous = way[col]
+            owner[col] = owner[previous]
+            col = previous
+
+    result = [None] * rows
+    for col in range(1, cols + 1):
+        if owner[col]:
+            result[owner[col] - 1] = col - 1
+    return result
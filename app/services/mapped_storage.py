@@ -0,0 +1,128 @@
+import io
+import mmap
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from app.models.schema import Schema
+from app.services.csv_storage import (
+    ENCODING_SAMPLE_SIZE,
+    FileProbe,
+    FileRename,
+    LocalFileStorage,
+    UPLOAD_CHUNK_SIZE,
+    probe_file,
+    read_range_chunks,
+    usecols,
+)
+from app.services.sidecar import PYARROW_AVAILABLE
+
+MAPPED_FILES = 64
+
+
+class BufferReader(io.RawIOBase):
+    """File-like reader over a memoryview, so pandas can parse straight from a map."""
+
+    def __init__(self, buffer: memoryview) -> None:
+        self.buffer = buffer
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        size = min(len(target), len(self.buffer) - self.position)
+        target[:size] = self.buffer[self.position : self.position + size]
+        self.position += size
+        return size
+
+    def close(self) -> None:
+        self.buffer.release()
+        super().close()
+
+
+class MappedFileStorage(LocalFileStorage):
+    """
+    CSVStorage that memory-maps each file once and serves reads and probes from the
+    mapped pages instead of reopening the file. Full reads use the pyarrow engine
+    when it is installed.
+    """
+
+    def __init__(
+        self,
+        upload_folder: str,
+        rename_strategy: Optional[FileRename] = None,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+        max_mapped: int = MAPPED_FILES,
+    ) -> None:
+        super().__init__(upload_folder, rename_strategy, chunk_size)
+        self.max_mapped = max_mapped
+        self.maps: OrderedDict[tuple[str, int, int], mmap.mmap | bytes] = OrderedDict()
+
+    def __getstate__(self) -> dict:
+        # Maps can't be pickled, worker processes map the file themselves
+        state = self.__dict__.copy()
+        state["maps"] = OrderedDict()
+        return state
+
+    def probe(self, file_name: str) -> FileProbe:
+        return probe_file(self.resolve_path(file_name), self._sample)
+
+    def read_range(
+        self,
+        file_name: str,
+        start: int,
+        end: int,
+        size=10000,
+        schema: Optional[Schema] = None,
+        mappings: Optional[dict[str, str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        resolved_path = self.resolve_path(file_name)
+        probe = probe_file(resolved_path, self._sample)
+        with BufferReader(memoryview(self._map(resolved_path))[start:end]) as f:
+            yield from read_range_chunks(f, probe, size, schema, mappings)
+
+    def _read_csv(
+        self, file_name: str, columns: Optional[list[str]] = None, **kwargs
+    ) -> pd.DataFrame:
+        resolved_path = self.resolve_path(file_name)
+        probe = probe_file(resolved_path, self._sample)
+        header = "infer" if probe.has_header else None
+        if PYARROW_AVAILABLE and not kwargs:
+            kwargs["engine"] = "pyarrow"
+        kwargs["usecols"] = usecols(probe, columns)
+        reader = BufferReader(memoryview(self._map(resolved_path)))
+        if "chunksize" in kwargs:
+            # The reader has to stay open until the last chunk has been parsed
+            return self._chunks(reader, probe.encoding, header, kwargs)
+        with reader:
+            return pd.read_csv(reader, encoding=probe.encoding, header=header, **kwargs)
+
+    def _chunks(
+        self, reader: BufferReader, encoding: str, header, kwargs: dict
+    ) -> Iterator[pd.DataFrame]:
+        with reader:
+            yield from pd.read_csv(reader, encoding=encoding, header=header, **kwargs)
+
+    def _sample(self, path: Path) -> bytes:
+        return bytes(self._map(path)[:ENCODING_SAMPLE_SIZE])
+
+    def _map(self, path: Path) -> mmap.mmap | bytes:
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        if key in self.maps:
+            self.maps.move_to_end(key)
+            return self.maps[key]
+
+        if stat.st_size == 0:
+            mapped = b""
+        else:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.maps[key] = mapped
+        # Evicted maps are unmapped once the last reader using them is done
+        while len(self.maps) > self.max_mapped:
+            self.maps.popitem(last=False)
+        return mapped
@@ -0,0 +1,40 @@
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional, Protocol
+
+from app.models.mapping_template import MappingTemplate
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateStore(Protocol):
+    def get(self, fingerprint: str) -> Optional[MappingTemplate]: ...
+    def save(self, template: MappingTemplate) -> None: ...
+
+
+class LocalTemplateStore(TemplateStore):
+    """One JSON file per header fingerprint, the last saved mappings win."""
+
+    def __init__(self, template_folder: str) -> None:
+        self.path = Path(template_folder)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def get(self, fingerprint: str) -> Optional[MappingTemplate]:
+        try:
+            with open(self.path / f"{fingerprint}.json") as f:
+                return MappingTemplate.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.warning(f"Error reading mapping template {fingerprint}: {e}")
+            return None
+
+    def save(self, template: MappingTemplate) -> None:
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.path, suffix=".part", delete=False
+        ) as f:
+            json.dump(template.to_dict(), f)
+        os.replace(f.name, self.path / f"{template.fingerprint}.json")
@@ -0,0 +1,73 @@
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from app.models.schema import Schema, row_rules
+
+DATE_TYPES = ("date", "datetime")
+
+
+@dataclass(frozen=True)
+class ReadHints:
+    """
+    How to read a file for a schema: only the columns that end up as one of its
+    fields, text fields as strings, fields with a fixed set of values as categories,
+    and dates parsed. Columns are named as in the file.
+    """
+
+    # None when every column is read
+    columns: Optional[list[str]] = field(default=None)
+    dtype: dict[str, str] = field(default_factory=dict)
+    dates: list[str] = field(default_factory=list)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Project ``df`` and give it the hinted types, for chunks read without them."""
+        df.columns = df.columns.astype(str)
+        if self.columns is not None:
+            df = df[[name for name in self.columns if name in df.columns]]
+        for name, dtype in self.dtype.items():
+            if name in df.columns and df[name].dtype != dtype:
+                df[name] = df[name].astype(dtype)
+        for name in self.dates:
+            if name in df.columns:
+                df[name] = parse_dates(df[name])
+        return df
+
+    def apply_all(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            yield self.apply(chunk)
+
+
+def parse_dates(series: pd.Series) -> pd.Series:
+    """
+    Parse the values that are dates. Values that aren't, missing ones included, stay
+    as they were so that validation still reports them.
+    """
+    if series.dtype.kind == "M":
+        return series
+    parsed = pd.to_datetime(series, errors="coerce")
+    failed = parsed.isna()
+    if not failed.any():
+        return parsed
+    if failed.all():
+        return series
+    return parsed.astype(object).where(~failed, series.astype(object))
+
+
+def read_hints(schema: Schema, mappings: dict[str, str], columns: list[str]) -> ReadHints:
+    """Hints for reading ``columns`` of a file that ``mappings`` maps onto ``schema``."""
+    read, dtype, dates = [], {}, []
+    for column in columns:
+        # Ignored columns are mapped to None
+        field_name = mappings.get(column, column)
+        if field_name not in schema.definition:
+            continue
+        read.append(column)
+        rules = row_rules(schema.definition[field_name])
+        if rules.get("type") == "string":
+            dtype[column] = "category" if "allowed" in rules else "str"
+        elif rules.get("type") in DATE_TYPES:
+            dates.append(column)
+    return ReadHints(None if read == list(columns) else read, dtype, dates)
@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, Optional, Protocol
+
+from app.models.error_store import ErrorStore
+from app.models.process import CSVValidationError, CSVValidationRequest
+from app.models.schema import Schema, definition_hash
+
+
+class ResultCache(Protocol):
+    def get(self, key: str) -> Optional[ErrorStore]: ...
+    def put(self, key: str, errors: Iterable[CSVValidationError]) -> None: ...
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+def result_key(
+    content_hash: str,
+    schema: Schema,
+    request: CSVValidationRequest,
+    schema_hash: Optional[str] = None,
+) -> str:
+    """
+    Identifies a validation run by file contents, schema definition and mappings.
+    ``schema_hash`` saves hashing the definition again when it is already known.
+    """
+    return _digest(
+        {
+            "content": content_hash,
+            "schema": schema_hash or definition_hash(schema.definition),
+            "mappings": request.mappings,
+            "error_threshold": request.error_threshold,
+        }
+    )
+
+
+class LocalResultCache(ResultCache):
+    def __init__(self, cache_folder: str) -> None:
+        self.path = Path(cache_folder)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[ErrorStore]:
+        try:
+            return ErrorStore.load(self.path / f"{key}.npz", folder=str(self.path))
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, errors: Iterable[CSVValidationError]) -> None:
+        if not isinstance(errors, ErrorStore):
+            errors = ErrorStore(errors)
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=self.path, suffix=".part", delete=False
+        ) as f:
+            errors.save(f)
+        os.replace(f.name, self.path / f"{key}.npz")
@@ -0,0 +1,160 @@
+import json
+import os
+from pathlib import Path
+from typing import Protocol
+
+import pandas as pd
+
+from app.models.schema import Schema
+from app.services.sidecar import PYARROW_AVAILABLE
+
+# Extra columns of a rejects file
+ROW_COLUMN = "_row"
+ERRORS_COLUMN = "_errors"
+# Size of the write buffer of CSV outputs
+WRITE_BUFFER = 1024 * 1024
+# Rows collected before a Parquet row group is written
+ROW_GROUP_ROWS = 100_000
+
+# Column dtypes for the Cerberus types that have an unambiguous one
+DTYPES = {
+    "boolean": "boolean",
+    "float": "float64",
+    "integer": "Int64",
+    "number": "float64",
+    "string": "str",
+}
+
+
+def coerce(df: pd.DataFrame, schema: Schema) -> pd.DataFrame:
+    """
+    Give the columns of valid rows the dtype of their field's type, so every chunk of
+    an output has the same column types.
+    """
+    dtypes = {}
+    for name, rules in schema.definition.items():
+        dtype = DTYPES.get((rules or {}).get("type"))
+        if dtype is not None and name in df.columns and df[name].dtype != dtype:
+            dtypes[name] = dtype
+    for name, dtype in dtypes.items():
+        try:
+            df[name] = df[name].astype(dtype)
+        except (ValueError, TypeError):
+            pass
+    return df
+
+
+class RowWriter(Protocol):
+    """Appends chunks to a file that only appears once ``close`` is called."""
+
+    def write(self, df: pd.DataFrame) -> None: ...
+    def close(self) -> None: ...
+    def discard(self) -> None: ...
+
+
+class _PartFile:
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.part = self.path.with_name(self.path.name + ".part")
+
+    def commit(self) -> None:
+        os.replace(self.part, self.path)
+
+    def discard(self) -> None:
+        self.part.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class CSVRowWriter(_PartFile, RowWriter):
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self.file = open(self.part, "w", newline="", buffering=WRITE_BUFFER)
+        self.header = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.header or len(df):
+            df.to_csv(self.file, header=self.header, index=False)
+            self.header = False
+
+    def close(self) -> None:
+        self.file.close()
+        self.commit()
+
+    def discard(self) -> None:
+        self.file.close()
+        super().discard()
+
+
+class ParquetRowWriter(_PartFile, RowWriter):
+    def __init__(self, path: str, row_group_rows: int = ROW_GROUP_ROWS) -> None:
+        if not PYARROW_AVAILABLE:
+            raise ValueError("Parquet output needs pyarrow to be installed")
+        super().__init__(path)
+        self.row_group_rows = row_group_rows
+        self.pending: list[pd.DataFrame] = []
+        self.rows = 0
+        self.writer = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        if len(df) or self.writer is None and not self.pending:
+            self.pending.append(df)
+            self.rows += len(df)
+        if self.rows >= self.row_group_rows:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        if self.writer is not None:
+            self.writer.close()
+        else:
+            pd.DataFrame().to_parquet(self.part)
+        self.commit()
+
+    def discard(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        super().discard()
+
+    def _flush(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self.pending:
+            return
+        df = pd.concat(self.pending, ignore_index=True)
+        self.pending.clear()
+        self.rows = 0
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.part, table.schema)
+        try:
+            table = table.cast(self.writer.schema)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(f"Rows don't fit the columns written so far: {e}") from e
+        self.writer.write_table(table)
+
+
+OUTPUT_FORMATS = {"csv": CSVRowWriter, "parquet": ParquetRowWriter}
+
+
+def open_writer(path: str, output_format: str) -> RowWriter:
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format}")
+    return OUTPUT_FORMATS[output_format](path)
+
+
+def rejected_rows(df: pd.DataFrame, errors: list[dict]) -> pd.DataFrame:
+    """``df`` with the row number and JSON encoded errors of each row."""
+    df = df.copy()
+    df[ROW_COLUMN] = df.index
+    df[ERRORS_COLUMN] = [json.dumps(e, default=str) for e in errors]
+    return df
@@ -0,0 +1,207 @@
+import re
+from collections.abc import Iterable
+from typing import Callable, Optional
+
+import pandas as pd
+from cerberus import Validator
+
+from app.models.schema import Schema
+
+Check = Callable[[pd.Series], pd.Series]
+
+SUPPORTED_RULES = {"type", "required", "nullable", "regex", "min", "max", "allowed", "meta"}
+TYPES = Validator.types_mapping
+
+# Every value in these dtypes boxes to the same Python type in to_dict("records"),
+# so type checks can be decided once for the whole column.
+KIND_TYPES = {"b": bool, "i": int, "u": int, "f": float}
+
+
+def matches_type(value, type_name: str) -> bool:
+    definition = TYPES[type_name]
+    return isinstance(value, definition.included_types) and not isinstance(
+        value, definition.excluded_types
+    )
+
+
+def _constant(series: pd.Series, value: bool) -> pd.Series:
+    return pd.Series(value, index=series.index, dtype=bool)
+
+
+def _elementwise(series: pd.Series, func: Callable[[object], bool]) -> pd.Series:
+    return series.map(func).astype(bool)
+
+
+def _is_string_dtype(series: pd.Series) -> bool:
+    return isinstance(series.dtype, pd.StringDtype)
+
+
+def _type_check(type_name: str) -> Optional[Check]:
+    if type_name not in TYPES:
+        return None
+
+    def check(series: pd.Series) -> Optional[pd.Series]:
+        kind = series.dtype.kind
+        if kind in KIND_TYPES:
+            return _constant(series, matches_type(KIND_TYPES[kind](), type_name))
+        if _is_string_dtype(series):
+            # Missing values in str columns come through as float NaN
+            missing = series.isna()
+            return (missing & matches_type(float("nan"), type_name)) | (
+                ~missing & matches_type("", type_name)
+            )
+        if kind in ("O", "M"):
+            return _elementwise(series, lambda v: matches_type(v, type_name))
+        return None
+
+    return check
+
+
+def _types_check(data_type) -> Optional[Check]:
+    types = (data_type,) if isinstance(data_type, str) else tuple(data_type)
+    checks = [_type_check(t) for t in types]
+    if not checks or any(c is None for c in checks):
+        return None
+
+    def check(series: pd.Series) -> Optional[pd.Series]:
+        mask = _constant(series, False)
+        for c in checks:
+            result = c(series)
+            if result is None:
+                return None
+            mask |= result
+        return mask
+
+    return check
+
+
+def _regex_check(pattern: str) -> Check:
+    if not pattern.endswith("$"):
+        pattern += "$"
+    regex = re.compile(pattern)
+
+    def check(series: pd.Series) -> pd.Series:
+        if series.dtype.kind in KIND_TYPES:
+            return _constant(series, True)
+        return _elementwise(
+            series, lambda v: not isinstance(v, str) or regex.match(v) is not None
+        )
+
+    return check
+
+
+def _bound_check(bound, rule: str) -> Check:
+    def check(series: pd.Series) -> Optional[pd.Series]:
+        if series.dtype.kind not in KIND_TYPES:
+            return None
+        try:
+            outside = series < bound if rule == "min" else series > bound
+        except TypeError:
+            return None
+        return ~outside
+
+    return check
+
+
+def _allowed_check(allowed: Iterable) -> Check:
+    allowed = list(allowed)
+
+    def is_allowed(value) -> bool:
+        if isinstance(value, Iterable) and not isinstance(value, str):
+            return False
+        return value in allowed
+
+    def check(series: pd.Series) -> Optional[pd.Series]:
+        if series.dtype.kind in ("i", "u", "f") or _is_string_dtype(series):
+            # NaN equality differs between isin and Python's `in`, defer to Cerberus
+            return series.isin(allowed) & series.notna()
+        if series.dtype.kind == "O":
+            return _elementwise(series, is_allowed)
+        return None
+
+    return check
+
+
+class CompiledField:
+    def __init__(self, name: str, rules: dict) -> None:
+        self.name = name
+        self.required = bool(rules.get("required", False))
+        self.nullable = bool(rules.get("nullable", False))
+        self.checks: list[Check] = []
+        self.supported = set(rules) <= SUPPORTED_RULES
+        if not self.supported:
+            return
+
+        builders = {
+            "type": _types_check,
+            "regex": _regex_check,
+            "min": lambda v: _bound_check(v, "min"),
+            "max": lambda v: _bound_check(v, "max"),
+            "allowed": _allowed_check,
+        }
+        for rule, builder in builders.items():
+            if rule in rules:
+                check = builder(rules[rule])
+                if check is None:
+                    self.supported = False
+                    return
+                self.checks.append(check)
+
+    def valid(self, df: pd.DataFrame) -> pd.Series:
+        if self.name not in df.columns:
+            return _constant(df, not self.required)
+        series = df[self.name]
+        if not self.supported:
+            return _constant(series, False)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories
+            if not isinstance(categories.dtype, pd.StringDtype):
+                return self._valid(series.astype(object))
+            # Each category is checked once, missing values as the extra last one
+            values = pd.Series([*categories, None], dtype=categories.dtype)
+            valid = self._valid(values).to_numpy()
+            return pd.Series(valid[series.cat.codes.to_numpy()], index=series.index)
+        return self._valid(series)
+
+    def _valid(self, series: pd.Series) -> pd.Series:
+        mask = _constant(series, True)
+        for check in self.checks:
+            result = check(series)
+            if result is None:
+                return _constant(series, False)
+            mask &= result
+
+        if series.dtype.kind != "O":
+            return mask
+        is_none = _elementwise(series, lambda v: v is None)
+        return (mask & ~is_none) | (is_none & self.nullable)
+
+
+class CompiledSchema:
+    """
+    Column-wise version of a Cerberus schema. ``valid_rows`` only marks a row as valid
+    when Cerberus is guaranteed to accept it, so the remaining rows can be handed to a
+    Validator to produce the exact error messages.
+    """
+
+    def __init__(self, schema: Schema, allow_unknown: bool = False) -> None:
+        self.schema = schema
+        self.allow_unknown = allow_unknown
+        self.fields = [
+            CompiledField(name, rules) for name, rules in schema.row_definition().items()
+        ]
+
+    def valid_rows(self, df: pd.DataFrame) -> pd.Series:
+        if df.columns.has_duplicates:
+            return _constant(df, False)
+        if not self.allow_unknown and not set(df.columns) <= self.schema.fields():
+            return _constant(df, False)
+
+        mask = _constant(df, True)
+        for compiled_field in self.fields:
+            mask &= compiled_field.valid(df)
+        return mask
+
+
+def compile_schema(schema: Schema, allow_unknown: bool = False) -> CompiledSchema:
+    return CompiledSchema(schema, allow_unknown)
@@ -1,49 +1,193 @@
+from collections import defaultdict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterator, Protocol, Optional
-from app.models.schema import Schema
+from typing import Hashable, Iterator, Protocol, Optional
+from app.models.schema import Schema, definition_hash, normalize_column_name
+from app.services.schema_compiler import CompiledSchema, compile_schema
 import json
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+RELOAD_INTERVAL = 1.0
+
 
 class SchemaRepository(Protocol):
     def get_all_schemas(self) -> Iterator[Schema]: ...
     def save_schema(self, schema: Schema) -> None: ...
 
+    def stamps(self) -> Optional[dict[str, Hashable]]:
+        """
+        A marker per schema name that changes whenever the schema does, or None when
+        the repository can't detect changes.
+        """
+        return None
+
+    def load_schema(self, name: str) -> Optional[Schema]:
+        return next((s for s in self.get_all_schemas() if s.name == name), None)
+
 
 class LocalSchemaRepository(SchemaRepository):
     def __init__(self, schema_folder: str) -> None:
         self.path = Path(schema_folder)
         if not self.path.exists():
             self.path.mkdir(parents=True)
+        self.folder_mtime: Optional[int] = None
+        self.files: dict[str, Path] = {}
 
     def get_all_schemas(self) -> Iterator[Schema]:
         for file in self.path.glob("*.json"):
-            with open(file) as jsonfile:
-                try:
-                    definition = json.load(jsonfile)
-                    yield Schema(file.stem, definition)
-                except (json.JSONDecodeError, UnicodeDecodeError) as e:
-                    logger.warning(f"Error reading file {file.name}: {e}")
-                    continue
+            schema = self._read(file)
+            if schema is not None:
+                yield schema
 
     def save_schema(self, schema: Schema) -> None:
         with open(self.path / f"{schema.name}.json", "w") as f:
             json.dump(schema.definition, f)
 
+    def stamps(self) -> dict[str, tuple[int, int]]:
+        # Adding, removing or renaming a file changes the folder's mtime, so the folder
+        # is only listed again then. Edits in place are caught by the file stats.
+        folder_mtime = self.path.stat().st_mtime_ns
+        if folder_mtime != self.folder_mtime:
+            self.folder_mtime = folder_mtime
+            self.files = {file.stem: file for file in self.path.glob("*.json")}
+        stamps = {}
+        for name, file in self.files.items():
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            stamps[name] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    def load_schema(self, name: str) -> Optional[Schema]:
+        return self._read(self.path / f"{name}.json")
+
+    def _read(self, file: Path) -> Optional[Schema]:
+        try:
+            with open(file) as jsonfile:
+                return Schema(file.stem, json.load(jsonfile))
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.warning(f"Error reading file {file.name}: {e}")
+            return None
+
+
+@dataclass(frozen=True)
+class SchemaEntry:
+    """A schema with the values derived from it, built once per version."""
+
+    schema: Schema
+    fields: frozenset[str]
+    # Normalized field name to the field name in the definition
+    normalized_fields: dict[str, str]
+    compiled: CompiledSchema
+    definition_hash: str
+
+    @classmethod
+    def build(cls, schema: Schema) -> "SchemaEntry":
+        return cls(
+            schema=schema,
+            fields=frozenset(schema.fields()),
+            normalized_fields={normalize_column_name(f): f for f in schema.definition},
+            compiled=compile_schema(schema),
+            definition_hash=definition_hash(schema.definition),
+        )
+
 
 class SchemaRegistry:
-    def __init__(self, repository: SchemaRepository) -> None:
+    """
+    Schemas by name with derived data per schema. Repositories that provide stamps are
+    checked for changes at most every ``reload_interval`` seconds, and only changed
+    schemas are loaded again. ``None`` turns reloading off.
+    """
+
+    def __init__(
+        self,
+        repository: SchemaRepository,
+        reload_interval: Optional[float] = RELOAD_INTERVAL,
+    ) -> None:
         self.repository = repository
-        self.schemas = {s.name: s for s in self.repository.get_all_schemas()}
+        self.reload_interval = reload_interval
+        self.schemas: dict[str, Schema] = {}
+        self.entries: dict[str, SchemaEntry] = {}
+        self.field_index: dict[str, set[str]] = defaultdict(set)
+        self.stamps: Optional[dict[str, Hashable]] = repository.stamps()
+        self.checked = time.monotonic()
+        self.lock = threading.Lock()
+        if self.stamps is None:
+            for schema in self.repository.get_all_schemas():
+                self._add(schema)
+        else:
+            for name in self.stamps:
+                schema = self.repository.load_schema(name)
+                if schema is not None:
+                    self._add(schema)
 
     def available_schemas(self) -> list[str]:
+        self.refresh()
         return list(self.schemas.keys())
 
     def get_schema(self, schema_name: str) -> Optional[Schema]:
+        self.refresh()
         return self.schemas.get(schema_name)
 
+    def entry(self, schema_name: str) -> Optional[SchemaEntry]:
+        self.refresh()
+        return self.entries.get(schema_name)
+
+    def schemas_with_field(self, field_name: str) -> set[str]:
+        """Schemas with a field whose normalized name is ``field_name``."""
+        self.refresh()
+        return self.field_index.get(field_name, set())
+
     def register_schema(self, schema: Schema) -> None:
         self.repository.save_schema(schema)
+        with self.lock:
+            self._add(schema)
+            if self.stamps is not None:
+                # Only this schema is known to be current, others wait for refresh
+                self.stamps[schema.name] = self.repository.stamps().get(schema.name)
+
+    def refresh(self, force: bool = False) -> None:
+        """Reload schemas whose files changed since the last check."""
+        if self.stamps is None or (self.reload_interval is None and not force):
+            return
+        now = time.monotonic()
+        if not force and now - self.checked < self.reload_interval:
+            return
+        with self.lock:
+            self.checked = now
+            stamps = self.repository.stamps()
+            for name in self.stamps.keys() - stamps.keys():
+                logger.info(f"Schema {name} was removed")
+                self._remove(name)
+            for name, stamp in stamps.items():
+                if self.stamps.get(name) == stamp:
+                    continue
+                schema = self.repository.load_schema(name)
+                if schema is None:
+                    # Keep the last good version while a file is half written or broken
+                    continue
+                logger.info(f"Reloading schema {name}")
+                self._add(schema)
+            self.stamps = stamps
+
+    def _add(self, schema: Schema) -> None:
+        self._remove(schema.name)
+        entry = SchemaEntry.build(schema)
         self.schemas[schema.name] = schema
+        self.entries[schema.name] = entry
+        for field_name in entry.normalized_fields:
+            self.field_index[field_name].add(schema.name)
+
+    def _remove(self, name: str) -> None:
+        previous = self.entries.pop(name, None)
+        self.schemas.pop(name, None)
+        if previous is not None:
+            for field_name in previous.normalized_fields:
+                self.field_index[field_name].discard(name)
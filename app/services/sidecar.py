@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PYARROW_AVAILABLE = find_spec("pyarrow") is not None
+SIDECAR_SUFFIX = ".parquet"
+SIDECAR_ROWS = 10000
+MANIFEST = "manifest.json"
+
+
+def sidecar_path(source: Path) -> Path:
+    """Sidecars sit next to the real file, so every link to a blob shares one."""
+    real = Path(source).resolve()
+    return real.with_name(real.name + SIDECAR_SUFFIX)
+
+
+def _source_key(source: Path) -> list[int]:
+    stat = Path(source).stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _manifest(sidecar: Path) -> dict:
+    try:
+        return json.loads((sidecar / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def find_sidecar(source: Path) -> Optional[Path]:
+    """Return the sidecar for ``source`` if it exists and was built from its current contents."""
+    if not PYARROW_AVAILABLE:
+        return None
+    sidecar = sidecar_path(source)
+    manifest = _manifest(sidecar)
+    if not manifest:
+        return None
+    if manifest.get("source") != _source_key(source):
+        shutil.rmtree(sidecar, ignore_errors=True)
+        return None
+    return sidecar
+
+
+def read_sidecar(
+    sidecar: Path, columns: Optional[list[str]] = None
+) -> Iterator[pd.DataFrame]:
+    for part in sorted(sidecar.glob("part-*.parquet")):
+        yield pd.read_parquet(part, columns=columns)
+
+
+def text_columns(sidecar: Path) -> set[str]:
+    """Columns stored as text in every part, so their values are as written in the file."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    text = None
+    for part in sorted(sidecar.glob("part-*.parquet")):
+        names = {
+            f.name
+            for f in pq.read_schema(part)
+            if pa.types.is_string(f.type) or pa.types.is_large_string(f.type)
+        }
+        text = names if text is None else text & names
+    return text or set()
+
+
+def forced_text(sidecar: Path) -> set[str]:
+    """Columns read as text on purpose, which a plain read of the file may type differently."""
+    return set(_manifest(sidecar).get("text", []))
+
+
+def write_sidecar(
+    source: Path, chunks: Iterable[pd.DataFrame], text: Iterable[str] = ()
+) -> Iterator[pd.DataFrame]:
+    """
+    Pass ``chunks`` through while writing each one to a Parquet part. The sidecar is
+    only moved into place once every chunk has been consumed. ``text`` names the
+    columns the chunks were read as text for.
+    """
+    target = sidecar_path(source)
+    key = _source_key(source)
+    temp = Path(tempfile.mkdtemp(dir=target.parent, prefix=".sidecar-"))
+    writing = True
+    complete = False
+    try:
+        for part, chunk in enumerate(chunks):
+            if writing:
+                try:
+                    chunk.rename(columns=str).to_parquet(
+                        temp / f"part-{part:05d}.parquet"
+                    )
+                except (ValueError, TypeError, NotImplementedError) as e:
+                    logger.warning(f"Not writing a sidecar for {source}: {e}")
+                    writing = False
+            yield chunk
+        complete = True
+    finally:
+        if writing and complete:
+            (temp / MANIFEST).write_text(json.dumps({"source": key, "text": sorted(text)}))
+            try:
+                os.rename(temp, target)
+            except OSError:
+                # Another reader finished the same sidecar first
+                pass
+        shutil.rmtree(temp, ignore_errors=True)
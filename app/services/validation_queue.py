@@ -0,0 +1,242 @@
+import csv
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Optional, Protocol
+from uuid import UUID
+
+from app.models.error_store import ErrorStore
+from app.models.job import JobStatus, ValidationJob
+from app.models.process import (
+    CSVValidationError,
+    CSVValidationRequest,
+    CSVValidationResponse,
+)
+from app.services.csv_service import CSVServiceImpl
+from app.services.csv_storage import CSVStorage
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore(Protocol):
+    def get(self, job_id: UUID) -> Optional[ValidationJob]: ...
+    def save(self, job: ValidationJob) -> None: ...
+    def append_errors(self, job_id: UUID, errors: list[CSVValidationError]) -> None: ...
+    def clear_errors(self, job_id: UUID) -> None: ...
+    def read_errors(
+        self, job_id: UUID, offset: int = 0
+    ) -> tuple[list[CSVValidationError], int]: ...
+
+
+class LocalJobStore(JobStore):
+    """
+    Keeps one JSON file per job so that web workers and validation processes see the
+    same state. Errors found so far are appended to a JSON lines file next to it, the
+    errors of a finished job are kept in an ErrorStore file.
+    """
+
+    def __init__(self, job_folder: str) -> None:
+        self.path = Path(job_folder)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def get(self, job_id: UUID) -> Optional[ValidationJob]:
+        try:
+            with open(self.path / f"{job_id}.json") as f:
+                job = ValidationJob.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        errors = self.path / f"{job_id}.errors.npz"
+        if job.status == JobStatus.DONE and errors.exists():
+            job.result = CSVValidationResponse.from_request(job.request)
+            job.result.errors = ErrorStore.load(errors, folder=str(self.path))
+        return job
+
+    def save(self, job: ValidationJob) -> None:
+        # Write then rename so readers never see a half-written job
+        if job.result is not None:
+            errors = job.result.errors
+            if not isinstance(errors, ErrorStore):
+                errors = ErrorStore(errors)
+            with tempfile.NamedTemporaryFile(
+                "wb", dir=self.path, suffix=".part", delete=False
+            ) as f:
+                errors.save(f)
+            os.replace(f.name, self.path / f"{job.id}.errors.npz")
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.path, suffix=".part", delete=False
+        ) as f:
+            json.dump(job.to_dict(include_errors=False), f)
+        os.replace(f.name, self.path / f"{job.id}.json")
+
+    def append_errors(self, job_id: UUID, errors: list[CSVValidationError]) -> None:
+        with open(self.path / f"{job_id}.errors.jsonl", "a") as f:
+            f.writelines(json.dumps(e.to_dict()) + "\n" for e in errors)
+
+    def clear_errors(self, job_id: UUID) -> None:
+        (self.path / f"{job_id}.errors.jsonl").unlink(missing_ok=True)
+        (self.path / f"{job_id}.errors.npz").unlink(missing_ok=True)
+
+    def read_errors(
+        self, job_id: UUID, offset: int = 0
+    ) -> tuple[list[CSVValidationError], int]:
+        """Errors appended after byte ``offset``, and the offset to continue from."""
+        try:
+            with open(self.path / f"{job_id}.errors.jsonl", "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+        # A line still being written is picked up by the next read
+        complete = data[: data.rfind(b"\n") + 1]
+        errors = [
+            CSVValidationError.from_dict(json.loads(line))
+            for line in complete.splitlines()
+        ]
+        return errors, offset + len(complete)
+
+
+_worker_service: Optional[CSVServiceImpl] = None
+_worker_jobs: Optional[JobStore] = None
+
+
+def _init_worker(
+    service_factory: Callable[[], CSVServiceImpl], job_folder: str
+) -> None:
+    global _worker_service, _worker_jobs
+    _worker_service = service_factory()
+    _worker_jobs = LocalJobStore(job_folder)
+
+
+def run_validation_job(
+    job: ValidationJob, service: CSVServiceImpl, jobs: JobStore
+) -> ValidationJob:
+    job.status = JobStatus.RUNNING
+    jobs.save(job)
+    found = ErrorStore()
+    pending: list[CSVValidationError] = []
+
+    def flush() -> None:
+        jobs.append_errors(job.id, pending)
+        pending.clear()
+        job.error_count = len(found)
+
+    def on_progress(processed_rows: int) -> None:
+        # Errors are written before the job so readers never count missing errors
+        flush()
+        job.processed_rows = processed_rows
+        jobs.save(job)
+
+    try:
+        for error in service.stream_errors(job.request, on_progress=on_progress):
+            found.append(error)
+            pending.append(error)
+        flush()
+        job.result = CSVValidationResponse.from_request(job.request)
+        job.result.errors = found
+        job.status = JobStatus.DONE
+    except Exception as e:
+        logger.warning(f"Validation job {job.id} failed: {e}", exc_info=True)
+        job.status = JobStatus.FAILED
+        job.message = str(e)
+    jobs.save(job)
+    return job
+
+
+def _run_in_worker(job: ValidationJob) -> None:
+    run_validation_job(job, _worker_service, _worker_jobs)
+
+
+class ValidationQueue:
+    """
+    Runs validation requests in a pool of worker processes, outside the web request.
+    The pool is only started when the first job is submitted.
+    """
+
+    def __init__(
+        self,
+        jobs: JobStore,
+        csv_store: CSVStorage,
+        service_factory: Callable[[], CSVServiceImpl],
+        job_folder: str,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        self.jobs = jobs
+        self.csv_store = csv_store
+        self.service_factory = service_factory
+        self.job_folder = job_folder
+        self.max_workers = max_workers
+        self.executor: Optional[Executor] = None
+
+    def submit(self, request: CSVValidationRequest) -> ValidationJob:
+        job = ValidationJob(request=request, total_rows=self._estimate_rows(request))
+        self._start(job)
+        return job
+
+    def retry(self, job_id: UUID) -> Optional[ValidationJob]:
+        """
+        Run a failed job again. Services with a checkpoint store continue from the
+        job's last checkpoint instead of the first row.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.status != JobStatus.FAILED:
+            return job
+        # Errors found before the checkpoint are streamed again by the new run
+        self.jobs.clear_errors(job_id)
+        job.status = JobStatus.PENDING
+        job.message = None
+        job.processed_rows = 0
+        job.error_count = 0
+        self._start(job)
+        return job
+
+    def get(self, job_id: UUID) -> Optional[ValidationJob]:
+        return self.jobs.get(job_id)
+
+    def read_errors(
+        self, job_id: UUID, offset: int = 0
+    ) -> tuple[list[CSVValidationError], int]:
+        return self.jobs.read_errors(job_id, offset)
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def _start(self, job: ValidationJob) -> None:
+        self.jobs.save(job)
+        try:
+            future = self._executor().submit(_run_in_worker, job)
+        except BrokenProcessPool:
+            # A killed worker breaks the whole pool, later jobs need a new one
+            self.executor = None
+            future = self._executor().submit(_run_in_worker, job)
+        future.add_done_callback(lambda f: self._record_crash(job, f))
+
+    def _executor(self) -> Executor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.service_factory, self.job_folder),
+            )
+        return self.executor
+
+    def _estimate_rows(self, request: CSVValidationRequest) -> Optional[int]:
+        try:
+            stats = self.csv_store.upload_stats(request.file)
+        except (OSError, ValueError, csv.Error):
+            return None
+        return stats.lines if stats else None
+
+    def _record_crash(self, job: ValidationJob, future) -> None:
+        # Exceptions inside validation are recorded by the worker, this only catches
+        # the pool itself going away (e.g. a killed worker process)
+        if future.exception() is None:
+            return
+        job.status = JobStatus.FAILED
+        job.message = str(future.exception())
+        self.jobs.save(job)
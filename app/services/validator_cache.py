@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from cerberus import Validator
+
+from app.models.schema import Schema, definition_hash
+
+VALIDATOR_CACHE_SIZE = 64
+
+
+@dataclass(frozen=True)
+class SchemaValidators:
+    definition_hash: str
+    validator: Validator
+    # One validator per field, for checking single values against that field's rules
+    fields: dict[str, Validator]
+
+
+class ValidatorCache:
+    """
+    Cerberus validators per schema, keyed by schema name and definition hash so that a
+    changed schema gets new validators. Validators keep the state of the last document
+    they checked, so every thread gets its own.
+    """
+
+    def __init__(self, maxsize: int = VALIDATOR_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.local = threading.local()
+
+    def validator(self, schema: Schema, schema_hash: Optional[str] = None) -> Validator:
+        return self.get(schema, schema_hash).validator
+
+    def field_validators(
+        self, schema: Schema, schema_hash: Optional[str] = None
+    ) -> dict[str, Validator]:
+        return self.get(schema, schema_hash).fields
+
+    def get(self, schema: Schema, schema_hash: Optional[str] = None) -> SchemaValidators:
+        schema_hash = schema_hash or definition_hash(schema.definition)
+        entries = self._entries()
+        cached = entries.get(schema.name)
+        if cached is not None and cached.definition_hash == schema_hash:
+            entries.move_to_end(schema.name)
+            return cached
+
+        # Replaces the validators of an older version of the schema
+        definition = schema.row_definition()
+        validators = SchemaValidators(
+            definition_hash=schema_hash,
+            validator=Validator(definition),
+            fields={
+                name: Validator({name: rules}, allow_unknown=True)
+                for name, rules in definition.items()
+            },
+        )
+        entries[schema.name] = validators
+        entries.move_to_end(schema.name)
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return validators
+
+    def clear(self) -> None:
+        self._entries().clear()
+
+    def _entries(self) -> OrderedDict[str, SchemaValidators]:
+        if not hasattr(self.local, "entries"):
+            self.local.entries = OrderedDict()
+        return self.local.entries
+
+
+validator_cache = ValidatorCache()
@@ -0,0 +1,239 @@
+"""
+Validate every CSV file in directories or globs without going through the web app.
+
+    uv run batch.py data/incoming --schema sales --output summary.jsonl
+    uv run batch.py "data/incoming/**/*.csv" --templates data/templates --workers 8
+
+Files are validated in parallel worker processes through CSVServiceImpl. A file whose
+header matches a saved mapping template uses its schema and mappings. Otherwise the
+mappings are guessed for --schema, or for the recommended schema without one. One JSON
+line per file is written as files finish, and throughput is printed to stderr. Files
+that hit the error threshold are marked partial, their rows are those read until then.
+Exits with status 1 when any file is invalid or couldn't be validated. When pyarrow
+is installed, validating against a schema without string fields also writes a Parquet
+sidecar next to the file, see LocalFileStorage.read_chunk.
+
+With --split, the valid rows of each file are written to <name>.clean.csv (or
+.parquet) and the invalid ones with their errors to <name>.rejects.csv in that folder,
+in the same pass as validation.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Optional
+
+from app.models.process import CSVValidationRequest
+from app.services import STORAGE_BACKENDS
+from app.services.csv_service import CSVServiceImpl
+from app.services.mapping_templates import LocalTemplateStore
+from app.services.result_cache import LocalResultCache
+from app.services.row_writers import OUTPUT_FORMATS
+from app.services.sidecar import PYARROW_AVAILABLE
+from app.services.schema_registry import LocalSchemaRepository, SchemaRegistry
+from config import Config
+
+# Failed rules listed per invalid file, most frequent first
+SUMMARY_RULES = 5
+
+
+@dataclass(frozen=True)
+class BatchOptions:
+    schema: Optional[str]
+    schema_folder: str
+    template_folder: Optional[str]
+    result_folder: Optional[str]
+    storage: str
+    error_threshold: int
+    split_folder: Optional[str] = None
+    split_format: str = "csv"
+
+
+# Services of a worker process, one per folder since storage is rooted at a folder
+_services: dict[str, CSVServiceImpl] = {}
+
+
+def _service(folder: Path, options: BatchOptions) -> CSVServiceImpl:
+    key = str(folder)
+    if key not in _services:
+        _services[key] = CSVServiceImpl(
+            STORAGE_BACKENDS[options.storage](key),
+            SchemaRegistry(
+                LocalSchemaRepository(options.schema_folder), reload_interval=None
+            ),
+            LocalResultCache(options.result_folder) if options.result_folder else None,
+            template_store=LocalTemplateStore(options.template_folder)
+            if options.template_folder
+            else None,
+        )
+    return _services[key]
+
+
+def validate_file(path: str, options: BatchOptions) -> dict:
+    """Validate one file and summarise it, errors end up in the summary too."""
+    started = time.perf_counter()
+    file = Path(path)
+    summary = {"file": path}
+    try:
+        summary["bytes"] = file.stat().st_size
+        service = _service(file.parent, options)
+        inspection = service.inspect_template(file.name, options.schema)
+        source = "template"
+        if inspection is None:
+            schema = options.schema
+            if schema is None:
+                recommended = service.recommend_schema(file.name)
+                if recommended is None:
+                    raise ValueError("No schema matches the file")
+                schema = recommended.name
+            inspection = service.inspect(file.name, schema)
+            source = "inspection"
+
+        mappings = {col: f for col, f in inspection.suggestions.items() if f}
+        request = CSVValidationRequest(
+            id=uuid.uuid4(),
+            file=file.name,
+            schema=inspection.schema.name,
+            mappings=mappings,
+            error_threshold=options.error_threshold,
+        )
+        summary |= {
+            "schema": request.schema,
+            "mappings_from": source,
+            "mappings": mappings,
+        }
+        if options.split_folder is not None:
+            summary |= split_file(service, request, options)
+        else:
+            rows = []
+            response = service.validate(request, on_progress=rows.append)
+            failures = getattr(response.errors, "summary", [])
+            summary |= {
+                "status": "valid" if response.is_valid() else "invalid",
+                "rows": rows[-1] if rows else 0,
+                # Validation stops past the error threshold, rows only counts so far
+                "partial": len(response.errors) > options.error_threshold,
+                "errors": len(response.errors),
+                "failures": [
+                    rule.to_dict() for rule in islice(failures, SUMMARY_RULES)
+                ],
+            }
+    except Exception as e:
+        summary |= {"status": "failed", "message": str(e)}
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def split_file(
+    service: CSVServiceImpl, request: CSVValidationRequest, options: BatchOptions
+) -> dict:
+    split = service.split_rows(request, options.split_folder, options.split_format)
+    return {
+        "status": "invalid" if split.rejected_rows else "valid",
+        "rows": split.clean_rows + split.rejected_rows,
+        "errors": split.rejected_rows,
+        "clean": split.clean,
+        "rejects": split.rejects,
+    }
+
+
+def find_files(patterns: list[str]) -> list[str]:
+    """CSV files in the given directories, matching the given globs, or named."""
+    files = {}
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = sorted(str(p) for p in path.glob("*.csv"))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern] if path.is_file() else []
+        files.update(dict.fromkeys(m for m in matches if Path(m).is_file()))
+    return list(files)
+
+
+def run(files: list[str], options: BatchOptions, workers: int, output) -> list[dict]:
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(validate_file, file, options) for file in files]
+        for future in as_completed(futures):
+            summary = future.result()
+            output.write(json.dumps(summary, default=str) + "\n")
+            output.flush()
+            summaries.append(summary)
+    return summaries
+
+
+def throughput(summaries: list[dict], seconds: float) -> str:
+    rows = sum(s.get("rows", 0) for s in summaries)
+    megabytes = sum(s.get("bytes", 0) for s in summaries) / 1024 / 1024
+    statuses = [s["status"] for s in summaries]
+    return (
+        f"{len(summaries)} files, {rows:,} rows, {megabytes:.1f} MB in {seconds:.1f}s "
+        f"({rows / seconds:,.0f} rows/s, {megabytes / seconds:.1f} MB/s): "
+        f"{statuses.count('valid')} valid, {statuses.count('invalid')} invalid, "
+        f"{statuses.count('failed')} failed"
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("paths", nargs="+", help="directories, globs or files")
+    parser.add_argument("--schema", help="schema to validate against, else recommended")
+    parser.add_argument("--schema-folder", default=Config.SCHEMA_FOLDER)
+    parser.add_argument("--templates", help="folder of saved mapping templates")
+    parser.add_argument("--result-folder", help="cache validation results here")
+    parser.add_argument("--storage", choices=list(STORAGE_BACKENDS), default="local")
+    parser.add_argument("--error-threshold", type=int, default=100)
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="defaults to every core"
+    )
+    parser.add_argument("--output", default="-", help="JSON lines file, - for stdout")
+    parser.add_argument("--split", help="write clean and rejected rows to this folder")
+    # Parquet is only written when pyarrow is installed
+    formats = [f for f in OUTPUT_FORMATS if f != "parquet" or PYARROW_AVAILABLE]
+    parser.add_argument("--split-format", choices=formats, default="csv")
+    args = parser.parse_args(argv)
+
+    files = find_files(args.paths)
+    if not files:
+        parser.error("no CSV files found")
+    if args.schema is not None:
+        registry = SchemaRegistry(LocalSchemaRepository(args.schema_folder), None)
+        if registry.get_schema(args.schema) is None:
+            parser.error(f"schema {args.schema} not found in {args.schema_folder}")
+
+    options = BatchOptions(
+        schema=args.schema,
+        schema_folder=args.schema_folder,
+        template_folder=args.templates,
+        result_folder=args.result_folder,
+        storage=args.storage,
+        error_threshold=args.error_threshold,
+        split_folder=args.split,
+        split_format=args.split_format,
+    )
+    started = time.perf_counter()
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        summaries = run(files, options, min(args.workers, len(files)), output)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(throughput(summaries, elapsed), file=sys.stderr)
+    return 0 if all(s["status"] == "valid" for s in summaries) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
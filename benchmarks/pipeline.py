@@ -0,0 +1,270 @@
+"""
+Time the upload, inspect, recommend and validate steps on generated files.
+
+    uv run python -m benchmarks.pipeline --rows 10000 100000 --error-rates 0 0.05
+    uv run python -m benchmarks.pipeline --save-baseline benchmarks/baseline.json
+    uv run python -m benchmarks.pipeline --baseline benchmarks/baseline.json
+
+Each step runs in a fresh process, the way validation runs in a worker, so that peak
+RSS is measured per step, imports included. Comparing against a baseline exits with
+status 1 when any step is slower than the tolerance.
+"""
+
+import argparse
+import json
+import random
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Callable
+
+from werkzeug.datastructures import FileStorage
+
+from app.models.process import CSVValidationRequest
+from app.services import STORAGE_BACKENDS
+from app.services.csv_service import CSVServiceImpl
+from app.services.csv_storage import probe_cache
+from app.services.schema_registry import LocalSchemaRepository, SchemaRegistry
+
+SCHEMA_FOLDER = Path(__file__).parent.parent / "data" / "schemas"
+STEPS = ("save_uploaded_file", "inspect", "recommend_schema", "validate")
+
+NAMES = ["Ana", "Björn", "Chloé", "Dmitri", "Eun-ji", "François", "Grace", "Zoë"]
+COUNTRIES = ["Australia", "Canada", "India", "New Zealand", "UK", "USA"]
+PRODUCTS = ["Almond Choco", "Caramel Nuts", "Crème Brûlée", "Drinking Coco"]
+FORMS = ["Hardcover", "Paperback", "Board book"]
+
+
+def sales_row(i: int, rng: random.Random, invalid: bool) -> list:
+    # Invalid rows leave a required field empty, a bad number would turn the whole
+    # column into strings and fail every row
+    return [
+        "" if invalid else rng.choice(NAMES),
+        rng.choice(COUNTRIES),
+        rng.choice(PRODUCTS),
+        f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+        f"${rng.randint(0, 20000)}.{rng.randint(0, 99):02d}",
+        rng.randint(0, 500),
+    ]
+
+
+def books_row(i: int, rng: random.Random, invalid: bool) -> list:
+    return [
+        f"Book {i}",
+        rng.choice(NAMES),
+        f"{rng.uniform(1, 5):.1f} out of 5 stars",
+        "Scroll" if invalid else rng.choice(FORMS),
+        f"€{rng.randint(1, 60)}.{rng.randint(0, 99):02d}",
+        rng.choice(["Fiction", "History", "Science", "Poésie"]),
+        rng.randint(0, 100000),
+        f"{rng.randint(1950, 2024)}-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+        round(rng.uniform(20, 1200), 1),
+    ]
+
+
+def default_row(i: int, rng: random.Random, invalid: bool) -> list:
+    name = rng.choice(NAMES).lower()
+    return [
+        i,
+        f"{name}{i}.example.com" if invalid else f"{name}{i}@example.com",
+        rng.randint(0, 120),
+    ]
+
+
+GENERATORS: dict[str, Callable[[int, random.Random, bool], list]] = {
+    "sales": sales_row,
+    "books": books_row,
+    "default": default_row,
+}
+
+
+@dataclass(frozen=True)
+class Case:
+    schema: str
+    rows: int
+    error_rate: float
+    encoding: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.schema}/{self.rows}/{self.error_rate}/{self.encoding}"
+
+
+@dataclass
+class CaseResult:
+    case: Case
+    seconds: dict[str, float] = field(default_factory=dict)
+    peak_rss_mb: dict[str, float] = field(default_factory=dict)
+    errors: int = 0
+
+    def rows_per_second(self, step: str) -> float:
+        seconds = self.seconds[step]
+        return self.case.rows / seconds if seconds else float("inf")
+
+
+def write_csv(path: Path, case: Case, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    registry = SchemaRegistry(LocalSchemaRepository(str(SCHEMA_FOLDER)))
+    header = list(registry.get_schema(case.schema).definition)
+    row = GENERATORS[case.schema]
+    with open(path, "w", encoding=case.encoding, newline="") as f:
+        f.write(",".join(header) + "\n")
+        for start in range(0, case.rows, 10000):
+            f.writelines(
+                ",".join(map(str, row(i, rng, rng.random() < case.error_rate))) + "\n"
+                for i in range(start, min(start + 10000, case.rows))
+            )
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def run_step(
+    step: str, case: Case, source: Path, folder: Path, storage: str, file_name: str
+) -> tuple[object, float, float]:
+    """Result, seconds and peak RSS of one step, run in a process of its own."""
+    probe_cache.clear()
+    service = CSVServiceImpl(
+        STORAGE_BACKENDS[storage](str(folder)),
+        SchemaRegistry(LocalSchemaRepository(str(SCHEMA_FOLDER))),
+    )
+    start = time.perf_counter()
+    if step == "save_uploaded_file":
+        with open(source, "rb") as f:
+            upload = FileStorage(f, filename=source.name, content_type="text/csv")
+            value = service.upload_file(upload)
+    elif step == "inspect":
+        value = service.inspect(file_name, case.schema).score
+    elif step == "recommend_schema":
+        value = service.recommend_schema(file_name).name
+    else:
+        request = CSVValidationRequest(
+            id=uuid.uuid4(),
+            file=file_name,
+            schema=case.schema,
+            mappings={},
+            error_threshold=case.rows,
+        )
+        value = len(service.validate(request).errors)
+    return value, time.perf_counter() - start, peak_rss_mb()
+
+
+def run(case: Case, folder: Path, storage: str) -> CaseResult:
+    source = folder / f"{case.schema}-{case.rows}-{case.encoding}.csv"
+    write_csv(source, case)
+    uploads = folder / "uploads"
+    uploads.mkdir(exist_ok=True)
+    result = CaseResult(case)
+    file_name = source.name
+    for step in STEPS:
+        # ru_maxrss is the peak over the life of a process, so each step gets its own
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            value, seconds, peak = pool.submit(
+                run_step, step, case, source, uploads, storage, file_name
+            ).result()
+        result.seconds[step] = seconds
+        result.peak_rss_mb[step] = peak
+        if step == "save_uploaded_file":
+            file_name = value
+        elif step == "validate":
+            result.errors = value
+    return result
+
+
+def compare(
+    results: list[CaseResult], baseline: dict, tolerance: float
+) -> list[str]:
+    """Steps whose rows/sec dropped by more than ``tolerance`` against the baseline."""
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.case.key, {}).get("rows_per_second", {})
+        for step in STEPS:
+            if step not in previous:
+                continue
+            current = result.rows_per_second(step)
+            if current < previous[step] * (1 - tolerance):
+                regressions.append(
+                    f"{result.case.key} {step}: {current:,.0f} rows/s, "
+                    f"baseline {previous[step]:,.0f} rows/s"
+                )
+    return regressions
+
+
+def to_baseline(results: list[CaseResult]) -> dict:
+    return {
+        result.case.key: {
+            "case": asdict(result.case),
+            "seconds": result.seconds,
+            "rows_per_second": {step: result.rows_per_second(step) for step in STEPS},
+            "peak_rss_mb": result.peak_rss_mb,
+            "errors": result.errors,
+        }
+        for result in results
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--schemas", nargs="+", default=list(GENERATORS))
+    parser.add_argument("--rows", nargs="+", type=int, default=[10000, 100000])
+    parser.add_argument("--error-rates", nargs="+", type=float, default=[0.0, 0.05])
+    parser.add_argument("--encodings", nargs="+", default=["utf-8", "utf-16"])
+    parser.add_argument("--storage", choices=list(STORAGE_BACKENDS), default="local")
+    parser.add_argument("--baseline", help="compare against this baseline JSON")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed drop in rows/sec before a step counts as a regression",
+    )
+    parser.add_argument("--folder", help="where to write the generated files")
+    args = parser.parse_args()
+
+    cases = [
+        Case(schema, rows, error_rate, encoding)
+        for schema in args.schemas
+        for rows in args.rows
+        for error_rate in args.error_rates
+        for encoding in args.encodings
+    ]
+    results = []
+    for case in cases:
+        with tempfile.TemporaryDirectory(dir=args.folder) as folder:
+            result = run(case, Path(folder), args.storage)
+        results.append(result)
+        cells = "  ".join(
+            f"{step}={result.seconds[step]:.3f}s ({result.rows_per_second(step):,.0f}/s)"
+            for step in STEPS
+        )
+        print(
+            f"{case.key:<32} {cells}  errors={result.errors}  "
+            f"peak={max(result.peak_rss_mb.values()):.0f}MB"
+        )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(to_baseline(results), f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
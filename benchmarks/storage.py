@@ -0,0 +1,92 @@
+"""
+Compare LocalFileStorage and MappedFileStorage read times.
+
+    uv run python -m benchmarks.storage --sizes 10MB 100MB 1GB 5GB
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from app.services.csv_storage import LocalFileStorage, probe_cache
+from app.services.mapped_storage import MappedFileStorage
+from app.services.sidecar import sidecar_path
+
+UNITS = {"KB": 1024, "MB": 1024**2, "GB": 1024**3}
+BACKENDS = {"local": LocalFileStorage, "mapped": MappedFileStorage}
+
+
+def parse_size(size: str) -> int:
+    for unit, factor in UNITS.items():
+        if size.upper().endswith(unit):
+            return int(float(size[: -len(unit)]) * factor)
+    return int(size)
+
+
+def write_csv(path: Path, size: int) -> None:
+    header = "sales_person,country,product,date,amount,boxes_shipped\n"
+    with open(path, "w") as f:
+        f.write(header)
+        written, row = len(header), 0
+        while written < size:
+            lines = "".join(
+                f"Person {i % 97},Country {i % 13},Product {i % 31},"
+                f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d},${i % 1000}.{i % 100:02d},{i % 500}\n"
+                for i in range(row, row + 10000)
+            )
+            f.write(lines)
+            written += len(lines)
+            row += 10000
+
+
+def timed(func, source: Path) -> float:
+    """Time ``func``, dropping any sidecar it built so every read goes to the CSV."""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(sidecar_path(source), ignore_errors=True)
+    return elapsed
+
+
+def run(folder: Path, size: int, read_all_limit: int) -> dict[str, dict[str, float]]:
+    source = folder / "bench.csv"
+    write_csv(source, size)
+    results = {}
+    for name, backend in BACKENDS.items():
+        probe_cache.clear()
+        storage = backend(str(folder))
+        timings = {
+            "peek": timed(lambda: storage.peek("bench.csv"), source),
+            "read_chunk": timed(
+                lambda: sum(len(c) for c in storage.read_chunk("bench.csv")), source
+            ),
+        }
+        if size <= read_all_limit:
+            timings["read_all"] = timed(lambda: storage.read_all("bench.csv"), source)
+        results[name] = timings
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", nargs="+", default=["10MB", "100MB"])
+    parser.add_argument(
+        "--read-all-limit",
+        default="1GB",
+        help="skip read_all for files larger than this",
+    )
+    parser.add_argument("--folder", help="where to write the generated files")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.folder) as folder:
+        for size in args.sizes:
+            results = run(Path(folder), parse_size(size), parse_size(args.read_all_limit))
+            for backend, timings in results.items():
+                cells = "  ".join(f"{op}={seconds:.3f}s" for op, seconds in timings.items())
+                print(f"{size:>6}  {backend:<7} {cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,24 @@ class Config:
     FILES_ALLOWED = ["csv"]
     UPLOAD_FOLDER = "data/uploads"
     SCHEMA_FOLDER = "data/schemas"
+    # Seconds between checks for edited schema files, None loads them once
+    SCHEMA_RELOAD_INTERVAL = 1.0
+    # "local" reads files with pandas, "mapped" memory-maps them once per file
+    CSV_STORAGE = os.environ.get("CSV_STORAGE") or "local"
+    # Rows spread over an uploaded file that column mappings are guessed from
+    INSPECT_SAMPLE_ROWS = 100
+    # Saved column mappings, looked up by the header layout of uploaded files
+    TEMPLATE_FOLDER = "data/templates"
+    JOB_FOLDER = "data/jobs"
+    RESULT_FOLDER = "data/results"
+    # Progress of background validations of large files, so retries can resume
+    CHECKPOINT_FOLDER = "data/checkpoints"
+    # Worker processes for background validation, None uses every core
+    VALIDATION_WORKERS = None
+    # Seconds between checks for new errors while streaming a running job
+    JOB_EVENT_INTERVAL = 0.25
+    # Seconds an event stream stays open before the browser has to reconnect
+    JOB_EVENT_STREAM_SECONDS = 20
     WTF_CSRF_TRUSTED_ORIGINS = [
         'http://localhost:5000',
         'http://127.0.0.1:5000',
@@ -1,4 +1,5 @@
 import io
+import uuid
 import json
 from pathlib import Path
 import pytest
@@ -71,3 +72,228 @@ def test_pages_dont_crash_with_500(client, path):
     assert response.status_code in (200, 302)
     if response.status_code == 200:
         assert b"500" not in response.data
+
+
+def test_job_status_returns_404_for_unknown_job(client):
+    response = client.get(f"/jobs/{uuid.uuid4()}/status")
+    assert response.status_code == 404
+
+
+def test_job_result_redirects_for_unknown_job(client):
+    response = client.get(f"/jobs/{uuid.uuid4()}", follow_redirects=False)
+    assert response.status_code == 302
+
+
+def test_job_result_polls_until_job_is_done(app, client, tmp_path):
+    from app.models.job import JobStatus, ValidationJob
+    from app.models.process import CSVValidationRequest, CSVValidationResponse
+    from app.services import LocalJobStore
+
+    store = LocalJobStore(str(tmp_path / "jobs"))
+    app.validation_queue.jobs = store
+    request = CSVValidationRequest(id=uuid.uuid4(), file="data.csv", schema="test")
+    job = ValidationJob(request=request, status=JobStatus.RUNNING, processed_rows=3)
+    store.save(job)
+
+    response = client.get(f"/jobs/{job.id}")
+    assert b"Validating your file" in response.data
+    status = client.get(f"/jobs/{job.id}/status").get_json()
+    assert status["status"] == "running"
+    assert status["processed_rows"] == 3
+
+    job.status = JobStatus.DONE
+    job.result = CSVValidationResponse.from_request(request)
+    store.save(job)
+    response = client.get(f"/jobs/{job.id}")
+    assert b"Validation passed" in response.data
+
+
+def test_job_events_stream_errors_and_finish_with_done(app, client, tmp_path):
+    from app.models.job import JobStatus, ValidationJob
+    from app.models.process import CSVValidationError, CSVValidationRequest
+    from app.services import LocalJobStore
+
+    store = LocalJobStore(str(tmp_path / "jobs"))
+    app.validation_queue.jobs = store
+    request = CSVValidationRequest(id=uuid.uuid4(), file="data.csv", schema="test")
+    job = ValidationJob(request=request, status=JobStatus.DONE, error_count=1)
+    store.save(job)
+    store.append_errors(job.id, [CSVValidationError(row_numer=4, error="bad")])
+
+    response = client.get(f"/jobs/{job.id}/events")
+    assert response.mimetype == "text/event-stream"
+    events = [e for e in response.get_data(as_text=True).split("\n\n") if e]
+    assert [e.split("\n")[0] for e in events] == [
+        "event: validation-error",
+        "event: progress",
+        "event: done",
+    ]
+    assert '{"row": 4, "error": "bad"}' in events[0]
+
+
+def test_job_events_resume_after_the_last_event_id(app, client, tmp_path):
+    from app.models.job import JobStatus, ValidationJob
+    from app.models.process import CSVValidationError, CSVValidationRequest
+    from app.services import LocalJobStore
+
+    store = LocalJobStore(str(tmp_path / "jobs"))
+    app.validation_queue.jobs = store
+    app.config["JOB_EVENT_STREAM_SECONDS"] = 0
+    request = CSVValidationRequest(id=uuid.uuid4(), file="data.csv", schema="test")
+    job = ValidationJob(request=request, status=JobStatus.RUNNING)
+    store.save(job)
+    store.append_errors(
+        job.id, [CSVValidationError(row_numer=row, error="bad") for row in (1, 2)]
+    )
+
+    def stream(**headers):
+        data = client.get(f"/jobs/{job.id}/events", headers=headers)
+        return [e for e in data.get_data(as_text=True).split("\n\n") if e]
+
+    # A running job's stream ends on its own, the browser reconnects
+    events = stream()
+    assert [e.split("\n")[0] for e in events] == [
+        "event: validation-error",
+        "event: validation-error",
+        "event: progress",
+    ]
+    first_id = events[0].split("\n")[1].removeprefix("id: ")
+    assert '"row": 2' in stream(**{"Last-Event-ID": first_id})[0]
+    last_id = events[-1].split("\n")[1].removeprefix("id: ")
+    store.append_errors(job.id, [CSVValidationError(row_numer=3, error="bad")])
+    resumed = stream(**{"Last-Event-ID": last_id})
+    assert len(resumed) == 2
+    assert '"row": 3' in resumed[0]
+
+
+def test_job_events_returns_404_for_unknown_job(client):
+    assert client.get(f"/jobs/{uuid.uuid4()}/events").status_code == 404
+
+
+def test_job_errors_pages_and_filters_stored_errors(app, client, tmp_path):
+    from app.models.job import JobStatus, ValidationJob
+    from app.models.process import (
+        CSVValidationError,
+        CSVValidationRequest,
+        CSVValidationResponse,
+    )
+    from app.services import LocalJobStore
+
+    store = LocalJobStore(str(tmp_path / "jobs"))
+    app.validation_queue.jobs = store
+    request = CSVValidationRequest(id=uuid.uuid4(), file="data.csv", schema="test")
+    job = ValidationJob(request=request, status=JobStatus.DONE)
+    job.result = CSVValidationResponse.from_request(request)
+    job.result.errors = [
+        CSVValidationError(
+            row_numer=row,
+            error={"amount": ["must be of float type"]} if row % 2 else {"a": ["bad"]},
+        )
+        for row in range(25)
+    ]
+    store.save(job)
+
+    page = client.get(f"/jobs/{job.id}/errors?page=2&per_page=10").get_json()
+    assert page["total"] == 25
+    assert [e["row"] for e in page["errors"]] == list(range(10, 20))
+    assert [r["field"] for r in page["summary"]] == ["a", "amount"]
+    assert page["summary"][1] == {
+        "field": "amount",
+        "rule": "type=float",
+        "message": "must be of float type",
+        "count": 12,
+        "first_row": 1,
+        "sample_rows": [1, 3, 5, 7, 9],
+    }
+
+    filtered = client.get(
+        f"/jobs/{job.id}/errors?field=amount&rule=type=float&per_page=5&page=2"
+    ).get_json()
+    assert filtered["total"] == 12
+    assert [e["row"] for e in filtered["errors"]] == [11, 13, 15, 17, 19]
+    by_field = client.get(f"/jobs/{job.id}/errors?field=a").get_json()
+    assert by_field["total"] == 13
+
+    response = client.get(f"/jobs/{job.id}")
+    assert b"type=float" in response.data
+    assert b"Errors (25)" in response.data
+
+
+def test_job_errors_returns_404_for_unfinished_job(app, client, tmp_path):
+    from app.models.job import ValidationJob
+    from app.models.process import CSVValidationRequest
+    from app.services import LocalJobStore
+
+    store = LocalJobStore(str(tmp_path / "jobs"))
+    app.validation_queue.jobs = store
+    job = ValidationJob(request=CSVValidationRequest(uuid.uuid4(), "data.csv", "test"))
+    store.save(job)
+    assert client.get(f"/jobs/{job.id}/errors").status_code == 404
+
+
+def test_process_keeps_ignored_columns_in_the_mappings(app, client, tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir(parents=True)
+    schemas_dir = tmp_path / "schemas"
+    schemas_dir.mkdir(parents=True)
+    (schemas_dir / "default.json").write_text(json.dumps({"a": {"type": "string"}}))
+    (uploads / "sample.csv").write_text("a,b\n1,2")
+
+    app.config["UPLOAD_FOLDER"] = str(uploads)
+    app.config["SCHEMA_FOLDER"] = str(schemas_dir)
+    from app.services import init_services
+
+    init_services(app)
+    submitted = []
+    app.validation_queue.submit = lambda request: submitted.append(request) or request
+
+    response = client.post(
+        "/process/sample.csv",
+        data={
+            "schema_name": "default",
+            "mappings-0-csv_column": "a",
+            "mappings-0-schema_field": "",
+            "mappings-1-csv_column": "b",
+            "mappings-1-schema_field": "a",
+        },
+    )
+    assert response.status_code == 302
+    assert submitted[0].mappings == {"a": None, "b": "a"}
+
+
+def test_mapping_uses_saved_template(app, client, tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir(parents=True)
+    schemas_dir = tmp_path / "schemas"
+    schemas_dir.mkdir(parents=True)
+    (schemas_dir / "default.json").write_text(json.dumps({"a": {"type": "string"}}))
+    (schemas_dir / "other.json").write_text(json.dumps({"b": {"type": "string"}}))
+    (uploads / "monday.csv").write_text("Code,Name\n1,x")
+    (uploads / "tuesday.csv").write_text("code,name\n2,y")
+
+    app.config["UPLOAD_FOLDER"] = str(uploads)
+    app.config["SCHEMA_FOLDER"] = str(schemas_dir)
+    app.config["TEMPLATE_FOLDER"] = str(tmp_path / "templates")
+    from app.services import init_services
+
+    init_services(app)
+    app.csv_service.save_template("monday.csv", "other", {"Name": "b"})
+
+    response = client.get("/mapping/tuesday.csv")
+    assert b"Mappings loaded from a saved template" in response.data
+    assert b'<option selected value="b">' in response.data
+
+
+def test_result_page_renders_errors_without_a_summary(app):
+    from app.models.process import (
+        CSVValidationError,
+        CSVValidationRequest,
+        CSVValidationResponse,
+    )
+    from flask import render_template
+
+    request = CSVValidationRequest(id=uuid.uuid4(), file="data.csv", schema="test")
+    result = CSVValidationResponse.from_request(request)
+    result.errors = [CSVValidationError(row_numer=1, error={"a": ["bad"]})]
+    with app.test_request_context():
+        assert "Errors (1)" in render_template("result.html", result=result)
@@ -0,0 +1,88 @@
+import io
+
+import pytest
+
+from app.models.error_store import ErrorStore
+from app.models.process import CSVValidationError
+
+errors = [
+    CSVValidationError(row_numer=1, error={"a": ["required field"]}),
+    CSVValidationError(
+        row_numer=4, error={"a": ["required field"], "b": ["min value is 0", "bad"]}
+    ),
+    CSVValidationError(row_numer=0, error="Could not read file"),
+    CSVValidationError(row_numer=9, error={"c": [{"0": ["must be of integer type"]}]}),
+    CSVValidationError(row_numer=12, error={}),
+]
+
+
+@pytest.mark.parametrize("spill_entries", [1, 2, 3, 1000])
+def test_store_iterates_as_validation_errors(tmp_path, spill_entries):
+    store = ErrorStore(errors, spill_entries=spill_entries, folder=str(tmp_path))
+    assert len(store) == len(errors)
+    assert list(store) == errors
+    assert store[1] == errors[1]
+    assert store[-1] == errors[-1]
+    assert store[1:3] == errors[1:3]
+    with pytest.raises(IndexError):
+        store[len(errors)]
+
+
+def test_store_deduplicates_fields_and_messages():
+    store = ErrorStore(errors)
+    assert store.fields == ["a", "b", "c"]
+    assert store.messages.count("required field") == 1
+    assert store.entries == 7
+
+
+def test_store_spills_to_disk(tmp_path):
+    store = ErrorStore(errors, spill_entries=3, folder=str(tmp_path))
+    assert store.spilled == 6
+    assert len(store.rows) == 1
+
+
+def test_store_round_trips_through_a_file():
+    store = ErrorStore(errors, spill_entries=2)
+    f = io.BytesIO()
+    store.save(f)
+    f.seek(0)
+    loaded = ErrorStore.load(f, spill_entries=4)
+    assert loaded == errors
+    loaded.append(CSVValidationError(row_numer=20, error={"a": ["required field"]}))
+    assert loaded.messages.count("required field") == 1
+
+
+def test_empty_store_round_trips():
+    f = io.BytesIO()
+    ErrorStore().save(f)
+    f.seek(0)
+    assert list(ErrorStore.load(f)) == []
+
+
+def test_store_uses_a_few_bytes_per_error():
+    store = ErrorStore(
+        CSVValidationError(row_numer=i, error={"email": ["value does not match regex"]})
+        for i in range(100000)
+    )
+    assert store.nbytes / len(store) <= 24
+
+
+def test_store_summary_survives_a_round_trip():
+    store = ErrorStore(errors)
+    f = io.BytesIO()
+    store.save(f)
+    f.seek(0)
+    summary = ErrorStore.load(f).summary
+    assert summary.rules[("a", "required")].sample_rows == [1, 4]
+    assert summary.rules[("b", "min=0")].count == 1
+
+
+@pytest.mark.parametrize("spill_entries", [1, 1000])
+def test_store_finds_errors_by_field_and_rule(tmp_path, spill_entries):
+    store = ErrorStore(errors, spill_entries=spill_entries, folder=str(tmp_path))
+    assert store.matching("a").tolist() == [0, 1]
+    assert store.matching("b", "min=0").tolist() == [1]
+    assert store.matching("b", "required").tolist() == []
+    assert store.matching("c", "schema").tolist() == [3]
+    assert store.matching("", "Could not read file").tolist() == [2]
+    assert store.matching("missing").tolist() == []
@@ -0,0 +1,66 @@
+import pytest
+
+from app.models.error_summary import SAMPLE_ROWS, ErrorSummary, fails_rule, rule_for
+from app.models.process import CSVValidationError
+
+
+@pytest.mark.parametrize(
+    "message, rule",
+    [
+        ("must be of float type", "type=float"),
+        ("required field", "required"),
+        ("null value not allowed", "nullable"),
+        ("min value is 0", "min=0"),
+        ("unallowed value Scroll", "allowed"),
+        ("Could not read file", "Could not read file"),
+    ],
+)
+def test_rule_for_recognises_cerberus_messages(message, rule):
+    assert rule_for(message) == rule
+
+
+def test_summary_counts_rows_per_field_and_rule():
+    summary = ErrorSummary(
+        CSVValidationError(
+            row_numer=row,
+            error={
+                "amount": ["must be of float type"],
+                "form": [f"unallowed value {row}"],
+            },
+        )
+        for row in range(12, 30)
+    )
+    amount = summary.rules[("amount", "type=float")]
+    form = summary.rules[("form", "allowed")]
+    assert len(summary) == 2
+    assert amount.count == form.count == 18
+    assert amount.first_row == 12
+    assert amount.sample_rows == list(range(12, 12 + SAMPLE_ROWS))
+    assert amount.describe() == "18 rows fail type=float, first at row 12"
+
+
+def test_summary_counts_a_row_once_per_rule():
+    summary = ErrorSummary(
+        [CSVValidationError(row_numer=3, error={"a": ["min value is 0", "min value is 0"]})]
+    )
+    assert summary.rules[("a", "min=0")].count == 1
+
+
+def test_summary_round_trips_most_frequent_first():
+    summary = ErrorSummary(
+        [
+            CSVValidationError(row_numer=1, error={"a": ["required field"]}),
+            CSVValidationError(row_numer=2, error={"b": ["required field"]}),
+            CSVValidationError(row_numer=3, error={"b": ["required field"]}),
+        ]
+    )
+    restored = ErrorSummary.from_dict(summary.to_dict())
+    assert [(r.field, r.count) for r in restored] == [("b", 2), ("a", 1)]
+
+
+def test_fails_rule_matches_field_and_optional_rule():
+    error = CSVValidationError(row_numer=1, error={"a": ["min value is 0"]})
+    assert fails_rule(error, "a")
+    assert fails_rule(error, "a", "min=0")
+    assert not fails_rule(error, "a", "required")
+    assert not fails_rule(error, "b")
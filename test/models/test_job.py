@@ -0,0 +1,44 @@
+import uuid
+import pytest
+from app.models.job import JobStatus, ValidationJob
+from app.models.process import (
+    CSVValidationRequest,
+    CSVValidationResponse,
+    CSVValidationError,
+)
+
+
+@pytest.fixture
+def request_():
+    return CSVValidationRequest(
+        id=uuid.uuid4(), file="data.csv", schema="test", mappings={"A": "a"}
+    )
+
+
+def test_job_id_is_the_request_id(request_):
+    job = ValidationJob(request=request_)
+    assert job.id == request_.id
+    assert job.status == JobStatus.PENDING
+
+
+def test_progress_is_unknown_without_total_rows(request_):
+    job = ValidationJob(request=request_, processed_rows=10)
+    assert job.progress is None
+
+
+def test_progress_is_capped_at_one(request_):
+    job = ValidationJob(request=request_, processed_rows=12, total_rows=10)
+    assert job.progress == 1.0
+
+
+def test_to_dict_round_trip(request_):
+    result = CSVValidationResponse.from_request(request_)
+    result.errors = [CSVValidationError(row_numer=3, error={"a": ["required field"]})]
+    job = ValidationJob(
+        request=request_,
+        status=JobStatus.DONE,
+        processed_rows=5,
+        total_rows=5,
+        result=result,
+    )
+    assert ValidationJob.from_dict(job.to_dict()) == job
@@ -0,0 +1,140 @@
+import json
+import uuid
+from functools import partial
+
+import pytest
+
+from app.models.checkpoint import ValidationCheckpoint
+from app.models.error_store import ErrorStore
+from app.models.process import CSVValidationError, CSVValidationRequest
+from app.models.schema import Schema
+from app.services import SchemaRegistry, SchemaRepository
+from app.services.checkpoints import LocalCheckpointStore
+from app.services.csv_service import CSVServiceImpl
+from app.services.csv_storage import LocalFileStorage
+
+schema = Schema(
+    name="test",
+    definition={"a": {"type": "integer"}, "b": {"type": "string", "regex": r"ok"}},
+)
+
+
+class MockSchemaRepository(SchemaRepository):
+    def get_all_schemas(self):
+        yield schema
+
+    def save_schema(self, schema: Schema) -> None:
+        pass
+
+
+class Interrupted(Exception):
+    pass
+
+
+def checkpoint(request_id=None, **kwargs) -> ValidationCheckpoint:
+    return ValidationCheckpoint(
+        request_id=request_id or uuid.uuid4(),
+        source=[10, 20],
+        schema_hash="abc",
+        mappings={"a": "a"},
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def service(tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    rows = "".join(f"{i},{'bad' if i % 50 == 0 else 'ok'}\n" for i in range(1000))
+    (uploads / "data.csv").write_text("a,b\n" + rows)
+    storage = LocalFileStorage(str(uploads))
+    # Small blocks so that the file is validated in several chunks
+    storage.read_blocks = partial(storage.read_blocks, block_bytes=500)
+    return CSVServiceImpl(
+        storage,
+        SchemaRegistry(MockSchemaRepository()),
+        checkpoint_store=LocalCheckpointStore(str(tmp_path / "checkpoints")),
+        checkpoint_bytes=0,
+        checkpoint_interval=0,
+    )
+
+
+def validation_request(request_id=None) -> CSVValidationRequest:
+    return CSVValidationRequest(
+        id=request_id or uuid.uuid4(), file="data.csv", schema="test", error_threshold=1000
+    )
+
+
+def test_store_returns_saved_checkpoint(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    errors = ErrorStore([CSVValidationError(row_numer=3, error={"a": ["bad"]})])
+    saved = checkpoint(byte_offset=120, row_offset=7, errors=errors)
+    store.save(saved)
+    assert store.get(saved.request_id) == saved
+    assert store.get(uuid.uuid4()) is None
+
+
+def test_store_keeps_one_errors_file_per_checkpoint(tmp_path):
+    store = LocalCheckpointStore(str(tmp_path))
+    saved = checkpoint()
+    store.save(saved)
+    saved.row_offset = 5
+    store.save(saved)
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+    assert store.get(saved.request_id).row_offset == 5
+    store.delete(saved.request_id)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_store_ignores_broken_checkpoint(tmp_path):
+    request_id = uuid.uuid4()
+    (tmp_path / f"{request_id}.json").write_text(json.dumps({"errors": "gone.npz"}))
+    assert LocalCheckpointStore(str(tmp_path)).get(request_id) is None
+
+
+def test_checkpoints_of_other_files_or_schemas_are_other_runs():
+    saved = checkpoint()
+    assert saved.same_run(checkpoint(saved.request_id))
+    assert not saved.same_run(checkpoint())
+    changed = checkpoint(saved.request_id)
+    changed.source = [11, 20]
+    assert not saved.same_run(changed)
+
+
+def test_interrupted_validation_resumes_from_checkpoint(service):
+    expected = list(service.stream_errors(validation_request()))
+    request = validation_request()
+    progress = []
+
+    def interrupt(rows: int) -> None:
+        progress.append(rows)
+        if len(progress) == 3:
+            raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        list(service.stream_errors(request, on_progress=interrupt))
+    stopped_at = progress[-1]
+    assert service.checkpoint_store.get(request.id).row_offset == stopped_at
+
+    resumed = []
+    errors = list(service.stream_errors(request, on_progress=resumed.append))
+    assert errors == expected
+    assert resumed[0] > stopped_at
+    assert resumed[-1] == 1000
+    assert service.checkpoint_store.get(request.id) is None
+
+
+def test_changed_file_starts_over(service, tmp_path):
+    request = validation_request()
+
+    def interrupt(rows: int) -> None:
+        raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        list(service.stream_errors(request, on_progress=interrupt))
+    with open(tmp_path / "uploads" / "data.csv", "a") as f:
+        f.write("1000,bad\n")
+    progress = []
+    errors = list(service.stream_errors(request, on_progress=progress.append))
+    assert len(errors) == 21
+    assert progress[0] < 200
@@ -0,0 +1,90 @@
+import io
+
+import pandas as pd
+import pytest
+from cerberus import Validator
+
+from app.models.schema import Schema
+from app.services.column_profile import profile_column, profile_frame
+from app.services.csv_service import get_suggested_columns_mappings
+
+definition = {
+    "user_email": {"type": "string", "regex": r"[^@]+@[^@]+\.[^@]+", "required": True},
+    "transaction_amount": {"type": "float", "min": 0, "max": 1000},
+    "status": {"type": "string", "allowed": ["open", "closed"], "nullable": True},
+    "quantity": {"type": "integer"},
+}
+
+schema = Schema(name="test", definition=definition)
+
+
+def cerberus_rate(values: list, field_name: str) -> float:
+    validator = Validator({field_name: definition[field_name]}, allow_unknown=True)
+    return sum(validator.validate({field_name: v}) for v in values) / len(values)
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        ["a@b.com", "not-an-email", "c@d.org", None],
+        [10.0, 5.0, -1.0, 2000.0, None],
+        ["open", "closed", None, "pending"],
+        [1, 2, 3, 4],
+        [1.5, None],
+        [None, None],
+    ],
+)
+def test_match_rate_agrees_with_cerberus(values):
+    profile = profile_column(pd.Series(values))
+    for field_name in definition:
+        assert profile.match_rate(definition[field_name]) == pytest.approx(
+            cerberus_rate(values, field_name)
+        ), field_name
+
+
+def test_blanks_read_from_a_file_match_only_nullable_fields():
+    df = pd.read_csv(io.StringIO("amount,status\n10.5,open\n,\n20.0,\n"))
+    amount = profile_column(df["amount"])
+    # Cerberus takes the NaN of a blank for a float, the profile doesn't count it
+    assert cerberus_rate(df["amount"].tolist(), "transaction_amount") == 1
+    assert amount.match_rate(definition["transaction_amount"]) == pytest.approx(2 / 3)
+    nullable = {**definition["transaction_amount"], "nullable": True}
+    assert amount.match_rate(nullable) == 1
+    status = profile_column(df["status"])
+    assert status.match_rate(definition["status"]) == 1
+
+
+def test_profile_describes_column():
+    profile = profile_column(pd.Series([3, None, 1], name="n"))
+    assert profile.name == "n"
+    assert profile.kind == "float"
+    assert profile.null_ratio == pytest.approx(1 / 3)
+    assert (profile.minimum, profile.maximum) == (1, 3)
+
+
+def test_match_rate_is_none_for_mixed_columns_and_unknown_rules():
+    assert profile_column(pd.Series(["a", 1])).match_rate({"type": "string"}) is None
+    profile = profile_column(pd.Series(["a", "b"]))
+    assert profile.match_rate({"type": "string", "maxlength": 1}) is None
+
+
+def test_regex_masks_are_computed_once():
+    profile = profile_column(pd.Series(["a@b.com", "nope"]))
+    assert profile.regex_hit_rate(r"[^@]+@[^@]+") == 0.5
+    mask = profile.masks[("regex", r"[^@]+@[^@]+")]
+    profile.match_rate(definition["user_email"])
+    profile.regex_hit_rate(r"[^@]+@[^@]+")
+    assert profile.masks[("regex", r"[^@]+@[^@]+")] is mask
+
+
+def test_profile_frame_handles_duplicate_column_names():
+    df = pd.DataFrame([[1, "x"]], columns=["a", "a"])
+    assert [p.kind for p in profile_frame(df)] == ["integer", "string"]
+
+
+def test_suggestions_fall_back_to_cerberus_for_unsupported_rules():
+    fallback = Schema(
+        name="codes", definition={"code": {"type": "string", "maxlength": 3}}
+    )
+    df = pd.DataFrame({"Identifier": ["abc", "de", "f"]})
+    assert get_suggested_columns_mappings(df, fallback) == {"Identifier": "code"}
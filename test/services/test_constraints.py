@@ -0,0 +1,195 @@
+import uuid
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.process import CSVValidationRequest
+from app.models.schema import Schema
+from app.services import SchemaRegistry, SchemaRepository
+from app.services.checkpoints import LocalCheckpointStore
+from app.services.constraints import Reference, RowConstraints, SeenKeys, key_hashes
+from app.services.csv_service import CSVServiceImpl
+from app.services.csv_storage import LocalFileStorage
+from app.services.validator_cache import validator_cache
+
+schema = Schema(
+    name="sales",
+    definition={
+        "order": {"type": "integer", "primary_key": True},
+        "product": {"type": "string", "references": "products.csv.code"},
+        "amount": {"type": "float", "min": 0},
+    },
+)
+
+
+class MockSchemaRepository(SchemaRepository):
+    def get_all_schemas(self):
+        yield schema
+
+    def save_schema(self, schema: Schema) -> None:
+        pass
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def uploads(tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    (uploads / "products.csv").write_text("code,name\nA,apple\nB,banana\n")
+    rows = [f"{i},{'C' if i == 40 else 'A'},1.5" for i in range(300)]
+    rows[250] = "7,B,2.5"
+    (uploads / "sales.csv").write_text("order,product,amount\n" + "\n".join(rows) + "\n")
+    return uploads
+
+
+def service(uploads, **kwargs) -> CSVServiceImpl:
+    storage = LocalFileStorage(str(uploads))
+    storage.read_blocks = partial(storage.read_blocks, block_bytes=500)
+    return CSVServiceImpl(storage, SchemaRegistry(MockSchemaRepository()), **kwargs)
+
+
+def validation_request(**kwargs) -> CSVValidationRequest:
+    return CSVValidationRequest(
+        id=uuid.uuid4(),
+        file="sales.csv",
+        schema="sales",
+        mappings={c: c for c in ["order", "product", "amount"]},
+        error_threshold=100,
+        **kwargs,
+    )
+
+
+def test_seen_keys_spill_and_still_find_every_key():
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 5000, 20000, dtype=np.uint64)
+    keys = SeenKeys(memory_keys=500, bloom_bits=1 << 12)
+    seen = np.concatenate([keys.add(batch) for batch in np.array_split(hashes, 37)])
+
+    expected, known = [], set()
+    for h in hashes.tolist():
+        expected.append(h in known)
+        known.add(h)
+    assert seen.tolist() == expected
+    assert len(keys) == len(known)
+    assert keys.runs
+    assert keys.contains(np.array([4999, 5001], dtype=np.uint64)).tolist() == [
+        4999 in known,
+        False,
+    ]
+    keys.close()
+
+
+def test_seen_keys_marks_repeats_within_a_batch():
+    keys = SeenKeys()
+    hashes = np.array([3, 1, 3, 2, 1, 3], dtype=np.uint64)
+    assert keys.add(hashes).tolist() == [False, False, True, False, True, True]
+
+
+def test_integral_floats_hash_like_integers():
+    floats = key_hashes(pd.Series([1.0, 2.0]))
+    assert floats.tolist() == key_hashes(pd.Series([1, 2])).tolist()
+    assert floats.tolist() == key_hashes(pd.Series(["1", "2"])).tolist()
+    assert key_hashes(pd.Series([1.5])).tolist() != key_hashes(pd.Series([1])).tolist()
+
+
+def test_reference_splits_at_the_last_dot():
+    assert Reference.parse("products.csv.code") == Reference("products.csv", "code")
+    with pytest.raises(ValueError):
+        Reference.parse("products")
+
+
+def test_cross_row_rules_are_hidden_from_cerberus():
+    assert schema.row_definition()["order"] == {"type": "integer", "required": True}
+    assert validator_cache.validator(schema).validate(
+        {"order": 1, "product": "A", "amount": 1.0}
+    )
+
+
+def test_constraints_report_repeats_and_missing_references(uploads):
+    constraints = RowConstraints.build(schema, LocalFileStorage(str(uploads)))
+    first = pd.DataFrame({"order": [1, 2, 1], "product": ["A", "X", None]})
+    assert constraints.check(first) == {
+        1: {"product": ["value not found in products.csv.code"]},
+        2: {"order": ["value is not unique"]},
+    }
+    # Values are remembered across chunks
+    assert constraints.check(pd.DataFrame({"order": [2, 3]})) == {
+        0: {"order": ["value is not unique"]}
+    }
+
+
+def test_schemas_without_cross_row_rules_have_no_constraints(uploads):
+    plain = Schema(name="plain", definition={"a": {"type": "integer"}})
+    assert RowConstraints.build(plain, LocalFileStorage(str(uploads))) is None
+
+
+def test_missing_referenced_file_fails(uploads):
+    (uploads / "products.csv").unlink()
+    with pytest.raises(ValueError, match="products.csv not found"):
+        list(service(uploads).stream_errors(validation_request()))
+
+
+def test_stream_errors_merges_row_and_cross_row_errors(uploads):
+    with open(uploads / "sales.csv", "a") as f:
+        f.write("7,Z,-1.5\n")
+    errors = list(service(uploads).stream_errors(validation_request()))
+    assert [(e.row_numer, e.error) for e in errors] == [
+        (40, {"product": ["value not found in products.csv.code"]}),
+        (250, {"order": ["value is not unique"]}),
+        (
+            300,
+            {
+                "amount": ["min value is 0"],
+                "order": ["value is not unique"],
+                "product": ["value not found in products.csv.code"],
+            },
+        ),
+    ]
+
+
+def test_resumed_validation_remembers_keys_before_the_checkpoint(uploads, tmp_path):
+    resumable = service(
+        uploads,
+        checkpoint_store=LocalCheckpointStore(str(tmp_path / "checkpoints")),
+        checkpoint_bytes=0,
+        checkpoint_interval=0,
+    )
+    request = validation_request()
+
+    def interrupt(rows: int) -> None:
+        if rows > 100:
+            raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        list(resumable.stream_errors(request, on_progress=interrupt))
+    assert resumable.checkpoint_store.get(request.id).row_offset < 250
+    errors = list(resumable.stream_errors(request))
+    assert [e.row_numer for e in errors] == [40, 250]
+
+
+def test_referenced_keys_are_compared_as_text(uploads):
+    (uploads / "products.csv").write_text("code,name\n001,apple\n2,banana\n")
+    text = Schema(
+        name="text",
+        definition={"product": {"type": "string", "references": "products.csv.code"}},
+    )
+    constraints = RowConstraints.build(text, LocalFileStorage(str(uploads)))
+    assert constraints.check(pd.DataFrame({"product": ["001", "1", "2"]})) == {
+        1: {"product": ["value not found in products.csv.code"]}
+    }
+
+
+def test_missing_referenced_column_fails(uploads):
+    (uploads / "products.csv").write_text("sku,name\nA,apple\n")
+    with pytest.raises(ValueError, match="Column code not found"):
+        RowConstraints.build(schema, LocalFileStorage(str(uploads)))
+
+
+def test_validate_parallel_refuses_cross_row_rules(uploads):
+    with pytest.raises(ValueError, match="cross row rules"):
+        service(uploads).validate_parallel(validation_request(), workers=2)
@@ -9,10 +9,10 @@ from app.models.process import CSVValidationRequest
 from app.services import SchemaRepository, SchemaRegistry
 from app.services.csv_service import (
     get_suggested_columns_mappings,
-    guess_by_content,
     inspect as inspect_csv,
     CSVServiceImpl,
 )
+from app.services.csv_storage import SAMPLE_ROWS
 
 definition = {
     "user_email": {"type": "string", "regex": r"[^@]+@[^@]+\.[^@]+"},
@@ -72,26 +72,31 @@ def test_suggestions_are_none_when_no_match_found():
     assert suggestions["amount"] is None
 
 
-# --- guess_by_content ---
+# --- matching by content ---
 
 
-def test_guess_by_content_returns_field_when_above_threshold():
+def suggest_for_sample(sample: list, threshold: float) -> str | None:
+    df = pd.DataFrame({"column": sample})
+    return get_suggested_columns_mappings(df, schema, threshold)["column"]
+
+
+def test_content_match_returns_field_when_above_threshold():
     sample = ["a@b.com", "x@y.co", "user@test.org"]
-    assert guess_by_content(sample, schema, threshold=0.6) == "user_email"
+    assert suggest_for_sample(sample, threshold=0.6) == "user_email"
 
 
-def test_guess_by_content_returns_none_when_below_threshold():
+def test_content_match_returns_none_when_below_threshold():
     sample = ["a@b.com", "not-an-email", "invalid"]
-    assert guess_by_content(sample, schema, threshold=0.8) is None
+    assert suggest_for_sample(sample, threshold=0.8) is None
 
 
-def test_guess_by_content_returns_none_for_none_sample():
-    assert guess_by_content(None, schema) is None
+def test_content_match_returns_none_for_empty_column():
+    assert suggest_for_sample([None, None], threshold=0.8) is None
 
 
-def test_guess_by_content_matches_float_column():
+def test_content_match_matches_float_column():
     sample = [10.5, 20.0, 0.1]
-    assert guess_by_content(sample, schema, threshold=0.8) == "transaction_amount"
+    assert suggest_for_sample(sample, threshold=0.8) == "transaction_amount"
 
 
 # --- inspect (function) ---
@@ -208,23 +213,24 @@ def test_validate_invalid_file_returns_invalid_file_response(
     assert response.errors[0].row_numer == 0
 
 
-def test_inspect_returns_inspection_result_from_peek(schema_registry, mock_csv_storage):
+def test_inspect_returns_inspection_result_from_sample(schema_registry, mock_csv_storage):
     df = pd.DataFrame(
         {
             "User Email": ["a@b.com"],
             "transaction_amount": [1.0],
         }
     )
-    mock_csv_storage.peek.return_value = df
+    mock_csv_storage.sample.return_value = df
     service = CSVServiceImpl(mock_csv_storage, schema_registry)
     result = service.inspect("some.csv", "test", sample_size=5)
     assert result.schema == schema
     assert result.columns == ["User Email", "transaction_amount"]
-    mock_csv_storage.peek.assert_called_once_with("some.csv", rows=5)
+    assert result.alternatives["User Email"][0].field == "user_email"
+    mock_csv_storage.sample.assert_called_once_with("some.csv", rows=5)
 
 
 def test_inspect_raises_when_file_not_found(schema_registry, mock_csv_storage):
-    mock_csv_storage.peek.side_effect = FileNotFoundError("not found")
+    mock_csv_storage.sample.side_effect = FileNotFoundError("not found")
     service = CSVServiceImpl(mock_csv_storage, schema_registry)
     with pytest.raises(ValueError, match="Error reading file"):
         service.inspect("missing.csv", "test")
@@ -239,7 +245,7 @@ def test_recommend_schema_returns_schema_above_threshold(
             "transaction_amount": [1.0],
         }
     )
-    mock_csv_storage.peek.return_value = df
+    mock_csv_storage.sample.return_value = df
     service = CSVServiceImpl(mock_csv_storage, schema_registry)
     recommended = service.recommend_schema("file.csv", threshold=0.5)
     assert recommended is not None
@@ -250,9 +256,227 @@ def test_recommend_schema_returns_default_when_below_threshold(
     schema_registry, mock_csv_storage
 ):
     df = pd.DataFrame({"unknown_col": ["a", "b", "c"]})
-    mock_csv_storage.peek.return_value = df
+    mock_csv_storage.sample.return_value = df
     service = CSVServiceImpl(mock_csv_storage, schema_registry)
     # With no column match, score is low. Service returns default_schema (registry has "test", no "default" so default_schema is None in our mock)
     recommended = service.recommend_schema("file.csv", threshold=0.99)
     # When default_schema is None, recommend_schema can return None
     assert recommended is None or recommended.name in ("test", "default")
+
+
+def test_recommend_schema_samples_the_file_once(mock_csv_storage):
+    from app.services.schema_registry import SchemaRegistry
+
+    books = Schema("books", {"title": {"type": "string"}, "author": {"type": "string"}})
+
+    class MultiSchemaRepository(SchemaRepository):
+        def get_all_schemas(self):
+            yield schema
+            yield books
+
+        def save_schema(self, schema: Schema) -> None:
+            pass
+
+    mock_csv_storage.sample.return_value = pd.DataFrame(
+        {"Title": ["Dune"], "Author": ["Frank Herbert"]}
+    )
+    service = CSVServiceImpl(mock_csv_storage, SchemaRegistry(MultiSchemaRepository()))
+    recommended = service.recommend_schema("file.csv", threshold=0.5)
+    assert recommended.name == "books"
+    mock_csv_storage.sample.assert_called_once_with("file.csv", rows=SAMPLE_ROWS)
+
+
+def test_recommend_schema_skips_inspecting_schemas_that_cannot_win(
+    schema_registry, mock_csv_storage, monkeypatch
+):
+    import app.services.csv_service as csv_service
+
+    # Three text columns, but only user_email takes text, so at most 1 of 3 fields
+    mock_csv_storage.sample.return_value = pd.DataFrame(
+        {"a": ["x", "y"], "b": ["x", "y"], "c": ["x", "y"]}
+    )
+    inspected = MagicMock(wraps=csv_service.inspect)
+    monkeypatch.setattr(csv_service, "inspect", inspected)
+    service = CSVServiceImpl(mock_csv_storage, schema_registry)
+    service.recommend_schema("file.csv", threshold=0.5)
+    inspected.assert_not_called()
+
+
+def test_recommend_schema_inspects_schemas_that_could_win(
+    schema_registry, mock_csv_storage, monkeypatch
+):
+    import app.services.csv_service as csv_service
+
+    mock_csv_storage.sample.return_value = pd.DataFrame(
+        {"mail": ["a@b.com", "c@d.org"], "amount": [1.5, 2.5]}
+    )
+    inspected = MagicMock(wraps=csv_service.inspect)
+    monkeypatch.setattr(csv_service, "inspect", inspected)
+    service = CSVServiceImpl(mock_csv_storage, schema_registry)
+    assert service.recommend_schema("file.csv", threshold=0.5).name == "test"
+    inspected.assert_called_once()
+
+
+def write_transactions(path, rows: int) -> None:
+    lines = ["user_email,transaction_amount"]
+    for i in range(rows):
+        email = "bad-email" if i % 7 == 0 else f"user{i}@example.com"
+        lines.append(f"{email},{i % 5 - 1}.5")
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_validate_parallel_matches_sequential_validation(tmp_path, schema_registry):
+    import uuid
+    from app.services.csv_storage import LocalFileStorage
+
+    write_transactions(tmp_path / "data.csv", 500)
+    service = CSVServiceImpl(LocalFileStorage(str(tmp_path)), schema_registry)
+    request = CSVValidationRequest(
+        id=uuid.uuid4(), file="data.csv", schema="test", error_threshold=1000
+    )
+    sequential = service.validate(request)
+    parallel = service.validate_parallel(request, workers=3)
+    assert parallel.errors == sequential.errors
+    assert len(parallel.errors) > 0
+
+
+def test_validate_parallel_stops_after_error_threshold(tmp_path, schema_registry):
+    import uuid
+    from app.services.csv_storage import LocalFileStorage
+
+    write_transactions(tmp_path / "data.csv", 500)
+    service = CSVServiceImpl(LocalFileStorage(str(tmp_path)), schema_registry)
+    request = CSVValidationRequest(
+        id=uuid.uuid4(), file="data.csv", schema="test", error_threshold=10
+    )
+    response = service.validate_parallel(request, workers=4)
+    rows = [e.row_numer for e in response.errors]
+    assert len(rows) > 10
+    assert rows == sorted(rows)
+    assert rows[:11] == [e.row_numer for e in service.validate(request).errors][:11]
+    assert len(rows) == 11
+
+
+def test_validation_looks_up_validators_by_the_registry_hash(
+    tmp_path, schema_registry, monkeypatch
+):
+    import uuid
+    import app.services.validator_cache as validator_cache
+    from app.services.csv_storage import LocalFileStorage
+
+    write_transactions(tmp_path / "data.csv", 50)
+    service = CSVServiceImpl(LocalFileStorage(str(tmp_path)), schema_registry)
+    request = CSVValidationRequest(id=uuid.uuid4(), file="data.csv", schema="test")
+    hashed = MagicMock(wraps=validator_cache.definition_hash)
+    monkeypatch.setattr(validator_cache, "definition_hash", hashed)
+    assert len(service.validate(request).errors) > 0
+    service.split_rows(request, str(tmp_path))
+    hashed.assert_not_called()
+
+
+def test_validate_parallel_falls_back_for_multi_byte_line_breaks(
+    tmp_path, schema_registry
+):
+    import uuid
+    from app.services.csv_storage import LocalFileStorage
+
+    write_transactions(tmp_path / "data.csv", 200)
+    text = (tmp_path / "data.csv").read_text()
+    (tmp_path / "data.csv").write_text(text, encoding="utf-16")
+    service = CSVServiceImpl(LocalFileStorage(str(tmp_path)), schema_registry)
+    request = CSVValidationRequest(
+        id=uuid.uuid4(), file="data.csv", schema="test", error_threshold=1000
+    )
+    parallel = service.validate_parallel(request, workers=3)
+    assert parallel.errors == service.validate(request).errors
+    assert len(parallel.errors) > 0
+
+
+def test_validate_reuses_cached_result_for_same_content(tmp_path, schema_registry):
+    import uuid
+    from app.services.csv_storage import LocalFileStorage
+    from app.services.result_cache import LocalResultCache
+
+    write_transactions(tmp_path / "data.csv", 50)
+    storage = LocalFileStorage(str(tmp_path))
+    service = CSVServiceImpl(
+        storage, schema_registry, LocalResultCache(str(tmp_path / "results"))
+    )
+
+    def make_request():
+        return CSVValidationRequest(id=uuid.uuid4(), file="data.csv", schema="test")
+
+    first = service.validate(make_request())
+    storage.read_chunk = MagicMock(side_effect=AssertionError("file was re-read"))
+    second_request = make_request()
+    second = service.validate(second_request)
+    assert second.errors == first.errors
+    assert second.request_id == second_request.id
+
+
+def test_stream_errors_yields_before_the_file_is_read(tmp_path, schema_registry):
+    import uuid
+    from app.services.csv_storage import LocalFileStorage
+    from app.services.result_cache import LocalResultCache
+
+    write_transactions(tmp_path / "data.csv", 50)
+    cache = LocalResultCache(str(tmp_path / "results"))
+    service = CSVServiceImpl(LocalFileStorage(str(tmp_path)), schema_registry, cache)
+    chunks = [0]
+    original = service.csv_store.read_chunk
+
+    def read_chunk(file_name, **kwargs):
+        for chunk in original(file_name, size=10, **kwargs):
+            chunks[0] += 1
+            yield chunk
+
+    service.csv_store.read_chunk = read_chunk
+    request = CSVValidationRequest(
+        id=uuid.uuid4(), file="data.csv", schema="test", error_threshold=1000
+    )
+    stream = service.stream_errors(request)
+    assert next(stream).row_numer == 0
+    assert chunks == [1]
+    stream.close()
+    # A partial run is never cached
+    assert list((tmp_path / "results").iterdir()) == []
+    assert list(service.stream_errors(request)) == service.validate(request).errors
+
+
+def test_unmapped_columns_are_skipped_by_every_validation_path(
+    tmp_path, schema_registry
+):
+    import uuid
+    from app.services.checkpoints import LocalCheckpointStore
+    from app.services.csv_storage import LocalFileStorage
+
+    lines = ["Email,Amount,vendor_ref,comment,signup_date"]
+    for i in range(300):
+        email = "bad-email" if i % 7 == 0 else f"user{i}@example.com"
+        day = f"2026-01-{i % 28 + 1:02d}"
+        lines.append(f"{email},{i % 5 - 1}.5,R{i},free text {i},{day}")
+    (tmp_path / "wide.csv").write_text("\n".join(lines) + "\n")
+    storage = LocalFileStorage(str(tmp_path))
+    service = CSVServiceImpl(storage, schema_registry)
+    request = CSVValidationRequest(
+        id=uuid.uuid4(),
+        file="wide.csv",
+        schema="test",
+        mappings={"Email": "user_email", "Amount": "transaction_amount"},
+        error_threshold=1000,
+    )
+
+    sequential = service.validate(request).errors
+    assert len(sequential) > 0
+    # Neither unknown fields nor dates read as text
+    assert all(
+        set(e.error) <= {"user_email", "transaction_amount"} for e in sequential
+    )
+    assert service.validate_parallel(request, workers=3).errors == sequential
+    checkpointed = CSVServiceImpl(
+        storage,
+        schema_registry,
+        checkpoint_store=LocalCheckpointStore(str(tmp_path / "checkpoints")),
+        checkpoint_bytes=0,
+    )
+    assert list(checkpointed.stream_errors(request)) == list(sequential)
@@ -0,0 +1,73 @@
+from itertools import permutations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.inspection import FieldMatch
+from app.models.schema import Schema
+from app.services.field_matching import assign, score_fields
+
+definition = {
+    "amount": {"type": "float"},
+    "quantity": {"type": "integer", "min": 0},
+    "user_email": {"type": "string", "regex": r"[^@]+@[^@]+\.[^@]+"},
+}
+
+schema = Schema(name="test", definition=definition)
+
+
+def best_total(scores: np.ndarray) -> float:
+    rows, cols = scores.shape
+    if rows > cols:
+        return best_total(scores.T)
+    return max(
+        sum(scores[r, c] for r, c in enumerate(chosen))
+        for chosen in permutations(range(cols), rows)
+    )
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (3, 3), (2, 5), (5, 2), (4, 4)])
+def test_assign_finds_the_highest_total(shape):
+    rng = np.random.default_rng(sum(shape))
+    for _ in range(20):
+        scores = rng.random(shape).round(2)
+        assignment = assign(scores)
+        chosen = [c for c in assignment if c is not None]
+        assert len(chosen) == len(set(chosen)) == min(shape)
+        total = sum(scores[r, c] for r, c in enumerate(assignment) if c is not None)
+        assert total == pytest.approx(best_total(scores))
+
+
+def test_assign_handles_empty_matrices():
+    assert assign(np.zeros((2, 0))) == [None, None]
+    assert assign(np.zeros((0, 3))) == []
+
+
+def test_assignment_beats_first_fit():
+    # Integers are valid amounts too, taking the first field that fits would give
+    # "count" the amount and leave "price" without a field
+    df = pd.DataFrame({"count": [1, 2, 3], "price": [1.5, 2.0, 3.25]})
+    assert score_fields(df, schema).assignment() == {
+        "count": "quantity",
+        "price": "amount",
+    }
+
+
+def test_name_matches_keep_their_field():
+    df = pd.DataFrame({"Amount": [1, 2], "other": [1.5, 2.5]})
+    assert score_fields(df, schema).assignment() == {"Amount": "amount", "other": None}
+
+
+def test_alternatives_are_ranked_candidates():
+    df = pd.DataFrame({"qty": [1, 2, 3], "notes": ["a", "b", "c"]})
+    alternatives = score_fields(df, schema).alternatives()
+    assert [m.field for m in alternatives["qty"]] == ["quantity", "amount"]
+    assert alternatives["qty"][0].score > alternatives["qty"][1].score
+    assert alternatives["notes"] == []
+
+
+def test_alternatives_of_name_matches():
+    df = pd.DataFrame({"user_email": ["a@b.com"]})
+    alternatives = score_fields(df, schema).alternatives()
+    assert alternatives == {"user_email": [FieldMatch("user_email", 1.0)]}
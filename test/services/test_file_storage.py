@@ -1,15 +1,21 @@
+import hashlib
+from io import BytesIO
 from pathlib import Path
 from datetime import datetime
-from unittest.mock import MagicMock, patch, mock_open
+from unittest.mock import MagicMock, patch
 
 import pandas as pd
 import pytest
 
+from app.services import csv_storage
 from app.services.csv_storage import (
     LocalFileStorage,
     AppendDateToFileName,
     PreserveFileName,
     is_valid_csv,
+    copy_upload,
+    probe_cache,
+    probe_file,
 )
 
 
@@ -47,31 +53,131 @@ def test_is_valid_csv_rejects_wrong_mime():
         assert is_valid_csv(f) is False
 
 
-def test_when_writing_a_valid_file():
+def uploaded(filename: str, data: bytes) -> MagicMock:
+    uploaded_file = MagicMock(filename=filename, mimetype="text/csv")
+    uploaded_file.read.side_effect = BytesIO(data).read
+    return uploaded_file
+
+
+def test_when_writing_a_valid_file(tmp_path):
     data = b"col1,col2\n1,2"
-    file_writer = LocalFileStorage(upload_folder="test/tmp", rename_strategy=None)
-    uploaded_file = MagicMock(filename="test.csv", mimetype="text/csv")
-    uploaded_file.read.return_value = data
-    mock_write = mock_open()
-    with patch("builtins.open", mock_write):
-        file_writer.save_uploaded_file(uploaded_file)
-        mock_write.assert_called_once_with(Path("test/tmp/test.csv"), "wb")
-        mock_write().write.assert_called_once_with(data)
+    file_writer = LocalFileStorage(upload_folder=str(tmp_path), rename_strategy=None)
+    saved = file_writer.save_uploaded_file(uploaded("test.csv", data))
+    assert saved == tmp_path / "test.csv"
+    assert saved.read_bytes() == data
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["blobs", "test.csv", "upload_stats"]
 
 
-def test_save_uploaded_file_with_rename_strategy():
+def test_save_uploaded_file_with_rename_strategy(tmp_path):
     data = b"x,y\n1,2"
     current_time = datetime(2022, 4, 15, 9, 0, 0)
     renamer = AppendDateToFileName(provider=lambda: current_time)
-    file_writer = LocalFileStorage(upload_folder="test/tmp", rename_strategy=renamer)
-    uploaded_file = MagicMock(filename="input.csv", mimetype="text/csv")
-    uploaded_file.read.return_value = data
-    mock_write = mock_open()
-    with patch("builtins.open", mock_write):
-        file_writer.save_uploaded_file(uploaded_file)
-        mock_write.assert_called_once_with(
-            Path("test/tmp/input_20220415_090000.csv"), "wb"
-        )
+    file_writer = LocalFileStorage(upload_folder=str(tmp_path), rename_strategy=renamer)
+    saved = file_writer.save_uploaded_file(uploaded("input.csv", data))
+    assert saved == tmp_path / "input_20220415_090000.csv"
+    assert saved.read_bytes() == data
+
+
+def test_save_uploaded_file_streams_in_chunks(tmp_path):
+    data = b"a,b\r\n" + b"".join(b"%d,%d\r\n" % (i, i) for i in range(100))
+    upload = uploaded("big.csv", data)
+    file_writer = LocalFileStorage(upload_folder=str(tmp_path), chunk_size=7)
+    saved = file_writer.save_uploaded_file(upload)
+    assert saved.read_bytes() == data
+    assert all(call.args == (7,) for call in upload.read.call_args_list)
+
+
+def test_save_uploaded_file_removes_partial_file_on_error(tmp_path):
+    upload = MagicMock(filename="broken.csv", mimetype="text/csv")
+    upload.read.side_effect = [b"a,b\n", IOError("connection reset")]
+    file_writer = LocalFileStorage(upload_folder=str(tmp_path))
+    with pytest.raises(IOError):
+        file_writer.save_uploaded_file(upload)
+    assert not (tmp_path / "broken.csv").exists()
+    assert list((tmp_path / "blobs").iterdir()) == []
+
+
+def test_identical_uploads_share_one_blob(tmp_path):
+    data = b"a,b\n1,2\n"
+    file_writer = LocalFileStorage(upload_folder=str(tmp_path))
+    first = file_writer.save_uploaded_file(uploaded("first.csv", data))
+    second = file_writer.save_uploaded_file(uploaded("second.csv", data))
+    blobs = list((tmp_path / "blobs").iterdir())
+    assert [blob.name for blob in blobs] == [f"{hashlib.sha256(data).hexdigest()}.csv"]
+    assert first.resolve() == second.resolve() == blobs[0]
+
+
+def test_reupload_with_same_name_points_to_new_content(tmp_path):
+    file_writer = LocalFileStorage(upload_folder=str(tmp_path))
+    file_writer.save_uploaded_file(uploaded("data.csv", b"a,b\n1,2\n"))
+    saved = file_writer.save_uploaded_file(uploaded("data.csv", b"a,b\n3,4\n"))
+    assert saved.read_bytes() == b"a,b\n3,4\n"
+    assert len(list((tmp_path / "blobs").iterdir())) == 2
+
+
+def test_content_hash_of_uploaded_and_plain_files(tmp_path):
+    data = b"a,b\n1,2\n"
+    file_writer = LocalFileStorage(upload_folder=str(tmp_path))
+    saved = file_writer.save_uploaded_file(uploaded("up.csv", data))
+    (tmp_path / "plain.csv").write_bytes(data)
+    expected = hashlib.sha256(data).hexdigest()
+    assert file_writer.content_hash(saved.name) == expected
+    assert file_writer.content_hash("plain.csv") == expected
+
+
+def test_content_hash_of_plain_files_is_computed_once_per_version(tmp_path):
+    path = tmp_path / "plain.csv"
+    path.write_bytes(b"a,b\n1,2\n")
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    with patch(
+        "app.services.csv_storage.file_sha256", wraps=csv_storage.file_sha256
+    ) as hashed:
+        first = storage.content_hash("plain.csv")
+        assert storage.content_hash("plain.csv") == first
+        assert hashed.call_count == 1
+        path.write_bytes(b"a,b\n1,2\n3,4\n")
+        assert storage.content_hash("plain.csv") != first
+        assert hashed.call_count == 2
+
+
+def test_copy_upload_collects_stats():
+    data = b"a,b\r\n1,2\n3,4\r5,6"
+    target = BytesIO()
+    stats = copy_upload(BytesIO(data), target, chunk_size=4)
+    assert target.getvalue() == data
+    assert stats.sha256 == hashlib.sha256(data).hexdigest()
+    assert stats.size == len(data)
+    assert stats.lines == 4
+    assert stats.line_endings == {"lf": 1, "crlf": 1, "cr": 1}
+    assert stats.sample == data
+
+
+def test_upload_stats_are_available_after_save(tmp_path):
+    data = b"a,b\n1,2\n"
+    file_writer = LocalFileStorage(upload_folder=str(tmp_path))
+    saved = file_writer.save_uploaded_file(uploaded("stats.csv", data))
+    stats = file_writer.upload_stats(saved.name)
+    assert stats.lines == 2
+    assert stats.sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_upload_stats_are_read_back_in_another_process(tmp_path):
+    data = b"a,b\r\n1,2\r\n"
+    file_writer = LocalFileStorage(upload_folder=str(tmp_path))
+    saved = file_writer.save_uploaded_file(uploaded("stats.csv", data))
+    # A fresh process has an empty probe cache
+    probe_cache.clear()
+    stats = file_writer.upload_stats(saved.name)
+    assert stats.lines == 2
+    assert stats.line_endings == {"lf": 0, "crlf": 2, "cr": 0}
+    assert stats.sample == data
+    assert file_writer.upload_stats(saved.name) is stats
+
+
+def test_saved_uploads_are_readable_by_others(tmp_path):
+    file_writer = LocalFileStorage(upload_folder=str(tmp_path))
+    saved = file_writer.save_uploaded_file(uploaded("mode.csv", b"a,b\n1,2\n"))
+    assert saved.resolve().stat().st_mode & 0o777 == 0o644
 
 
 def test_resolve_path_returns_path_when_file_exists(tmp_path):
@@ -117,3 +223,200 @@ def test_read_chunk_returns_iterator_of_chunks(tmp_path):
     assert len(chunk_list) >= 1
     total_rows = sum(len(c) for c in chunk_list)
     assert total_rows == 5
+
+
+# --- probe cache ---
+
+
+@pytest.fixture(autouse=True)
+def clear_probe_cache():
+    probe_cache.clear()
+    yield
+    probe_cache.clear()
+
+
+def test_probe_file_detects_header_and_columns(tmp_path):
+    csv_path = tmp_path / "probe.csv"
+    csv_path.write_text("name,amount\nalice,1\nbob,2")
+    probe = probe_file(csv_path)
+    assert probe.has_header is True
+    assert probe.columns == ("name", "amount")
+    assert probe.dialect.delimiter == ","
+
+
+def test_probe_reads_columns_of_utf16_files(tmp_path):
+    csv_path = tmp_path / "wide.csv"
+    csv_path.write_text("name,age\nZoë,31\nBjörn,45\n", encoding="utf-16")
+    assert probe_file(csv_path).columns == ("name", "age")
+
+
+def test_repeated_reads_probe_the_file_once(tmp_path):
+    (tmp_path / "cached.csv").write_text("a,b\n1,2\n3,4")
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    with patch(
+        "app.services.csv_storage.detect_encoding", return_value="utf-8"
+    ) as encoding:
+        storage.peek("cached.csv")
+        storage.read_all("cached.csv")
+        list(storage.read_chunk("cached.csv"))
+    assert encoding.call_count == 1
+
+
+def test_probe_is_refreshed_when_file_changes(tmp_path):
+    csv_path = tmp_path / "changing.csv"
+    csv_path.write_text("a,b\n1,2")
+    assert probe_file(csv_path).columns == ("a", "b")
+    csv_path.write_text("x,y,z\n1,2,3\n4,5,6")
+    assert probe_file(csv_path).columns == ("x", "y", "z")
+
+
+def test_probe_cache_evicts_least_recently_used(tmp_path):
+    paths = [tmp_path / f"{name}.csv" for name in "abc"]
+    for path in paths:
+        path.write_text("x,y\n1,2")
+    with patch.object(probe_cache, "maxsize", 2):
+        for path in paths:
+            probe_file(path)
+        assert len(probe_cache) == 2
+        assert str(paths[0]) not in {key[0] for key in probe_cache.entries}
+
+
+def test_probe_cache_is_safe_to_share_between_threads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    paths = [tmp_path / f"{i}.csv" for i in range(20)]
+    for path in paths:
+        path.write_text("x,y\n1,2")
+    with patch.object(probe_cache, "maxsize", 4):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            probes = list(pool.map(probe_file, paths * 20))
+    assert all(probe.columns == ("x", "y") for probe in probes)
+    assert len(probe_cache) == 4
+
+
+def test_save_uploaded_file_fills_probe_cache(tmp_path):
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    saved = storage.save_uploaded_file(uploaded("upload.csv", b"a,b\n1,2"))
+    assert len(probe_cache) == 1
+    with patch("app.services.csv_storage.detect_encoding") as encoding:
+        storage.peek(saved.name)
+    encoding.assert_not_called()
+
+
+# --- byte ranges ---
+
+
+def test_byte_ranges_start_on_line_boundaries(tmp_path):
+    csv_path = tmp_path / "ranges.csv"
+    csv_path.write_text("a,b\n" + "".join(f"{i},{i * 10}\n" for i in range(100)))
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    ranges = storage.byte_ranges("ranges.csv", 4)
+    data = csv_path.read_bytes()
+    assert ranges[0][0] == len(b"a,b\n")
+    assert ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[start - 1 : start] == b"\n"
+
+
+def test_read_blocks_take_in_quoted_line_breaks(tmp_path):
+    rows = "".join(f'{i},"line {i}\nmore ""quoted"" {i}"\n' for i in range(50))
+    (tmp_path / "quoted.csv").write_text("a,b\n" + rows)
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    chunks = [chunk for chunk, _ in storage.read_blocks("quoted.csv", block_bytes=30)]
+    df = pd.concat(chunks)
+    assert len(chunks) > 1
+    assert df["a"].tolist() == list(range(50))
+    assert df["b"].iloc[7] == 'line 7\nmore "quoted" 7'
+
+
+def test_read_blocks_fail_on_a_bad_row_without_reading_on(tmp_path, monkeypatch):
+    rows = [f"{i},{i}\n" for i in range(1000)]
+    rows[20] = "20,20,extra\n"
+    (tmp_path / "bad.csv").write_text("a,b\n" + "".join(rows))
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    read_csv = MagicMock(wraps=pd.read_csv)
+    monkeypatch.setattr(pd, "read_csv", read_csv)
+    blocks = storage.read_blocks("bad.csv", block_bytes=40)
+    with pytest.raises(pd.errors.ParserError):
+        list(blocks)
+    # Not retried with one more line at a time up to the end of the file
+    assert read_csv.call_count < 20
+
+
+def test_byte_ranges_refuse_multi_byte_line_breaks(tmp_path):
+    csv_path = tmp_path / "wide.csv"
+    csv_path.write_text("a,b\n" + "".join(f"{i},{i}\n" for i in range(100)), "utf-16")
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    with pytest.raises(ValueError, match="Can't split"):
+        storage.byte_ranges("wide.csv", 4)
+
+
+def test_read_range_returns_rows_in_range(tmp_path):
+    csv_path = tmp_path / "ranges.csv"
+    csv_path.write_text("a,b\n" + "".join(f"{i},{i * 10}\n" for i in range(100)))
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    frames = [
+        pd.concat(storage.read_range("ranges.csv", start, end, size=7))
+        for start, end in storage.byte_ranges("ranges.csv", 3)
+    ]
+    combined = pd.concat(frames, ignore_index=True)
+    assert list(combined.columns) == ["a", "b"]
+    assert list(combined["a"]) == list(range(100))
+
+
+# --- sampling ---
+
+
+def write_rows(path: Path, rows: int) -> None:
+    path.write_text("a,b\n" + "".join(f"{i},{i * 10}\n" for i in range(rows)))
+
+
+def test_sample_spreads_over_large_files(tmp_path):
+    write_rows(tmp_path / "large.csv", 100_000)
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    df = storage.sample("large.csv", rows=50)
+    assert list(df.columns) == ["a", "b"]
+    assert list(df["a"][:5]) == [0, 1, 2, 3, 4]
+    assert len(df) == 50
+    assert df["a"].is_unique and df["a"].is_monotonic_increasing
+    assert df["a"].max() > 90_000
+    assert (df["b"] == df["a"] * 10).all()
+
+
+def test_sample_is_repeatable(tmp_path):
+    write_rows(tmp_path / "large.csv", 100_000)
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    first = storage.sample("large.csv", rows=20)
+    assert first.equals(storage.sample("large.csv", rows=20))
+    assert not first.equals(storage.sample("large.csv", rows=20, seed=1))
+
+
+def test_sample_reads_small_files_whole(tmp_path):
+    write_rows(tmp_path / "small.csv", 1000)
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    df = storage.sample("small.csv", rows=10, columns=["b"])
+    assert list(df.columns) == ["b"]
+    assert list(df["b"][:5]) == [0, 10, 20, 30, 40]
+    assert len(df) == 10
+    assert storage.sample("small.csv", rows=5000).equals(storage.read_all("small.csv"))
+
+
+def test_sample_of_file_with_quoted_line_breaks_uses_first_rows(tmp_path):
+    note = '"first line\nsecond, line\nthird line"'
+    (tmp_path / "notes.csv").write_text(
+        "a,b\n" + "".join(f"{i},{note}\n" for i in range(20_000))
+    )
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    df = storage.sample("notes.csv", rows=30)
+    assert list(df["a"]) == list(range(30))
+
+
+def test_sample_of_headerless_file_numbers_columns(tmp_path):
+    (tmp_path / "plain.csv").write_text(
+        "".join(f"{i},name{i}@example.com\n" for i in range(30_000))
+    )
+    storage = LocalFileStorage(upload_folder=str(tmp_path))
+    df = storage.sample("plain.csv", rows=10)
+    assert list(df.columns) == [0, 1]
+    assert len(df) == 10
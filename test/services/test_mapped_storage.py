@@ -0,0 +1,86 @@
+import pickle
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from app.services.csv_storage import LocalFileStorage, probe_cache
+from app.services.mapped_storage import MappedFileStorage
+
+
+@pytest.fixture(autouse=True)
+def clear_probe_cache():
+    probe_cache.clear()
+    yield
+    probe_cache.clear()
+
+
+@pytest.fixture
+def csv_folder(tmp_path):
+    rows = "".join(f"user{i}@example.com,{i * 1.5},café {i}\n" for i in range(50))
+    (tmp_path / "data.csv").write_text("email,amount,note\n" + rows, encoding="utf-8")
+    return tmp_path
+
+
+def test_peek_matches_local_storage(csv_folder):
+    mapped = MappedFileStorage(str(csv_folder)).peek("data.csv", rows=3)
+    local = LocalFileStorage(str(csv_folder)).peek("data.csv", rows=3)
+    pd.testing.assert_frame_equal(mapped, local)
+
+
+def test_read_chunk_matches_local_storage(csv_folder):
+    mapped = list(MappedFileStorage(str(csv_folder)).read_chunk("data.csv", size=20))
+    local = list(LocalFileStorage(str(csv_folder)).read_chunk("data.csv", size=20))
+    assert len(mapped) == len(local) == 3
+    for left, right in zip(mapped, local):
+        pd.testing.assert_frame_equal(left, right)
+
+
+def test_read_all_returns_every_row(csv_folder):
+    df = MappedFileStorage(str(csv_folder)).read_all("data.csv")
+    assert list(df.columns) == ["email", "amount", "note"]
+    assert len(df) == 50
+    assert df["note"].iloc[0] == "café 0"
+
+
+def test_read_range_matches_local_storage(csv_folder):
+    storage = MappedFileStorage(str(csv_folder))
+    local = LocalFileStorage(str(csv_folder))
+    for start, end in storage.byte_ranges("data.csv", 3):
+        pd.testing.assert_frame_equal(
+            pd.concat(storage.read_range("data.csv", start, end)),
+            pd.concat(local.read_range("data.csv", start, end)),
+        )
+
+
+def test_file_is_mapped_once_for_probe_and_reads(csv_folder):
+    storage = MappedFileStorage(str(csv_folder))
+    with patch("builtins.open", wraps=open) as opened:
+        storage.peek("data.csv")
+        list(storage.read_chunk("data.csv"))
+        storage.read_all("data.csv")
+    csv_opens = [c for c in opened.call_args_list if str(c.args[0]).endswith(".csv")]
+    assert len(csv_opens) == 1
+    assert len(storage.maps) == 1
+
+
+def test_mapped_storage_can_be_pickled_for_worker_processes(csv_folder):
+    storage = MappedFileStorage(str(csv_folder))
+    storage.peek("data.csv")
+    copy = pickle.loads(pickle.dumps(storage))
+    assert copy.maps == {}
+    assert len(copy.peek("data.csv")) == 5
+
+
+def test_read_range_with_schema_matches_local_storage(csv_folder):
+    from app.models.schema import Schema
+
+    schema = Schema(name="s", definition={"mail": {"type": "string"}})
+    local = LocalFileStorage(str(csv_folder))
+    (start, end), = local.byte_ranges("data.csv", 1)
+    kwargs = {"schema": schema, "mappings": {"email": "mail"}}
+    mapped = MappedFileStorage(str(csv_folder))
+    chunks = mapped.read_range("data.csv", start, end, **kwargs)
+    expected = pd.concat(local.read_range("data.csv", start, end, **kwargs))
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+    assert list(expected.columns) == ["email"]
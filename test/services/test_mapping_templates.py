@@ -0,0 +1,101 @@
+import pytest
+
+from app.models.mapping_template import MappingTemplate
+from app.models.schema import Schema
+from app.services import SchemaRegistry, SchemaRepository
+from app.services.csv_service import CSVServiceImpl
+from app.services.csv_storage import LocalFileStorage, probe_file
+from app.services.mapping_templates import LocalTemplateStore
+
+schema = Schema(
+    name="test",
+    definition={"user_email": {"type": "string"}, "amount": {"type": "float"}},
+)
+
+
+class MockSchemaRepository(SchemaRepository):
+    def get_all_schemas(self):
+        yield schema
+
+    def save_schema(self, schema: Schema) -> None:
+        pass
+
+
+@pytest.fixture
+def service(tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    return CSVServiceImpl(
+        LocalFileStorage(str(uploads)),
+        SchemaRegistry(MockSchemaRepository()),
+        template_store=LocalTemplateStore(str(tmp_path / "templates")),
+    )
+
+
+def fingerprint(path, text: str) -> str:
+    path.write_text(text)
+    return probe_file(path).fingerprint()
+
+
+def test_fingerprint_ignores_how_names_are_written(tmp_path):
+    first = fingerprint(tmp_path / "a.csv", "User Email,Amount\na@b.com,1\n")
+    second = fingerprint(tmp_path / "b.csv", "user_email,AMOUNT\nc@d.com,2\n")
+    assert first == second
+
+
+def test_fingerprint_changes_with_column_order_and_delimiter(tmp_path):
+    first = fingerprint(tmp_path / "a.csv", "email,amount\na@b.com,1\n")
+    assert first != fingerprint(tmp_path / "b.csv", "amount,email\n1,a@b.com\n")
+    assert first != fingerprint(tmp_path / "c.csv", "email;amount\na@b.com;1\n")
+
+
+def test_files_without_header_have_no_fingerprint(tmp_path):
+    assert fingerprint(tmp_path / "a.csv", "1,2\n3,4\n5,6\n") is None
+
+
+def test_store_returns_saved_template(tmp_path):
+    store = LocalTemplateStore(str(tmp_path))
+    template = MappingTemplate("abc", "test", ["Email", "Notes"], ["user_email", None])
+    store.save(template)
+    assert store.get("abc") == template
+    assert store.get("missing") is None
+
+
+def test_template_maps_columns_by_position():
+    template = MappingTemplate("abc", "test", ["Email", "Notes"], ["user_email", None])
+    assert template.mappings(["EMAIL", "notes"]) == {"EMAIL": "user_email"}
+
+
+def test_saved_mappings_are_used_for_files_with_the_same_layout(service, tmp_path):
+    uploads = tmp_path / "uploads"
+    (uploads / "monday.csv").write_text("Mail,Total,Notes\na@b.com,1.5,x\n")
+    (uploads / "tuesday.csv").write_text("mail,TOTAL,notes\nc@d.com,2.5,y\n")
+    assert service.inspect_template("tuesday.csv") is None
+
+    service.save_template("monday.csv", "test", {"Mail": "user_email", "Total": "amount"})
+    result = service.inspect_template("tuesday.csv")
+    assert result.schema == schema
+    assert result.suggestions == {"mail": "user_email", "TOTAL": "amount", "notes": None}
+    assert result.sample == [{"mail": "c@d.com", "TOTAL": 2.5, "notes": "y"}]
+
+
+def test_template_is_skipped_for_another_schema(service, tmp_path):
+    (tmp_path / "uploads" / "file.csv").write_text("Mail,Total\na@b.com,1.5\n")
+    service.save_template("file.csv", "test", {"Mail": "user_email"})
+    assert service.inspect_template("file.csv", "test") is not None
+    assert service.inspect_template("file.csv", "other") is None
+
+
+def test_template_of_removed_schema_is_ignored(service, tmp_path):
+    (tmp_path / "uploads" / "file.csv").write_text("Mail,Total\na@b.com,1.5\n")
+    service.save_template("file.csv", "removed", {"Mail": "user_email"})
+    assert service.inspect_template("file.csv") is None
+
+
+def test_template_skips_sampling(service, tmp_path, monkeypatch):
+    (tmp_path / "uploads" / "file.csv").write_text("Mail,Total\na@b.com,1.5\n")
+    service.save_template("file.csv", "test", {"Mail": "user_email"})
+    sampled = []
+    monkeypatch.setattr(service.csv_store, "sample", lambda *a, **k: sampled.append(a))
+    service.inspect_template("file.csv")
+    assert sampled == []
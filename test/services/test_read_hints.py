@@ -0,0 +1,210 @@
+import datetime
+import uuid
+
+import pandas as pd
+import pytest
+
+from app.models.process import CSVValidationRequest
+from app.models.schema import Schema
+from app.services import SchemaRegistry, SchemaRepository
+from app.services.csv_service import CSVServiceImpl
+from app.services.csv_storage import LocalFileStorage
+from app.services.read_hints import ReadHints, parse_dates, read_hints
+from app.services.sidecar import find_sidecar
+
+schema = Schema(
+    name="books",
+    definition={
+        "title": {"type": "string"},
+        "format": {"type": "string", "allowed": ["paper", "ebook"]},
+        "published": {"type": "date", "nullable": True},
+        "pages": {"type": "integer"},
+    },
+)
+
+
+class MockSchemaRepository(SchemaRepository):
+    def get_all_schemas(self):
+        yield schema
+
+    def save_schema(self, schema: Schema) -> None:
+        pass
+
+
+def test_hints_read_only_columns_that_become_fields():
+    hints = read_hints(
+        schema, {"Title": "title", "Kind": "format"}, ["Title", "Kind", "pages", "notes"]
+    )
+    assert hints == ReadHints(
+        columns=["Title", "Kind", "pages"],
+        dtype={"Title": "str", "Kind": "category"},
+        dates=[],
+    )
+
+
+def test_hints_read_every_column_when_all_are_fields():
+    hints = read_hints(schema, {}, ["title", "published"])
+    assert hints.columns is None
+    assert hints.dates == ["published"]
+
+
+def test_hints_skip_ignored_columns_named_like_fields():
+    hints = read_hints(schema, {"title": None}, ["title", "pages"])
+    assert hints.columns == ["pages"]
+    assert hints.dtype == {}
+
+
+def test_parse_dates_keeps_values_that_are_not_dates():
+    parsed = parse_dates(pd.Series(["2024-01-02", "soon", None], dtype="str"))
+    assert parsed[0] == datetime.datetime(2024, 1, 2)
+    assert parsed[1] == "soon"
+    assert pd.isna(parsed[2]) and not isinstance(parsed[2], datetime.date)
+    assert parse_dates(pd.Series(["2024-01-02"])).dtype.kind == "M"
+
+
+def test_read_chunk_with_schema_reads_compact_mapped_columns(tmp_path):
+    (tmp_path / "books.csv").write_text(
+        "Title,Kind,published,notes\n"
+        "Dune,paper,1965-08-01,x\n"
+        "Emma,ebook,1815-12-23,y\n"
+        "1984,paper,1949-06-08,z\n"
+    )
+    storage = LocalFileStorage(str(tmp_path))
+    chunks = storage.read_chunk(
+        "books.csv", schema=schema, mappings={"Title": "title", "Kind": "format"}
+    )
+    chunk = next(iter(chunks))
+    assert list(chunk.columns) == ["Title", "Kind", "published"]
+    assert chunk["Title"].tolist() == ["Dune", "Emma", "1984"]
+    assert chunk["Kind"].dtype == "category"
+    assert chunk["published"].dtype.kind == "M"
+
+
+def test_read_chunk_with_schema_and_no_header(tmp_path):
+    (tmp_path / "books.csv").write_text("12,paper\n34,ebook\n56,paper\n")
+    storage = LocalFileStorage(str(tmp_path))
+    columns = list(storage.probe("books.csv").columns)
+    chunks = storage.read_chunk(
+        "books.csv", schema=schema, mappings={columns[1]: "format"}
+    )
+    chunk = next(iter(chunks))
+    assert list(chunk.columns) == [columns[1]]
+    assert chunk[columns[1]].dtype == "category"
+
+
+def test_validation_reads_dates_and_skips_unknown_columns(tmp_path):
+    (tmp_path / "books.csv").write_text(
+        "Title,Kind,published,notes\n"
+        "Dune,paper,1965-08-01,x\n"
+        "Emma,comic,someday,y\n"
+    )
+    service = CSVServiceImpl(
+        LocalFileStorage(str(tmp_path)), SchemaRegistry(MockSchemaRepository())
+    )
+    request = CSVValidationRequest(
+        id=uuid.uuid4(),
+        file="books.csv",
+        schema="books",
+        mappings={"Title": "title", "Kind": "format"},
+    )
+    errors = list(service.stream_errors(request))
+    assert [(e.row_numer, e.error) for e in errors] == [
+        (1, {"format": ["unallowed value comic"], "published": ["must be of date type"]})
+    ]
+
+
+def test_validation_skips_ignored_columns_named_like_fields(tmp_path):
+    (tmp_path / "books.csv").write_text("title,format,pages\n,comic,12\n")
+    service = CSVServiceImpl(
+        LocalFileStorage(str(tmp_path)), SchemaRegistry(MockSchemaRepository())
+    )
+    request = CSVValidationRequest(
+        id=uuid.uuid4(),
+        file="books.csv",
+        schema="books",
+        mappings={"title": None, "format": None},
+    )
+    assert list(service.stream_errors(request)) == []
+
+
+codes = Schema(
+    name="codes",
+    definition={"code": {"type": "string", "nullable": True}, "qty": {"type": "integer"}},
+)
+
+
+def test_fully_mapped_text_columns_keep_leading_zeros_and_blanks(tmp_path):
+    (tmp_path / "codes.csv").write_text("code,qty\n007,1\n,2\n010,3\n")
+    storage = LocalFileStorage(str(tmp_path))
+    chunk = next(iter(storage.read_chunk("codes.csv", schema=codes)))
+    assert chunk["code"].iloc[[0, 2]].tolist() == ["007", "010"]
+    assert pd.isna(chunk["code"].iloc[1])
+    assert chunk["qty"].tolist() == [1, 2, 3]
+
+
+def test_text_columns_are_not_read_from_a_sidecar_that_lost_them(tmp_path):
+    pytest.importorskip("pyarrow")
+    (tmp_path / "codes.csv").write_text("code,qty\n007,1\n010,2\n")
+    storage = LocalFileStorage(str(tmp_path))
+    # A full read without a schema builds the sidecar, with codes as numbers
+    list(storage.read_chunk("codes.csv"))
+    assert find_sidecar(tmp_path / "codes.csv") is not None
+    chunk = next(iter(storage.read_chunk("codes.csv", schema=codes)))
+    assert chunk["code"].tolist() == ["007", "010"]
+
+
+def test_schemas_without_text_columns_build_the_sidecar(tmp_path):
+    pytest.importorskip("pyarrow")
+    (tmp_path / "codes.csv").write_text("code,qty\n007,1\n010,2\n")
+    storage = LocalFileStorage(str(tmp_path))
+    counts = Schema(name="counts", definition={"qty": {"type": "integer"}})
+    chunks = list(storage.read_chunk("codes.csv", schema=counts))
+    assert list(chunks[0].columns) == ["qty"]
+    assert find_sidecar(tmp_path / "codes.csv") is not None
+    chunk = next(iter(storage.read_chunk("codes.csv", schema=counts)))
+    assert chunk["qty"].tolist() == [1, 2]
+
+
+def test_validating_twice_reads_text_columns_from_the_sidecar(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    import app.services.csv_storage as csv_storage
+
+    (tmp_path / "books.csv").write_text(
+        "Title,Kind,published\n007,paper,1965-08-01\nEmma,comic,someday\n"
+    )
+    service = CSVServiceImpl(
+        LocalFileStorage(str(tmp_path)), SchemaRegistry(MockSchemaRepository())
+    )
+    request = CSVValidationRequest(
+        id=uuid.uuid4(),
+        file="books.csv",
+        schema="books",
+        mappings={"Title": "title", "Kind": "format"},
+    )
+    first = [(e.row_numer, e.error) for e in service.stream_errors(request)]
+    assert find_sidecar(tmp_path / "books.csv") is not None
+
+    reads = []
+    read_sidecar = csv_storage.read_sidecar
+    monkeypatch.setattr(
+        csv_storage,
+        "read_sidecar",
+        lambda *args: reads.append(args) or read_sidecar(*args),
+    )
+    second = [(e.row_numer, e.error) for e in service.stream_errors(request)]
+    assert reads
+    assert second == first == [
+        (1, {"format": ["unallowed value comic"], "published": ["must be of date type"]})
+    ]
+
+
+def test_reads_without_a_schema_skip_a_sidecar_with_text_columns(tmp_path):
+    pytest.importorskip("pyarrow")
+    (tmp_path / "codes.csv").write_text("code,qty\n007,1\n010,2\n")
+    storage = LocalFileStorage(str(tmp_path))
+    chunks = list(storage.read_chunk("codes.csv", schema=codes))
+    assert chunks[0]["code"].tolist() == ["007", "010"]
+    assert find_sidecar(tmp_path / "codes.csv") is not None
+    assert storage.read_all("codes.csv")["code"].tolist() == [7, 10]
+    chunk = next(iter(storage.read_chunk("codes.csv", schema=codes)))
+    assert chunk["code"].tolist() == ["007", "010"]
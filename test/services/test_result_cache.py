@@ -0,0 +1,36 @@
+import uuid
+
+from app.models.process import CSVValidationError, CSVValidationRequest
+from app.models.schema import Schema
+from app.services.result_cache import LocalResultCache, result_key
+
+schema = Schema("test", {"a": {"type": "string"}})
+
+
+def make_request(**kwargs) -> CSVValidationRequest:
+    return CSVValidationRequest(id=uuid.uuid4(), file="data.csv", schema="test", **kwargs)
+
+
+def test_cache_returns_stored_errors(tmp_path):
+    cache = LocalResultCache(str(tmp_path))
+    errors = [CSVValidationError(row_numer=2, error={"a": ["must be of string type"]})]
+    cache.put("key", errors)
+    assert cache.get("key") == errors
+
+
+def test_cache_misses_unknown_key(tmp_path):
+    assert LocalResultCache(str(tmp_path)).get("missing") is None
+
+
+def test_result_key_ignores_request_id_and_file_name():
+    assert result_key("abc", schema, make_request()) == result_key(
+        "abc", schema, make_request()
+    )
+
+
+def test_result_key_changes_with_content_schema_and_mappings():
+    key = result_key("abc", schema, make_request())
+    other_schema = Schema("test", {"a": {"type": "integer"}})
+    assert result_key("def", schema, make_request()) != key
+    assert result_key("abc", other_schema, make_request()) != key
+    assert result_key("abc", schema, make_request(mappings={"A": "a"})) != key
@@ -0,0 +1,155 @@
+import json
+import uuid
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.models.process import CSVValidationRequest
+from app.models.schema import Schema
+from app.services import SchemaRegistry, SchemaRepository
+from app.services.csv_service import CSVServiceImpl
+from app.services.csv_storage import LocalFileStorage
+from app.services.row_writers import CSVRowWriter, ParquetRowWriter, coerce
+from app.services.sidecar import PYARROW_AVAILABLE
+
+needs_pyarrow = pytest.mark.skipif(not PYARROW_AVAILABLE, reason="needs pyarrow")
+
+schema = Schema(
+    name="orders",
+    definition={
+        "id": {"type": "integer", "unique": True},
+        "amount": {"type": "float", "min": 0},
+        "paid": {"type": "boolean", "nullable": True},
+    },
+)
+
+
+class MockSchemaRepository(SchemaRepository):
+    def get_all_schemas(self):
+        yield schema
+
+    def save_schema(self, schema: Schema) -> None:
+        pass
+
+
+@pytest.fixture
+def service(tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    rows = [f"{i},{-1 if i % 10 == 3 else i}.5" for i in range(25)]
+    rows[20] = "2,1.0"
+    (uploads / "orders.csv").write_text("ID,Amount\n" + "\n".join(rows) + "\n")
+    storage = LocalFileStorage(str(uploads))
+    return CSVServiceImpl(storage, SchemaRegistry(MockSchemaRepository()))
+
+
+def split_request() -> CSVValidationRequest:
+    return CSVValidationRequest(
+        id=uuid.uuid4(),
+        file="orders.csv",
+        schema="orders",
+        mappings={"ID": "id", "Amount": "amount"},
+        error_threshold=0,
+    )
+
+
+def test_coerce_uses_the_dtype_of_each_field_type():
+    df = pd.DataFrame({"id": [1.0, None], "amount": [1, 2], "paid": [True, None]})
+    coerced = coerce(df, schema)
+    assert str(coerced["id"].dtype) == "Int64"
+    assert coerced["amount"].dtype == "float64"
+    assert str(coerced["paid"].dtype) == "boolean"
+
+
+def test_csv_writer_only_shows_the_file_once_closed(tmp_path):
+    path = tmp_path / "out" / "rows.csv"
+    with CSVRowWriter(str(path)) as writer:
+        writer.write(pd.DataFrame({"a": [1, 2]}))
+        writer.write(pd.DataFrame({"a": [3]}))
+        assert not path.exists()
+    assert path.read_text() == "a\n1\n2\n3\n"
+
+
+def test_failed_writes_leave_no_file(tmp_path):
+    path = tmp_path / "rows.csv"
+    with pytest.raises(RuntimeError):
+        with CSVRowWriter(str(path)) as writer:
+            writer.write(pd.DataFrame({"a": [1]}))
+            raise RuntimeError()
+    assert list(tmp_path.iterdir()) == []
+
+
+@needs_pyarrow
+def test_parquet_writer_buffers_row_groups(tmp_path):
+    path = tmp_path / "rows.parquet"
+    with ParquetRowWriter(str(path), row_group_rows=3) as writer:
+        for start in range(0, 10, 2):
+            writer.write(pd.DataFrame({"a": [start, start + 1]}))
+    import pyarrow.parquet as pq
+
+    assert pq.ParquetFile(path).metadata.num_row_groups == 3
+    assert pd.read_parquet(path)["a"].tolist() == list(range(10))
+
+
+def test_split_rows_writes_clean_and_rejected_rows(service, tmp_path):
+    folder = tmp_path / "split"
+    progress = []
+    split = service.split_rows(split_request(), str(folder), on_progress=progress.append)
+    assert (split.clean_rows, split.rejected_rows) == (21, 4)
+    assert progress[-1] == 25
+
+    clean = pd.read_csv(split.clean)
+    assert list(clean.columns) == ["id", "amount"]
+    assert 3 not in clean["id"].tolist()
+    rejects = pd.read_csv(split.rejects)
+    assert rejects["_row"].tolist() == [3, 13, 20, 23]
+    assert json.loads(rejects["_errors"][0]) == {"amount": ["min value is 0"]}
+    assert json.loads(rejects["_errors"][2]) == {"id": ["value is not unique"]}
+
+
+@needs_pyarrow
+def test_split_rows_to_parquet_keeps_field_types(service, tmp_path):
+    split = service.split_rows(split_request(), str(tmp_path), output_format="parquet")
+    clean = pd.read_parquet(split.clean)
+    assert split.clean.endswith("orders.clean.parquet")
+    assert str(clean["id"].dtype) == "Int64"
+    assert len(clean) == 21
+
+
+def test_split_rows_rejects_unknown_formats(service, tmp_path):
+    with pytest.raises(ValueError, match="Unknown output format"):
+        service.split_rows(split_request(), str(tmp_path), output_format="xlsx")
+
+
+def test_split_rows_passes_unmapped_columns_through(service, tmp_path):
+    uploads = Path(service.csv_store.resolve_path("orders.csv")).parent
+    (uploads / "notes.csv").write_text(
+        "ID,Amount,Note\n1,2.5,007\n2,-1.0,010\n3,4.5,\n"
+    )
+    request = split_request()
+    request.file = "notes.csv"
+    split = service.split_rows(request, str(tmp_path))
+    # Numbers that aren't mapped to a field keep their text
+    assert Path(split.clean).read_text() == "id,amount,Note\n1,2.5,007\n3,4.5,\n"
+    rejects = pd.read_csv(split.rejects, dtype={"Note": str})
+    assert rejects["Note"].tolist() == ["010"]
+    assert json.loads(rejects["_errors"][0]) == {"amount": ["min value is 0"]}
+
+
+def test_split_rows_passes_ignored_columns_named_like_fields_through(service, tmp_path):
+    uploads = Path(service.csv_store.resolve_path("orders.csv")).parent
+    (uploads / "paid.csv").write_text("ID,Amount,paid\n1,2.5,007\n2,3.5,010\n")
+    request = split_request()
+    request.file = "paid.csv"
+    request.mappings = {"ID": "id", "Amount": "amount", "paid": None}
+    split = service.split_rows(request, str(tmp_path))
+    assert (split.clean_rows, split.rejected_rows) == (2, 0)
+    assert Path(split.clean).read_text() == "id,amount,paid\n1,2.5,007\n2,3.5,010\n"
+
+
+def test_split_rows_refuses_requests_that_map_no_column(service, tmp_path):
+    request = split_request()
+    request.mappings = {"ID": None, "Amount": None}
+    with pytest.raises(ValueError, match="No column"):
+        service.split_rows(request, str(tmp_path))
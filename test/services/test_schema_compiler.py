@@ -0,0 +1,85 @@
+from datetime import date
+
+import pandas as pd
+from cerberus import Validator
+
+from app.models.schema import Schema
+from app.services.schema_compiler import compile_schema
+
+definition = {
+    "user_email": {"type": "string", "regex": r"[^@]+@[^@]+\.[^@]+", "required": True},
+    "transaction_amount": {"type": "float", "min": 0, "max": 1000},
+    "status": {"type": "string", "allowed": ["open", "closed"], "nullable": True},
+    "quantity": {"type": "integer"},
+}
+
+schema = Schema(name="test", definition=definition)
+
+
+def cerberus_valid_rows(df: pd.DataFrame, definition: dict) -> list[bool]:
+    validator = Validator(definition)
+    return [validator.validate(record) for record in df.to_dict("records")]
+
+
+def test_valid_rows_matches_cerberus_for_supported_rules():
+    df = pd.DataFrame(
+        {
+            "user_email": ["a@b.com", "not-an-email", "c@d.org", "e@f.net", None],
+            "transaction_amount": [10.0, 5.0, -1.0, 2000.0, 1.0],
+            "status": ["open", "closed", None, "pending", "open"],
+            "quantity": [1, 2, 3, 4, 5],
+        }
+    )
+    compiled = compile_schema(schema)
+    assert list(compiled.valid_rows(df)) == cerberus_valid_rows(df, definition)
+
+
+def test_valid_rows_never_accepts_a_row_cerberus_rejects():
+    df = pd.DataFrame(
+        {
+            "user_email": ["a@b.com", "x@y.com"],
+            "transaction_amount": [float("nan"), 1.0],
+            "status": pd.Series(["open", None], dtype="str"),
+            "quantity": [1.0, 2.0],
+        }
+    )
+    expected = cerberus_valid_rows(df, definition)
+    for valid, cerberus in zip(compile_schema(schema).valid_rows(df), expected):
+        assert not valid or cerberus
+
+
+def test_missing_required_column_invalidates_every_row():
+    df = pd.DataFrame({"quantity": [1, 2]})
+    assert not compile_schema(schema).valid_rows(df).any()
+
+
+def test_missing_optional_column_is_ignored():
+    df = pd.DataFrame({"user_email": ["a@b.com"], "quantity": [1]})
+    assert compile_schema(schema).valid_rows(df).all()
+
+
+def test_unknown_columns_invalidate_every_row():
+    df = pd.DataFrame({"user_email": ["a@b.com"], "extra": [1]})
+    assert not compile_schema(schema).valid_rows(df).any()
+    assert compile_schema(schema, allow_unknown=True).valid_rows(df).all()
+
+
+def test_unsupported_rules_defer_to_cerberus():
+    unsupported = Schema("unsupported", {"name": {"type": "string", "minlength": 3}})
+    df = pd.DataFrame({"name": ["alice", "bob"]})
+    assert not compile_schema(unsupported).valid_rows(df).any()
+
+
+def test_object_columns_are_checked_per_value():
+    dates = Schema("dates", {"signup_date": {"type": "date"}})
+    df = pd.DataFrame({"signup_date": [date(2026, 1, 1), "2026-01-02"]})
+    assert list(compile_schema(dates).valid_rows(df)) == [True, False]
+
+
+def test_valid_rows_checks_each_category_once():
+    status = pd.Series(["open", "pending", None, "closed"], dtype="str")
+    df = pd.DataFrame({"status": status.astype("category")})
+    rules = {"status": definition["status"]}
+    compiled = compile_schema(Schema(name="status", definition=rules))
+    assert list(compiled.valid_rows(df)) == [True, False, False, True]
+    assert list(compiled.valid_rows(df)) == cerberus_valid_rows(df, rules)
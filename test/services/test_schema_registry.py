@@ -70,3 +70,73 @@ def test_register_schema_persists_and_adds_to_registry(temp_schema_dir):
     assert registry.get_schema("payment").definition == {"amount": {"type": "float"}}
     assert (temp_schema_dir / "payment.json").exists()
     assert "float" in (temp_schema_dir / "payment.json").read_text()
+
+
+def test_schemas_with_field_uses_field_index(temp_schema_dir):
+    registry = SchemaRegistry(LocalSchemaRepository(str(temp_schema_dir)))
+    registry.register_schema(Schema("person", {"name": {"type": "string"}}))
+    assert registry.schemas_with_field("name") == {"user_schema", "person"}
+    assert registry.schemas_with_field("missing") == set()
+
+
+def test_register_schema_reindexes_replaced_schema(temp_schema_dir):
+    registry = SchemaRegistry(LocalSchemaRepository(str(temp_schema_dir)))
+    registry.register_schema(Schema("user_schema", {"email": {"type": "string"}}))
+    assert registry.schemas_with_field("name") == set()
+    assert registry.schemas_with_field("email") == {"user_schema"}
+
+
+def test_registry_reloads_edited_added_and_removed_schemas(temp_schema_dir):
+    registry = SchemaRegistry(
+        LocalSchemaRepository(str(temp_schema_dir)), reload_interval=0
+    )
+    (temp_schema_dir / "user_schema.json").write_text(
+        json.dumps({"name": {"type": "string"}, "age": {"type": "integer"}})
+    )
+    (temp_schema_dir / "order.json").write_text(json.dumps({"id": {"type": "integer"}}))
+    assert registry.get_schema("user_schema").fields() == {"name", "age"}
+    assert registry.schemas_with_field("age") == {"user_schema"}
+    assert sorted(registry.available_schemas()) == ["order", "user_schema"]
+
+    (temp_schema_dir / "order.json").unlink()
+    assert registry.get_schema("order") is None
+    assert registry.schemas_with_field("id") == set()
+
+
+def test_registry_keeps_last_good_version_of_a_broken_schema(temp_schema_dir):
+    registry = SchemaRegistry(
+        LocalSchemaRepository(str(temp_schema_dir)), reload_interval=0
+    )
+    (temp_schema_dir / "user_schema.json").write_text('{"name": ')
+    assert registry.get_schema("user_schema").fields() == {"name"}
+
+
+def test_registry_only_reloads_changed_schemas(temp_schema_dir):
+    repository = LocalSchemaRepository(str(temp_schema_dir))
+    (temp_schema_dir / "order.json").write_text(json.dumps({"id": {"type": "integer"}}))
+    registry = SchemaRegistry(repository, reload_interval=0)
+    order = registry.entry("order")
+    (temp_schema_dir / "user_schema.json").write_text(json.dumps({"x": {}}))
+    assert registry.get_schema("user_schema").fields() == {"x"}
+    assert registry.entry("order") is order
+
+
+def test_registry_checks_for_changes_at_most_once_per_interval(temp_schema_dir):
+    registry = SchemaRegistry(
+        LocalSchemaRepository(str(temp_schema_dir)), reload_interval=3600
+    )
+    (temp_schema_dir / "order.json").write_text(json.dumps({"id": {"type": "integer"}}))
+    assert registry.get_schema("order") is None
+    registry.refresh(force=True)
+    assert registry.get_schema("order") is not None
+
+
+def test_registry_entry_holds_derived_schema_data(temp_schema_dir):
+    registry = SchemaRegistry(LocalSchemaRepository(str(temp_schema_dir)))
+    registry.register_schema(Schema("Person", {"Full Name": {"type": "string"}}))
+    entry = registry.entry("Person")
+    assert entry.fields == {"Full Name"}
+    assert entry.normalized_fields == {"full_name": "Full Name"}
+    assert registry.schemas_with_field("full_name") == {"Person"}
+    assert len(entry.definition_hash) == 64
+    assert registry.entry("user_schema").definition_hash != entry.definition_hash
@@ -0,0 +1,63 @@
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+# Sidecars are optional and only built when pyarrow is installed
+pytest.importorskip("pyarrow")
+
+from app.services.csv_storage import LocalFileStorage, probe_cache
+from app.services.sidecar import find_sidecar, sidecar_path
+
+
+@pytest.fixture(autouse=True)
+def clear_probe_cache():
+    probe_cache.clear()
+    yield
+    probe_cache.clear()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    rows = "".join(f"{i},name {i},{i * 0.5}\n" for i in range(25000))
+    (tmp_path / "data.csv").write_text("id,name,score\n" + rows)
+    return LocalFileStorage(str(tmp_path))
+
+
+def test_full_read_builds_sidecar(storage, tmp_path):
+    chunks = list(storage.read_chunk("data.csv"))
+    assert find_sidecar(tmp_path / "data.csv") == sidecar_path(tmp_path / "data.csv")
+    with patch("app.services.csv_storage.pd.read_csv") as read_csv:
+        cached = list(storage.read_chunk("data.csv"))
+    read_csv.assert_not_called()
+    assert len(cached) == len(chunks) == 3
+    for left, right in zip(cached, chunks):
+        pd.testing.assert_frame_equal(left, right)
+
+
+def test_sidecar_reads_only_requested_columns(storage):
+    list(storage.read_chunk("data.csv"))
+    chunk = next(iter(storage.read_chunk("data.csv", columns=["score", "missing"])))
+    assert list(chunk.columns) == ["score"]
+    assert chunk.index[0] == 0
+    assert list(storage.peek("data.csv", rows=2, columns=["name"])["name"]) == [
+        "name 0",
+        "name 1",
+    ]
+    assert len(storage.read_all("data.csv", columns=["id"])) == 25000
+
+
+def test_partial_read_does_not_leave_a_sidecar(storage, tmp_path):
+    chunks = storage.read_chunk("data.csv")
+    next(iter(chunks))
+    chunks.close()
+    assert find_sidecar(tmp_path / "data.csv") is None
+    assert [p.name for p in tmp_path.iterdir()] == ["data.csv"]
+
+
+def test_sidecar_is_discarded_when_source_changes(storage, tmp_path):
+    list(storage.read_chunk("data.csv"))
+    (tmp_path / "data.csv").write_text("id,name,score\n1,changed,2.0\n")
+    assert find_sidecar(tmp_path / "data.csv") is None
+    assert not sidecar_path(tmp_path / "data.csv").exists()
+    assert list(storage.peek("data.csv")["name"]) == ["changed"]
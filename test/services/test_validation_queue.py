@@ -0,0 +1,146 @@
+import json
+import uuid
+from functools import partial
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.models.job import JobStatus, ValidationJob
+from app.models.process import CSVValidationError, CSVValidationRequest
+from app.services.validation_queue import (
+    LocalJobStore,
+    ValidationQueue,
+    run_validation_job,
+)
+
+
+@pytest.fixture
+def validation_request():
+    return CSVValidationRequest(
+        id=uuid.uuid4(), file="data.csv", schema="test", mappings={"a": "a"}
+    )
+
+
+def test_job_store_returns_saved_job(tmp_path, validation_request):
+    store = LocalJobStore(str(tmp_path))
+    job = ValidationJob(request=validation_request, total_rows=10)
+    store.save(job)
+    assert store.get(job.id) == job
+    assert [p.name for p in tmp_path.iterdir()] == [f"{job.id}.json"]
+
+
+def test_job_store_returns_none_for_unknown_job(tmp_path):
+    assert LocalJobStore(str(tmp_path)).get(uuid.uuid4()) is None
+
+
+def test_job_store_reads_errors_appended_since_offset(tmp_path, validation_request):
+    store = LocalJobStore(str(tmp_path))
+    job_id = validation_request.id
+    assert store.read_errors(job_id) == ([], 0)
+    first = [
+        CSVValidationError(row_numer=1, error="bad"),
+        CSVValidationError(row_numer=2, error="worse"),
+    ]
+    store.append_errors(job_id, first)
+    errors, offset = store.read_errors(job_id)
+    assert errors == first
+    store.append_errors(job_id, [CSVValidationError(row_numer=7, error="bad")])
+    with open(tmp_path / f"{job_id}.errors.jsonl", "a") as f:
+        f.write('{"row": 8, "err')
+    errors, offset = store.read_errors(job_id, offset)
+    assert errors == [CSVValidationError(row_numer=7, error="bad")]
+    assert store.read_errors(job_id, offset) == ([], offset)
+
+
+def test_run_validation_job_records_progress_and_result(tmp_path, validation_request):
+    store = LocalJobStore(str(tmp_path))
+    error = CSVValidationError(row_numer=3, error="bad")
+    seen = []
+
+    def stream_errors(request, on_progress):
+        yield error
+        on_progress(5)
+        # Errors are readable as soon as their chunk has been reported
+        seen.append((store.get(request.id).processed_rows, store.read_errors(request.id)[0]))
+
+    service = MagicMock()
+    service.stream_errors.side_effect = stream_errors
+    job = run_validation_job(ValidationJob(request=validation_request), service, store)
+    assert seen == [(5, [error])]
+    assert job.status == JobStatus.DONE
+    saved = store.get(job.id)
+    assert saved.result.errors == [error]
+    assert saved.error_count == 1
+    assert store.read_errors(job.id)[0] == [error]
+
+
+def test_run_validation_job_marks_failures(tmp_path, validation_request):
+    store = LocalJobStore(str(tmp_path))
+    service = MagicMock()
+    service.stream_errors.side_effect = ValueError("schema not found")
+    run_validation_job(ValidationJob(request=validation_request), service, store)
+    job = store.get(validation_request.id)
+    assert job.status == JobStatus.FAILED
+    assert job.message == "schema not found"
+
+
+def test_queue_validates_in_worker_process(tmp_path, validation_request):
+    from app.services import build_csv_service
+    from app.services.csv_storage import LocalFileStorage
+
+    uploads, schemas, jobs = (tmp_path / d for d in ("uploads", "schemas", "jobs"))
+    uploads.mkdir()
+    schemas.mkdir()
+    (uploads / "data.csv").write_text("a,b\n1,one\nx,two\n")
+    definition = {"a": {"type": "string", "regex": r"\d+"}, "b": {"type": "string"}}
+    (schemas / "test.json").write_text(json.dumps(definition))
+    store = LocalJobStore(str(jobs))
+    queue = ValidationQueue(
+        store,
+        LocalFileStorage(str(uploads)),
+        partial(build_csv_service, str(uploads), str(schemas), str(tmp_path / "cache")),
+        str(jobs),
+        max_workers=1,
+    )
+    job = queue.submit(validation_request)
+    queue.shutdown()
+    finished = queue.get(job.id)
+    assert finished.status == JobStatus.DONE
+    assert [e.row_numer for e in finished.result.errors] == [1]
+
+
+def test_retry_runs_failed_job_again(tmp_path, validation_request):
+    from app.services import build_csv_service
+    from app.services.csv_storage import LocalFileStorage
+
+    uploads, schemas, jobs = (tmp_path / d for d in ("uploads", "schemas", "jobs"))
+    uploads.mkdir()
+    schemas.mkdir()
+    (uploads / "data.csv").write_text("a,b\n1,one\nx,two\n")
+    definition = {"a": {"type": "string", "regex": r"\d+"}, "b": {"type": "string"}}
+    (schemas / "test.json").write_text(json.dumps(definition))
+    store = LocalJobStore(str(jobs))
+    store.save(
+        ValidationJob(request=validation_request, status=JobStatus.FAILED, message="x")
+    )
+    store.append_errors(validation_request.id, [CSVValidationError(0, "stale")])
+    queue = ValidationQueue(
+        store,
+        LocalFileStorage(str(uploads)),
+        partial(
+            build_csv_service,
+            str(uploads),
+            str(schemas),
+            str(tmp_path / "cache"),
+            checkpoint_folder=str(tmp_path / "checkpoints"),
+        ),
+        str(jobs),
+        max_workers=1,
+    )
+    queue.retry(validation_request.id)
+    queue.shutdown()
+    finished = queue.get(validation_request.id)
+    assert finished.status == JobStatus.DONE
+    assert finished.message is None
+    errors, _ = queue.read_errors(validation_request.id)
+    assert [e.row_numer for e in errors] == [1]
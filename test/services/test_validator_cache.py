@@ -0,0 +1,43 @@
+import threading
+
+from app.models.schema import Schema
+from app.services.validator_cache import ValidatorCache
+
+schema = Schema("test", {"a": {"type": "integer"}, "b": {"type": "string"}})
+
+
+def test_validators_are_reused_for_the_same_schema():
+    cache = ValidatorCache()
+    assert cache.validator(schema) is cache.validator(Schema("test", schema.definition))
+    assert cache.field_validators(schema) is cache.field_validators(schema)
+
+
+def test_field_validators_check_single_values():
+    validators = ValidatorCache().field_validators(schema)
+    assert list(validators) == ["a", "b"]
+    assert validators["a"].validate({"a": 1})
+    assert not validators["a"].validate({"a": "one"})
+
+
+def test_changed_schema_gets_new_validators():
+    cache = ValidatorCache()
+    old = cache.validator(schema)
+    changed = Schema("test", {"a": {"type": "string"}})
+    assert cache.validator(changed) is not old
+    assert cache.validator(changed).validate({"a": "one"})
+
+
+def test_cache_evicts_least_recently_used_schema():
+    cache = ValidatorCache(maxsize=1)
+    first = cache.validator(schema)
+    cache.validator(Schema("other", {}))
+    assert cache.validator(schema) is not first
+
+
+def test_each_thread_gets_its_own_validator():
+    cache = ValidatorCache()
+    validators = []
+    thread = threading.Thread(target=lambda: validators.append(cache.validator(schema)))
+    thread.start()
+    thread.join()
+    assert validators[0] is not cache.validator(schema)
@@ -0,0 +1,152 @@
+import json
+
+import pytest
+
+import batch
+from batch import BatchOptions, find_files, main, validate_file
+
+SCHEMA = {"name": {"type": "string", "required": True}, "count": {"type": "integer"}}
+
+
+@pytest.fixture
+def folders(tmp_path):
+    schemas = tmp_path / "schemas"
+    schemas.mkdir()
+    (schemas / "people.json").write_text(json.dumps(SCHEMA))
+    incoming = tmp_path / "incoming"
+    incoming.mkdir()
+    (incoming / "good.csv").write_text("Name,Count\nAna,1\nBob,2\n")
+    (incoming / "bad.csv").write_text("Name,Count\nAna,1\n,2\n")
+    return schemas, incoming
+
+
+def test_find_files_expands_directories_and_globs(folders):
+    _, incoming = folders
+    (incoming / "notes.txt").write_text("not a csv")
+    in_folder = find_files([str(incoming)])
+    assert sorted(in_folder) == sorted(str(p) for p in incoming.glob("*.csv"))
+    assert find_files([str(incoming / "g*.csv"), str(incoming / "good.csv")]) == [
+        str(incoming / "good.csv")
+    ]
+
+
+def test_batch_writes_a_summary_per_file_and_fails_on_invalid_files(folders, tmp_path):
+    schemas, incoming = folders
+    output = tmp_path / "summary.jsonl"
+    status = main(
+        [
+            str(incoming),
+            "--schema", "people",
+            "--schema-folder", str(schemas),
+            "--workers", "2",
+            "--output", str(output),
+        ]
+    )
+    summaries = {
+        s["file"]: s for s in map(json.loads, output.read_text().splitlines())
+    }
+    assert status == 1
+    good = summaries[str(incoming / "good.csv")]
+    assert good["status"] == "valid"
+    assert good["rows"] == 2
+    assert good["mappings"] == {"Name": "name", "Count": "count"}
+    bad = summaries[str(incoming / "bad.csv")]
+    assert bad["status"] == "invalid"
+    assert bad["failures"][0]["field"] == "name"
+
+
+def test_batch_succeeds_when_every_file_is_valid(folders, tmp_path):
+    schemas, incoming = folders
+    status = main(
+        [
+            str(incoming / "good.csv"),
+            "--schema-folder", str(schemas),
+            "--workers", "1",
+            "--output", str(tmp_path / "summary.jsonl"),
+        ]
+    )
+    assert status == 0
+
+
+def test_batch_marks_files_stopped_at_the_error_threshold_as_partial(
+    folders, tmp_path
+):
+    schemas, incoming = folders
+    output = tmp_path / "summary.jsonl"
+    main(
+        [
+            str(incoming),
+            "--schema", "people",
+            "--schema-folder", str(schemas),
+            "--workers", "1",
+            "--error-threshold", "0",
+            "--output", str(output),
+        ]
+    )
+    summaries = {
+        s["file"]: s for s in map(json.loads, output.read_text().splitlines())
+    }
+    assert summaries[str(incoming / "bad.csv")]["partial"] is True
+    assert summaries[str(incoming / "good.csv")]["partial"] is False
+
+
+def test_missing_file_is_reported_as_failed(folders):
+    schemas, incoming = folders
+    options = BatchOptions(
+        schema="people",
+        schema_folder=str(schemas),
+        template_folder=None,
+        result_folder=None,
+        storage="local",
+        error_threshold=100,
+    )
+    summary = validate_file(str(incoming / "gone.csv"), options)
+    assert summary["status"] == "failed"
+    assert "bytes" not in summary
+
+
+def test_batch_reports_throughput_when_a_file_fails(folders, monkeypatch, capsys):
+    schemas, incoming = folders
+    gone = str(incoming / "gone.csv")
+    monkeypatch.setattr(batch, "find_files", lambda paths: [gone] + find_files(paths))
+    status = main(
+        [
+            str(incoming),
+            "--schema", "people",
+            "--schema-folder", str(schemas),
+            "--workers", "1",
+            "--output", "-",
+        ]
+    )
+    assert status == 1
+    summary = capsys.readouterr().err.strip().splitlines()[-1]
+    assert summary.startswith("3 files, 4 rows")
+    assert summary.endswith("1 valid, 1 invalid, 1 failed")
+
+
+def test_batch_rejects_unknown_schema(folders):
+    schemas, incoming = folders
+    with pytest.raises(SystemExit):
+        main([str(incoming), "--schema", "missing", "--schema-folder", str(schemas)])
+
+
+def test_batch_splits_clean_and_rejected_rows(folders, tmp_path):
+    schemas, incoming = folders
+    output = tmp_path / "summary.jsonl"
+    split = tmp_path / "split"
+    status = main(
+        [
+            str(incoming / "bad.csv"),
+            "--schema", "people",
+            "--schema-folder", str(schemas),
+            "--workers", "1",
+            "--output", str(output),
+            "--split", str(split),
+        ]
+    )
+    summary = json.loads(output.read_text())
+    assert status == 1
+    assert summary["rows"] == 2
+    assert summary["errors"] == 1
+    assert (split / "bad.clean.csv").read_text() == "name,count\nAna,1\n"
+    assert summary["rejects"] == str(split / "bad.rejects.csv")